@@ -1,59 +1,56 @@
+import datetime
 import importlib.metadata
-from jwc.cli.cache import jwc_cache_dir
 import os
 import re
-import click
-import datetime
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from pathlib import Path
 
-from click.decorators import FC
+import click
 
+import jwc.phxp
+from jwc.cli.cache import jwc_cache_dir
 from jwc.cli.fetch import SessionCache
 from jwc.schedule_preset_trules import TransformationResults
-from . import cache
+
+from ..jwapi_common import JwcRequestError
+from ..jwapi_model import ErrorEntry
+from ..rules import set_match_timeout, timeout_supported
 from ..schedule import (
     Schedule,
     get_calendar_name,
     get_semester_desc_brief,
-    get_semester_description,
 )
-from ..jwapi_model import ErrorEntry
-import jwc.phxp
-from . import phxp_cache
 from ..schedule_preference import JwcSchedulePreference
 from ..schedule_preset_trules import (
     T_LAB_RULES_RAW,
     T_LESSON_RULES_RAW,
     T_LOCATION_RULES_RAW,
 )
+from ..schedule_split import SPLIT_MODES, SplitMode, classifier
+from ..schedule_utils import EXAM, LAB, LESSON
+from . import cache, phxp_cache
+from .accounts import accounts_group, add_accounts_option, pool_accounts
+from .cache_commands import cache_group
+from .cache_io import atomic_write_text
+from .common import (
+    add_schedule_preference_options,
+    add_semester_option,
+    exam_schedule,
+    load_schedule_preferences_with_preset,
+    parse_semester_arg,
+    report_semester,
+    write_exam_calendar,
+    write_kb_calendar,
+)
+from .daemon import daemon_group
+from .rules import rules_group
 from .share import (
     maybe_offer_http_share,
     resolve_calendar_output_path,
     write_calendar_file,
 )
-
-
-def load_schedule_preferences(preference_file: str | None) -> JwcSchedulePreference:
-    if not preference_file:
-        preference_file = cache.jwc_cache_dir() + "/schedule-preference.yaml"
-        if not os.path.exists(preference_file):
-            return JwcSchedulePreference()
-
-    from pydantic_yaml import parse_yaml_file_as
-
-    return parse_yaml_file_as(JwcSchedulePreference, preference_file)
-
-
-def load_schedule_preferences_with_preset(
-    preference_file: str | None, no_preset_rules: bool
-) -> JwcSchedulePreference:
-    preference = load_schedule_preferences(preference_file)
-
-    if not no_preset_rules:
-        preference.merge_with_preset_rules(
-            T_LESSON_RULES_RAW, T_LAB_RULES_RAW, T_LOCATION_RULES_RAW
-        )
-
-    return preference
+from .watch import watch_command
 
 
 def schedule_preference_summary(preference: JwcSchedulePreference):
@@ -77,56 +74,38 @@ def schedule_preference_summary(preference: JwcSchedulePreference):
         click.echo(f"[i] 日历设置：使用 {len(preference.location_trules)} 条地点名称规则")
 
 
-def parse_semester_arg(s: str) -> tuple[str, str]:
-    """解析命令行中的学期选项，返回 (学年, 学期) 元组"""
-    match = re.match(r"^(\d+)(sp|su|au|fa|[afs春夏秋])?", s.lower())
-    if not match:
-        raise ValueError(f"无效的学期格式: {s}")
-
-    year_part, season_part = match.groups()
-    base_year_raw = int(year_part)
-    if base_year_raw < 100:
-        base_year = 2000 + int(year_part)
-    else:
-        base_year = base_year_raw
-
-    # Determine season
-    if season_part in {"春", "sp", "s"}:
-        xq = "2"
-        xn = f"{base_year - 1}-{base_year}"
-    elif season_part in {"夏", "su"}:
-        xq = "3"
-        xn = f"{base_year - 1}-{base_year}"
-    elif season_part in {"秋", "f", "au", "fa"} or season_part is None:  # Default to fall
-        xq = "1"
-        xn = f"{base_year}-{base_year + 1}"
-    else:
-        raise ValueError(f"未知的季节标识: {season_part}")
+class JwcGroup(click.Group):
+    """请求教务系统失败时报告错误并以退出码 1 结束，而不是打印调用栈"""
 
-    return (xn, xq)
+    def invoke(self, ctx: click.Context):
+        try:
+            return super().invoke(ctx)
+        except JwcRequestError as e:
+            click.secho(f"[!] {e}", fg="red")
+            ctx.exit(1)
 
 
-@click.group()
-def cli():
+@click.group(cls=JwcGroup)
+@click.option(
+    "--rule-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    envvar="JWC_RULE_TIMEOUT",
+    default=None,
+    help="偏好设置中每条正则规则每次匹配的时间上限（秒），需安装 regex 模块",
+)
+def cli(rule_timeout: float | None):
     click.echo(f"[动量神蚣 CLI · jwc.py {importlib.metadata.version('jwc')}]")
-    pass
-
-
-def add_semester_option(func: FC) -> FC:
-    return click.option("-s", "semester", help="指定学期，格式如 24秋/25s/2025夏")(func)
+    if rule_timeout is not None and not timeout_supported():
+        click.secho("[!] 未安装 regex 模块，无法限制规则的匹配时间", fg="yellow")
+    set_match_timeout(rule_timeout)
 
 
-def add_schedule_preference_options(f: FC) -> FC:
-    # fmt: off
-    f = click.option("--preference-file", "-p", default=None, help="指定偏好设置文件路径")(f)
-    f = click.option("--no-preset-rules", is_flag=True, help="不使用预置转换规则")(f)
-    # fmt: on
-    return f
-
-
-def report_semester(xn: str, xq: str):
-    click.secho(f"[i] 当前学期：{get_semester_description(xn, xq)}", fg="cyan")
-    click.echo("[i] 若要使用不同的学期，请更改命令行参数。")
+# 命令组定义在各自的模块中
+cli.add_command(accounts_group)
+cli.add_command(cache_group)
+cli.add_command(daemon_group)
+cli.add_command(rules_group)
+cli.add_command(watch_command)
 
 
 @cli.command()
@@ -143,7 +122,9 @@ def fetch(semester: str | None, force_login: bool):
     cache.request_xszykbzong(xn, xq)
     _ = cache.request_semester_start_date(xn, xq)
     cache.request_XsksByxhList(xn, xq)
+    _ = cache.sync_cache_db(xn, xq)
     click.secho("[i] 缓存已更新", fg="green")
+    cache.collect_garbage_opportunistically()
 
 
 def report_error_entries(error_entries: list[ErrorEntry], kind: str = "课表"):
@@ -184,36 +165,176 @@ def _report_transformation_results(tr: TransformationResults):
 @add_semester_option
 @click.option("-o", "out_file", default=None, help="输出文件名")
 @add_schedule_preference_options
+@click.option(
+    "--variant",
+    "variant_files",
+    multiple=True,
+    metavar="PREFERENCE_FILE",
+    help="另按此偏好设置文件生成一份日历，文件名附加其名称；可多次指定",
+)
+@click.option(
+    "--kb-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="由此课表 JSON 文件（可为多个课表依次排列的归档）生成日历，而非缓存的课表",
+)
+@click.option(
+    "--split-by",
+    type=click.Choice(SPLIT_MODES),
+    default=None,
+    help="按种类、emoji、课程或偏好设置中的 calendar_split_rules 拆分为多个日历，并写出清单",
+)
 def to_ics(
     semester: str | None,
     out_file: str,
     preference_file: str | None,
     no_preset_rules: bool,
+    variant_files: tuple[str, ...],
+    kb_file: str | None,
+    split_by: SplitMode | None,
 ):
     """【教务课表导出】由课程表生成 ics 日历文件"""
+    if split_by and variant_files:
+        raise click.UsageError("--split-by 不能与 --variant 同时使用")
     xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
     report_semester(xn, xq)
-    data = cache.xszykbzong(xn, xq)
     error_entries: list[ErrorEntry] = []
-    # 动态获取学期开始日期
-    start_date = cache.semester_start_date(xn, xq)
-    schedule = Schedule.from_kb(
-        data, get_semester_desc_brief(xn, xq), start_date, error_entries
-    )
+    if kb_file:
+        schedule = cache.kb_file_schedule(kb_file, xn, xq, error_entries)
+    else:
+        schedule = cache.kb_schedule(xn, xq, error_entries)
     report_error_entries(error_entries)
 
     # 加载用户偏好设置
     preference = load_schedule_preferences_with_preset(preference_file, no_preset_rules)
 
-    calendar, transformation_results = schedule.to_ics(preference)
-    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq))
-    ics_filename = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
-    written_path = write_calendar_file(ics_filename, calendar.serialize())
+    if split_by == "rules" and not preference.calendar_split_rules:
+        click.secho(
+            "[!] 偏好设置中没有 calendar_split_rules，所有课程都将归入同一日历",
+            fg="yellow",
+        )
+
+    if split_by:
+        written_path, transformation_results = write_split_kb_calendars(
+            xn, xq, schedule, preference, split_by, out_file
+        )
+    # 渲染缓存以缓存的课表为依据，给定的课表文件须直接渲染
+    elif variant_files or kb_file:
+        written_path, transformation_results = write_kb_calendar_variants(
+            xn, xq, schedule, preference, variant_files, no_preset_rules, out_file
+        )
+    else:
+        written_path, transformation_results = write_kb_calendar(
+            xn, xq, schedule, preference, out_file
+        )
 
     _report_transformation_results(transformation_results)
     maybe_offer_http_share(written_path)
 
 
+def write_kb_calendar_variants(
+    xn: str,
+    xq: str,
+    schedule: Schedule,
+    preference: JwcSchedulePreference,
+    variant_files: Sequence[str],
+    no_preset_rules: bool,
+    out_file: str | None = None,
+) -> tuple[Path, TransformationResults]:
+    """一次渲染主日历与各变体日历，返回主日历的路径与转换结果"""
+    variants = [
+        load_schedule_preferences_with_preset(f, no_preset_rules) for f in variant_files
+    ]
+    rendered = schedule.to_ics_variants([preference, *variants])
+
+    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq))
+    ics_filename = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
+    (ics_text, transformation_results), *variant_results = rendered
+    written_path = write_calendar_file(ics_filename, ics_text)
+    for f, (text, _) in zip(variant_files, variant_results):
+        _ = write_calendar_file(
+            ics_filename.with_name(f"{ics_filename.stem}-{Path(f).stem}.ics"), text
+        )
+    return written_path, transformation_results
+
+
+# 分组名称（如课程名称）中不能用于文件名的字符
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _split_calendar_filenames(stem: str, keys: Iterable[str]) -> dict[str, str]:
+    """
+    各分组日历的文件名。不同分组的名称替换掉不安全字符后可能相同（大小写不敏感的文件系统上
+    只差大小写也算），这些分组的文件名再附加名称哈希的前 8 位，以免互相覆盖。
+    """
+    import hashlib
+
+    safe = {key: _UNSAFE_FILENAME_CHARS.sub("_", key) for key in keys}
+    counts = Counter(name.casefold() for name in safe.values())
+    filenames: dict[str, str] = {}
+    for key, name in safe.items():
+        if counts[name.casefold()] > 1:
+            name = f"{name}-{hashlib.sha256(key.encode()).hexdigest()[:8]}"
+        filenames[key] = f"{stem}-{name}.ics"
+    return filenames
+
+
+def write_split_kb_calendars(
+    xn: str,
+    xq: str,
+    schedule: Schedule,
+    preference: JwcSchedulePreference,
+    split_by: SplitMode,
+    out_file: str | None = None,
+) -> tuple[Path, TransformationResults]:
+    """
+    一次渲染出按 split_by 拆分的各日历，文件名附加分组名称；
+    另写出列出各日历文件及其内容哈希的清单，返回清单的路径与合计的转换结果。
+    """
+    import hashlib
+    import json
+
+    partitions = schedule.to_ics_partitions(preference, classifier(split_by, preference))
+
+    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq))
+    base = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
+    results = TransformationResults(set(), set(), set())
+    calendars: list[dict[str, str | int]] = []
+    filenames = _split_calendar_filenames(base.stem, partitions)
+    for key, (text, tr) in partitions.items():
+        filename = filenames[key]
+        _ = write_calendar_file(base.with_name(filename), text)
+        results.untransformed_lessons |= tr.untransformed_lessons
+        results.untransformed_labs |= tr.untransformed_labs
+        results.untransformed_locations |= tr.untransformed_locations
+        calendars.append(
+            {
+                "name": key,
+                # 压缩存储时，共享服务仍以此文件名提供
+                "file": filename,
+                "events": text.count("BEGIN:VEVENT"),
+                "sha256": hashlib.sha256(text.encode()).hexdigest(),
+            }
+        )
+
+    manifest = {
+        "semester": get_semester_desc_brief(xn, xq),
+        "split_by": split_by,
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "calendars": calendars,
+    }
+    manifest_path = base.with_name(f"{base.stem}-manifest.json")
+    atomic_write_text(
+        str(manifest_path),
+        json.dumps(manifest, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    click.echo(
+        f"[i] 共 {len(calendars)} 个日历，清单已写入 {manifest_path.resolve()} 文件。"
+    )
+    return manifest_path.resolve(), results
+
+
 @cli.command()
 @add_semester_option
 @click.option("-o", "out_file", default=None, help="输出文件名")
@@ -227,27 +348,84 @@ def exam_to_ics(
     """【教务考试导出】由考试安排生成 ics 日历文件"""
     xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
     report_semester(xn, xq)
-    data = cache.XsksByxhList(xn, xq)
-    start_date = cache.semester_start_date(xn, xq)
-    semester_desc = get_semester_desc_brief(xn, xq)
     error_entries: list[ErrorEntry] = []
-    schedule = Schedule.from_xsks(data, semester_desc, start_date, error_entries)
+    schedule = exam_schedule(xn, xq, error_entries)
     report_error_entries(error_entries, kind="考试")
 
     # 加载用户偏好设置
     preference = load_schedule_preferences_with_preset(preference_file, no_preset_rules)
 
-    calendar, transformation_results = schedule.to_ics(preference)
-    from ..schedule import EXAM
-
-    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq), EXAM)
-    ics_filename = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
-    written_path = write_calendar_file(ics_filename, calendar.serialize())
+    written_path, transformation_results = write_exam_calendar(
+        xn, xq, schedule, preference, out_file
+    )
 
     _report_transformation_results(transformation_results)
     maybe_offer_http_share(written_path)
 
 
+_ENTRY_KINDS = {"lesson": LESSON, "lab": LAB, "exam": EXAM}
+
+
+@cli.command(name="freebusy")
+@add_semester_option
+@click.option("-o", "out_file", default=None, help="输出文件名")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["ics", "json"]),
+    default="ics",
+    help="ics 为 VFREEBUSY 日历；json 为按日期列出忙碌分钟数的紧凑格式",
+)
+@click.option(
+    "--exclude",
+    type=click.Choice(list(_ENTRY_KINDS)),
+    multiple=True,
+    help="不计入此类日程，可多次指定",
+)
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--all-day-busy", is_flag=True, help="将没有具体时间的日程视为全天忙碌")
+def freebusy(
+    semester: str | None,
+    out_file: str | None,
+    output_format: str,
+    exclude: tuple[str, ...],
+    date_from: datetime.datetime | None,
+    date_to: datetime.datetime | None,
+    all_day_busy: bool,
+):
+    """【忙闲时间导出】只导出合并后的忙碌时间段，不含课程详情"""
+    from ..freebusy import BusyTimes
+
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+    excluded = {_ENTRY_KINDS[k] for k in exclude}
+    error_entries: list[ErrorEntry] = []
+    schedules = [cache.kb_schedule(xn, xq, error_entries)]
+    report_error_entries(error_entries)
+    if EXAM not in excluded:
+        error_entries = []
+        schedules.append(exam_schedule(xn, xq, error_entries))
+        report_error_entries(error_entries, kind="考试")
+
+    busy = BusyTimes.from_schedules(
+        schedules,
+        excluded,
+        date_from and date_from.date(),
+        date_to and date_to.date(),
+        all_day_busy,
+    )
+    click.echo(
+        f"[i] 共 {len(busy.days)} 天有日程，合并为 {busy.interval_count()} 个忙碌时间段"
+    )
+    semester_desc = get_semester_desc_brief(xn, xq)
+    if output_format == "json":
+        filename, content = f"{semester_desc}忙闲时间.json", busy.to_json()
+    else:
+        filename, content = f"{semester_desc}忙闲时间.ifb", busy.to_vfreebusy()
+    _ = write_calendar_file(resolve_calendar_output_path(out_file, filename), content)
+
+
 @cli.command()
 @click.argument("in_file")
 @add_semester_option
@@ -260,10 +438,7 @@ def phxp_arrange(in_file: str, out_file: str | None, semester: str | None):
     """
     xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
     report_semester(xn, xq)
-    data = cache.xszykbzong(xn, xq)
-    start_date = cache.semester_start_date(xn, xq)
-    semester_desc = get_semester_desc_brief(xn, xq)
-    schedule = Schedule.from_kb(data, semester_desc, start_date)
+    schedule = cache.kb_schedule(xn, xq)
 
     if not out_file:
         parts = in_file.rsplit(".", 1)
@@ -283,14 +458,255 @@ def phxp_arrange(in_file: str, out_file: str | None, semester: str | None):
     print(f"[i] 输出文件已写到 {out_file}")
 
 
+def _int_range_callback(
+    _ctx: click.Context, _param: click.Parameter, value: str | None
+) -> tuple[int, int] | None:
+    """如 5-10 或 7"""
+    if value is None:
+        return None
+    try:
+        a, _, b = value.partition("-")
+        lo, hi = int(a), int(b or a)
+    except ValueError:
+        raise click.BadParameter("格式应如 5-10")
+    if lo > hi:
+        raise click.BadParameter("范围的起点不能大于终点")
+    return lo, hi
+
+
+def _minute_range_callback(
+    _ctx: click.Context, _param: click.Parameter, value: str
+) -> tuple[int, int]:
+    """如 08:00-22:00，返回当天的分钟数"""
+    try:
+        spans = [datetime.time.fromisoformat(t) for t in value.split("-")]
+        [t0, t1] = [t.hour * 60 + t.minute for t in spans]
+    except ValueError:
+        raise click.BadParameter("格式应如 08:00-22:00")
+    if t0 >= t1:
+        raise click.BadParameter("开始时间应早于结束时间")
+    return t0, t1
+
+
+@cli.command(name="free-slots")
+@add_accounts_option("参与的账号，可多次指定；默认为账号池中的所有账号")
+@click.option(
+    "--kb-file",
+    "kb_files",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="另以此课表 JSON 文件为一人（以文件名称呼），可多次指定",
+)
+@add_semester_option
+@click.option(
+    "-d", "--duration", type=click.IntRange(1), default=120, help="所需时长（分钟）"
+)
+@click.option(
+    "-w",
+    "--weeks",
+    callback=_int_range_callback,
+    default=None,
+    help="在哪几周内查找，如 5-10；默认为整个学期",
+)
+@click.option(
+    "--days", callback=_int_range_callback, default="1-7", help="允许的星期几，如 1-5"
+)
+@click.option("--max-absent", type=click.IntRange(0), default=0, help="至多允许几人没空")
+@click.option("--weekly", is_flag=True, help="查找在所选各周都适用的每周固定时间段")
+@click.option("--periods", is_flag=True, help="以课节而非 5 分钟为单位查找")
+@click.option(
+    "--between",
+    callback=_minute_range_callback,
+    default="08:00-22:00",
+    help="以 5 分钟为单位时，一天中的查找范围",
+)
+@click.option("-n", "--limit", type=click.IntRange(1), default=20, help="至多列出几个")
+def free_slots(
+    accounts: list[str],
+    kb_files: tuple[str, ...],
+    semester: str | None,
+    duration: int,
+    weeks: tuple[int, int] | None,
+    days: tuple[int, int],
+    max_absent: int,
+    weekly: bool,
+    periods: bool,
+    between: tuple[int, int],
+    limit: int,
+):
+    """【共同空闲时间】在多人的课表中查找大家（或至多若干人以外）都有空的时间段"""
+    from ..free_slots import Occupancy, SlotGrid, find_free_slots
+    from ..schedule_utils import format_minutes
+    from .fetch import use_account
+
+    accounts = list(dict.fromkeys(accounts)) or ([] if kb_files else pool_accounts())
+    if not accounts and not kb_files:
+        click.echo(
+            "[i] 账号池为空，请先运行 jwc accounts login <账号>，或用 --kb-file 指定课表"
+        )
+        return
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+
+    people: list[str] = []
+    schedules: list[Schedule] = []
+    for account in accounts:
+        with use_account(account):
+            try:
+                schedules.append(cache.kb_schedule(xn, xq))
+            except cache.ACCOUNT_ERRORS as e:
+                click.secho(f"[!] 无法载入 {account} 的课表，已跳过：{e}", fg="yellow")
+                continue
+        people.append(account)
+    for path in kb_files:
+        schedules.append(cache.kb_file_schedule(path, xn, xq))
+        people.append(Path(path).stem)
+    if not schedules:
+        return
+
+    start_date = schedules[0].start_date
+    if weeks is None:
+        last = max(
+            (
+                d
+                for s in schedules
+                for e in s.entries
+                for d in e.occurrence_dates(start_date)
+            ),
+            default=start_date,
+        )
+        weeks = (1, (last - start_date).days // 7 + 1)
+    date_from = start_date + datetime.timedelta(weeks=weeks[0] - 1)
+    date_to = start_date + datetime.timedelta(weeks=weeks[1], days=-1)
+
+    try:
+        grid = SlotGrid.class_periods() if periods else SlotGrid.minutes(5, *between)
+    except RuntimeError as e:
+        # 未安装 numpy
+        click.secho(f"[!] {e}", fg="red")
+        raise SystemExit(1)
+    occupancy = Occupancy.from_schedules(people, schedules, grid, date_from, date_to)
+    slots = find_free_slots(
+        occupancy, duration, max_absent, range(days[0], days[1] + 1), weekly, limit
+    )
+
+    click.echo(f"[i] {len(people)} 人，第 {weeks[0]}-{weeks[1]} 周，需要 {duration} 分钟")
+    if not slots:
+        click.secho("[!] 没有满足条件的时间段", fg="yellow")
+        return
+    for k, slot in enumerate(slots, 1):
+        weekday = "一二三四五六日"[slot.day_of_week - 1]
+        if slot.date is None:
+            when = f"每周{weekday}"
+        else:
+            week = (slot.date - start_date).days // 7 + 1
+            when = f"第{week}周 周{weekday}（{slot.date.strftime('%m-%d')}）"
+        span = f"{format_minutes(slot.start)}-{format_minutes(slot.end)}"
+        if slot.end - slot.start > duration:
+            span += f" 内任选 {duration} 分钟"
+        who = (
+            f"{len(slot.absent)} 人没空：{'、'.join(slot.absent)}"
+            if slot.absent
+            else "全员有空"
+        )
+        click.echo(f"  {k}. {when} {span}，{who}")
+
+
+def _schedule_sources(
+    xn: str,
+    xq: str,
+    no_exams: bool,
+    phxp: bool,
+    kb_errors: list[ErrorEntry] | None = None,
+    exam_errors: list[ErrorEntry] | None = None,
+    skip_phxp: str = "不检查大物实验",
+) -> list[tuple[str, Schedule]]:
+    """当前账号的课表，及（可选的）考试安排、大物实验；skip_phxp 为没有大物实验数据时的提示"""
+    sources = [("课表", cache.kb_schedule(xn, xq, kb_errors))]
+    if not no_exams:
+        sources.append(
+            ("考试", exam_schedule(xn, xq, [] if exam_errors is None else exam_errors))
+        )
+    if phxp:
+        if os.path.isfile(phxp_cache.phxp_cache().path("lab_courses")):
+            obj = phxp_cache.LoadUsedLabCourses()
+            start_date = cache.semester_start_date(xn, xq)
+            semester_desc = get_semester_desc_brief(xn, xq)
+            sources.append(
+                (
+                    "大物实验",
+                    jwc.phxp.create_schedule_from(obj, semester_desc, start_date),
+                )
+            )
+        else:
+            click.secho(f"[!] 没有缓存的大物实验选课数据，{skip_phxp}", fg="yellow")
+    return sources
+
+
+@cli.command(name="conflicts")
+@add_accounts_option("检查哪些账号的课表，可多次指定；默认为当前账号")
+@add_semester_option
+@click.option("--no-exams", is_flag=True, help="不检查考试安排")
+@click.option("--phxp", is_flag=True, help="一并检查缓存的大物实验选课")
+def conflicts(accounts: list[str], semester: str | None, no_exams: bool, phxp: bool):
+    """【冲突检查】找出课表、考试安排（及大物实验）中时间重叠的日程；有冲突时退出码为 1"""
+    from contextlib import nullcontext
+
+    from ..conflicts import find_conflicts, group_conflicts
+    from ..schedule_utils import format_minutes
+    from .fetch import use_account
+
+    accounts = list(dict.fromkeys(accounts))
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+
+    conflicted: list[str] = []
+    for account in accounts or [None]:
+        prefix = f"{account}：" if account is not None else ""
+        with nullcontext() if account is None else use_account(account):
+            try:
+                sources = _schedule_sources(xn, xq, no_exams, phxp)
+            except cache.ACCOUNT_ERRORS as e:
+                click.secho(f"[!] {prefix}无法载入课表：{e}", fg="red")
+                continue
+        start_date = sources[0][1].start_date
+        # 与 all-to-ics 一致：重复的日程保留考试安排与选课平台中的（时间更准确）
+        kb, *others = sources
+        groups = group_conflicts(find_conflicts([*others, kb]))
+        if not groups:
+            click.secho(f"[i] {prefix}没有时间冲突", fg="green")
+            continue
+        conflicted.append(account or "")
+        click.secho(f"[!] {prefix}{len(groups)} 处时间冲突：", fg="yellow")
+        for g in groups:
+            date, t0, t1 = g.occurrences[0]
+            week = (date - start_date).days // 7 + 1
+            weekday = "一二三四五六日"[date.isoweekday() - 1]
+            first = (
+                f"第{week}周 周{weekday}（{date.strftime('%m-%d')}）"
+                f"{format_minutes(t0)}-{format_minutes(t1)}"
+            )
+            more = f" 等 {len(g.occurrences)} 次" if len(g.occurrences) > 1 else ""
+            click.echo(
+                f"    {g.a.lab_name or g.a.name}（{g.source_a}） 与 "
+                f"{g.b.lab_name or g.b.name}（{g.source_b}）：{first}{more}"
+            )
+
+    if len(accounts) > 1:
+        click.echo(f"[i] 共 {len(accounts)} 个账号，{len(conflicted)} 个有时间冲突")
+    if conflicted:
+        raise SystemExit(1)
+
+
 @cli.command()
 def session():
     """管理登录会话"""
-    from .fetch import get_session_cache_path, clear_session_cache
     import os
     import pickle
     import time
 
+    from .fetch import clear_session_cache, get_session_cache_path
+
     cache_path = get_session_cache_path()
     click.echo(f"[i] 用户数据目录：{jwc_cache_dir()}")
 
@@ -318,7 +734,7 @@ def session():
 
         if click.confirm("[?] 是否清除session缓存？"):
             clear_session_cache()
-    except Exception as e:
+    except (OSError, *cache.UNPICKLE_ERRORS) as e:
         click.secho(f"[!] 读取session缓存信息失败: {e}", fg="red")
 
 
@@ -356,6 +772,66 @@ def phxp_to_ics(
     maybe_offer_http_share(written_path)
 
 
+@cli.command(name="all-to-ics")
+@add_semester_option
+@click.option("-o", "out_file", default=None, help="输出文件名")
+@add_schedule_preference_options
+@click.option("--no-exams", is_flag=True, help="不含考试安排")
+@click.option("--no-phxp", is_flag=True, help="不含缓存的大物实验选课")
+def all_to_ics(
+    semester: str | None,
+    out_file: str | None,
+    preference_file: str | None,
+    no_preset_rules: bool,
+    no_exams: bool,
+    no_phxp: bool,
+):
+    """【合并导出】将课表、考试安排与大物实验合并去重，生成一个 ics 日历"""
+    from ..schedule_combine import combine_schedules
+    from .fetch import reuse_session
+
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+    kb_errors: list[ErrorEntry] = []
+    exam_errors: list[ErrorEntry] = []
+    # 课表与考试安排需要请求时共用一次登录
+    with reuse_session():
+        sources = _schedule_sources(
+            xn, xq, no_exams, not no_phxp, kb_errors, exam_errors, "跳过大物实验"
+        )
+    report_error_entries(kb_errors)
+    report_error_entries(exam_errors, kind="考试")
+
+    # 考试安排与选课平台的信息更完整（如考试类别、实验的实际时间），重复时优先保留
+    kb, *others = sources
+    schedule, duplicates = combine_schedules([*others, kb])
+    if duplicates:
+        pairs = dict.fromkeys(
+            (
+                d.entry.lab_name or d.entry.name,
+                d.source,
+                d.kept.lab_name or d.kept.name,
+                d.kept_source,
+            )
+            for d in duplicates
+        )
+        click.secho(f"[i] 已去除 {len(duplicates)} 次重复的日程：", fg="cyan")
+        for name, source, kept_name, kept_source in pairs:
+            click.echo(f"    {source}中的 {name} → 保留{kept_source}中的 {kept_name}")
+
+    preference = load_schedule_preferences_with_preset(preference_file, no_preset_rules)
+    [(ics_text, transformation_results)] = schedule.to_ics_variants([preference])
+    ics_filename = resolve_calendar_output_path(
+        out_file,
+        f"{get_semester_desc_brief(xn, xq)}日程 - "
+        f"{datetime.date.today().strftime('%m月%d日')}更新.ics",
+    )
+    written_path = write_calendar_file(ics_filename, ics_text)
+
+    _report_transformation_results(transformation_results)
+    maybe_offer_http_share(written_path)
+
+
 @cli.command()
 @click.option(
     "--output", "-o", default=None, help="输出偏好文件路径，不指定则使用默认路径"
@@ -364,9 +840,10 @@ def init_schedule_preferences(output: str | None):
     """【生成日历设置模版】"""
     preference_file = output or (cache.jwc_cache_dir() + "/schedule-preference.yaml")
 
-    if os.path.exists(preference_file):
-        if not click.confirm(f"[?] 文件 {preference_file} 已存在，要覆盖吗？"):
-            return
+    if os.path.exists(preference_file) and not click.confirm(
+        f"[?] 文件 {preference_file} 已存在，要覆盖吗？"
+    ):
+        return
 
     preference = JwcSchedulePreference()
     # 一些示例
@@ -1,5 +1,6 @@
-import sys
 import re
+import sys
+
 from jwc.cli import cli
 
 if __name__ == "__main__":
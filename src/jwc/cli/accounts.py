@@ -0,0 +1,251 @@
+"""
+jwc accounts 命令组：账号池中各账号的登录、并发更新缓存与批量生成日历。
+"""
+
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import click
+from click.decorators import FC
+
+from ..schedule import get_calendar_name, get_semester_desc_brief
+from . import cache
+from .cache import jwc_cache_dir
+from .common import (
+    add_schedule_preference_options,
+    add_semester_option,
+    load_schedule_preferences_with_preset,
+    parse_semester_arg,
+)
+from .render_cache import RenderCache
+from .share import resolve_calendar_output_path, write_calendar_file
+
+
+@click.group(name="accounts")
+def accounts_group():
+    """【账号池】为多个账号分别登录，并发地更新各自的缓存"""
+
+
+def _validate_account(_ctx: click.Context, _param: click.Parameter, value: str) -> str:
+    from .fetch import is_valid_account
+
+    if not is_valid_account(value):
+        raise click.BadParameter("账号只能包含字母、数字、下划线与连字符")
+    return value
+
+
+@accounts_group.command(name="login")
+@click.argument("account", callback=_validate_account)
+@click.option("--force-login", is_flag=True, help="强制重新登录，清除该账号的session缓存")
+def accounts_login(account: str, force_login: bool):
+    """登录 ACCOUNT 并保存其会话，供 jwc accounts fetch 使用"""
+    from .fetch import clear_session_cache, get_session, use_account
+
+    with use_account(account):
+        if force_login:
+            clear_session_cache()
+        _ = get_session()
+        click.secho(f"[i] 账号 {account} 的缓存目录：{jwc_cache_dir()}", fg="green")
+
+
+def pool_accounts() -> list[str]:
+    """账号池中的账号，即已用 jwc accounts login 登录过的账号"""
+    path = os.path.join(cache.jwc_cache_root(), cache.ACCOUNTS_DIR_NAME)
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))
+    )
+
+
+@accounts_group.command(name="list")
+def accounts_list():
+    """列出账号池中的账号"""
+    from .session_pool import has_saved_session
+
+    accounts = pool_accounts()
+    if not accounts:
+        click.echo("[i] 账号池为空，请先运行 jwc accounts login <账号>")
+        return
+    for account in accounts:
+        if has_saved_session(account):
+            click.echo(f"    • {account}")
+        else:
+            click.secho(f"    • {account}（没有保存的会话）", fg="yellow")
+
+
+def _validate_accounts(
+    ctx: click.Context, param: click.Parameter, values: tuple[str, ...]
+) -> list[str]:
+    return [_validate_account(ctx, param, v) for v in values]
+
+
+def add_accounts_option(help_text: str) -> Callable[[FC], FC]:
+    return click.option(
+        "-a",
+        "--account",
+        "accounts",
+        multiple=True,
+        callback=_validate_accounts,
+        help=help_text,
+    )
+
+
+@accounts_group.command(name="fetch")
+@add_accounts_option("要更新的账号，可多次指定；默认为账号池中的所有账号")
+@add_semester_option
+@click.option("-j", "--workers", type=click.IntRange(1), default=None, help="并发数")
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="所有账号（含其他进程）合计每秒至多发出的请求数",
+)
+@click.option(
+    "--burst", type=click.FloatRange(min=1), default=None, help="允许突发的请求数"
+)
+@click.option(
+    "--retries", type=click.IntRange(0), default=None, help="每个账号的重试次数"
+)
+def accounts_fetch(
+    accounts: list[str],
+    semester: str | None,
+    workers: int | None,
+    rate: float | None,
+    burst: float | None,
+    retries: int | None,
+):
+    """并发地更新账号池中各账号的缓存"""
+    import time
+
+    from .rate_limit import DEFAULT_BURST, DEFAULT_RATE, TokenBucket
+    from .session_pool import (
+        DEFAULT_RETRIES,
+        DEFAULT_WORKERS,
+        AccountResult,
+        SessionPool,
+        run_for_accounts,
+    )
+
+    accounts = list(dict.fromkeys(accounts)) or pool_accounts()
+    if not accounts:
+        click.echo("[i] 账号池为空，请先运行 jwc accounts login <账号>")
+        return
+
+    fixed_semester = parse_semester_arg(semester) if semester else None
+
+    def task():
+        xn, xq = fixed_semester or cache.refresh_semester_cache()
+        cache.request_xszykbzong(xn, xq)
+        _ = cache.request_semester_start_date(xn, xq)
+        cache.request_XsksByxhList(xn, xq)
+        _ = cache.sync_cache_db(xn, xq)
+
+    bucket = TokenBucket(
+        os.path.join(cache.jwc_cache_root(), "rate-limit"),
+        rate or DEFAULT_RATE,
+        burst or DEFAULT_BURST,
+    )
+    pool = SessionPool(bucket)
+    started = time.monotonic()
+
+    def report(result: AccountResult, done: int):
+        elapsed = time.monotonic() - started
+        progress = f"[{done}/{len(accounts)}] {result.account}"
+        retried = f"，重试 {result.attempts - 1} 次" if result.attempts > 1 else ""
+        if result.ok:
+            click.secho(
+                f"[i] {progress} 已更新（用时 {result.elapsed:.1f} 秒{retried}）",
+                fg="green",
+            )
+        else:
+            click.secho(f"[!] {progress} 失败{retried}：{result.error}", fg="red")
+        click.echo(
+            f"    已请求 {bucket.acquired} 次，"
+            f"{bucket.acquired / elapsed:.2f} 次/秒，{done / elapsed * 60:.1f} 个账号/分钟"
+        )
+
+    results = run_for_accounts(
+        pool,
+        accounts,
+        task,
+        workers or DEFAULT_WORKERS,
+        DEFAULT_RETRIES if retries is None else retries,
+        report,
+    )
+
+    failed = [r.account for r in results if not r.ok]
+    click.secho(
+        f"[i] 共 {len(results)} 个账号，成功 {len(results) - len(failed)} 个，"
+        f"用时 {time.monotonic() - started:.1f} 秒",
+        fg="yellow" if failed else "green",
+    )
+    if failed:
+        click.secho(f"[!] 失败的账号：{' '.join(failed)}", fg="red")
+        click.echo("[i] 若会话已失效，请运行 jwc accounts login <账号> --force-login")
+
+
+def _render_account_calendar(
+    semester: str | None,
+    preference_file: str | None,
+    no_preset_rules: bool,
+    render_cache: RenderCache,
+) -> Path:
+    """为当前账号生成课表日历，解析与渲染经由共享的 render_cache"""
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    schedule = cache.kb_schedule(xn, xq, parse=render_cache.parse_kb_entry)
+    # 未指定 -p 时使用各账号自己的偏好设置文件
+    preference = load_schedule_preferences_with_preset(preference_file, no_preset_rules)
+    [(ics_text, _)] = schedule.to_ics_variants([preference], render_cache.render_entry)
+    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq))
+    ics_filename = resolve_calendar_output_path(None, f"{calendar_name}.ics")
+    return write_calendar_file(ics_filename, ics_text)
+
+
+@accounts_group.command(name="to-ics")
+@add_accounts_option("要生成日历的账号，可多次指定；默认为账号池中的所有账号")
+@add_semester_option
+@add_schedule_preference_options
+def accounts_to_ics(
+    accounts: list[str],
+    semester: str | None,
+    preference_file: str | None,
+    no_preset_rules: bool,
+):
+    """由各账号缓存的课表生成 ics 日历，写入各自的 out 目录；各账号相同的课程只解析、渲染一次"""
+    import time
+
+    from .fetch import use_account
+
+    accounts = list(dict.fromkeys(accounts)) or pool_accounts()
+    if not accounts:
+        click.echo("[i] 账号池为空，请先运行 jwc accounts login <账号>")
+        return
+
+    started = time.monotonic()
+    failed: list[str] = []
+    render_cache = cache.shared_render_cache()
+    try:
+        for i, account in enumerate(accounts, 1):
+            progress = f"[{i}/{len(accounts)}] {account}"
+            with use_account(account):
+                try:
+                    written_path = _render_account_calendar(
+                        semester, preference_file, no_preset_rules, render_cache
+                    )
+                except cache.ACCOUNT_ERRORS as e:
+                    failed.append(account)
+                    click.secho(f"[!] {progress} 失败：{e}", fg="red")
+                    continue
+            click.secho(f"[i] {progress} 已生成 {written_path.name}", fg="green")
+        _ = render_cache.prune()
+    finally:
+        render_cache.close()
+
+    click.secho(
+        f"[i] 共 {len(accounts)} 个账号，成功 {len(accounts) - len(failed)} 个，"
+        f"用时 {time.monotonic() - started:.1f} 秒",
+        fg="yellow" if failed else "green",
+    )
+    click.echo(f"[i] 共享缓存命中：{render_cache.describe_stats()}")
@@ -1,31 +1,105 @@
+import atexit
+import contextvars
 import datetime
+import importlib.metadata
+import json
+import os
+import pickle
+import shutil
+import threading
 import time
+from collections.abc import Callable
 from typing import cast
-import click
-import os
 
+import click
+import requests
 from appdirs import user_data_dir
 from pydantic import ValidationError
-import requests
 
-from jwc.jwapi_common import JwcValueError
+from jwc.jwapi_common import JwcRequestError, JwcValueError
 from jwc.jwapi_schedule import jwapi_get_semester_start_date
 
-from .fetch import get_session
+from ..cli_entry import APP_AUTHOR, APP_DIR_NAME, CACHE_DIR_NAME
+from ..json_stream import iter_kb_entries
 from ..jwapi_model import (
     CurrentSemester,
+    ErrorEntry,
     XsksByxhListResponse,
+    XsksEntry,
     XsksList,
     XszykbzongResponse,
 )
-
-
-APP_DIR_NAME = "jwc.py"
-APP_AUTHOR = "Zjl37"
-CACHE_DIR_NAME = "jwc-cache"
-
-
-def jwc_cache_dir():
+from ..schedule import KbEntryParser, Schedule, get_semester_desc_brief, parse_kb_entry
+from ..schedule_preference import JwcSchedulePreference
+from ..schedule_preset_trules import TransformationResults
+from .cache_db import DEFAULT_ACCOUNT, CacheDB, db_path
+from .cache_gc import format_size, maybe_collect_garbage, touch_last_access
+from .cache_io import (
+    CACHE_READ_ERRORS,
+    atomic_write_text,
+    open_cache_text,
+    read_cache_bytes,
+    read_cache_text,
+    single_flight,
+    stored_path,
+    write_cache_bytes,
+    write_cache_text,
+)
+from .cache_manager import Artifact, ArtifactState, CacheManager
+from .fetch import current_account, get_session, load_session
+from .render_cache import RenderCache, render_cache_path
+
+# 账号池中各账号的缓存目录位于 jwc-cache/accounts/<账号>/ 下
+ACCOUNTS_DIR_NAME = "accounts"
+
+DAY = 24 * 60 * 60  # seconds
+
+# 过期（stale）但未超过最大时限的缓存会先被使用，同时在后台刷新
+SEMESTER_CACHE_STALE_AFTER = 3 * DAY
+SEMESTER_CACHE_MAX_STALENESS = 30 * DAY
+START_DATE_CACHE_STALE_AFTER = 7 * DAY
+START_DATE_CACHE_MAX_STALENESS = 60 * DAY
+
+KB_CACHE_TTL = 7 * DAY
+EXAMS_CACHE_TTL = 7 * DAY
+
+# 考试安排分页请求：首页请求的每页条数（服务器另有上限时以其为准），以及未完成的分页进度的保留时长
+EXAM_PAGE_SIZE = 500
+EXAM_PAGES_CHECKPOINT_TTL = 60 * 60
+EXAM_PAGES_DIR_NAME = "partial-queryXsksByxhList"
+
+# 退出时最多等待后台刷新多少秒
+BACKGROUND_REFRESH_JOIN_TIMEOUT = 5.0
+
+ROOT_ARTIFACTS = [
+    Artifact(
+        "current_semester",
+        "current_semester.json",
+        "当前学期",
+        ttl=SEMESTER_CACHE_STALE_AFTER,
+    ),
+]
+
+SEMESTER_ARTIFACTS = [
+    Artifact("kb", "response-queryxszykbzong.json", "课表", ttl=KB_CACHE_TTL),
+    Artifact(
+        "exams", "response-queryXsksByxhList.json", "考试安排", ttl=EXAMS_CACHE_TTL
+    ),
+    Artifact(
+        "start_date",
+        "semester_start_date.txt",
+        "学期开始日期",
+        ttl=START_DATE_CACHE_STALE_AFTER,
+        inputs=("kb",),
+    ),
+    Artifact(
+        "snapshot", "schedule-kb.pickle", "课表解析结果", inputs=("kb", "start_date")
+    ),
+    Artifact("ics", "calendar-kb.ics", "课表日历", inputs=("snapshot",)),
+]
+
+
+def jwc_cache_root():
     dir_path = os.path.join(
         user_data_dir(appname=APP_DIR_NAME, appauthor=APP_AUTHOR),
         CACHE_DIR_NAME,
@@ -34,8 +108,91 @@ def jwc_cache_dir():
     return dir_path
 
 
-def request_current_semester() -> CurrentSemester:
-    session = get_session()
+def jwc_cache_dir():
+    """当前账号的缓存目录；未用 use_account() 切换账号时即 jwc_cache_root()"""
+    account = current_account()
+    if account is None:
+        return jwc_cache_root()
+    dir_path = os.path.join(jwc_cache_root(), ACCOUNTS_DIR_NAME, account)
+    os.makedirs(dir_path, exist_ok=True)
+    return dir_path
+
+
+# 后台刷新中只影响这次刷新的错误，其余错误照常抛出
+REFRESH_ERRORS: tuple[type[Exception], ...] = (
+    requests.RequestException,
+    JwcRequestError,
+    JwcValueError,
+    ValidationError,
+    ConnectionError,
+)
+# 处理多个账号时只影响当前账号的错误：请求或解析失败、缓存文件无法读写
+ACCOUNT_ERRORS: tuple[type[Exception], ...] = (*REFRESH_ERRORS, OSError, ValueError)
+# 反序列化由旧版本写入或已损坏的 pickle 时可能出现的错误
+UNPICKLE_ERRORS: tuple[type[Exception], ...] = (
+    pickle.UnpicklingError,
+    EOFError,
+    AttributeError,
+    ImportError,
+    IndexError,
+    TypeError,
+    ValueError,
+)
+
+_background_refreshes: dict[str, threading.Thread] = {}
+# 后台刷新失败的说明，等待刷新结束后输出
+_background_failures: list[str] = []
+
+
+def _join_background_refreshes() -> None:
+    deadline = time.monotonic() + BACKGROUND_REFRESH_JOIN_TIMEOUT
+    for thread in list(_background_refreshes.values()):
+        thread.join(max(0.0, deadline - time.monotonic()))
+    while _background_failures:
+        click.secho(f"[!] {_background_failures.pop(0)}", fg="yellow")
+
+
+_ = atexit.register(_join_background_refreshes)
+
+
+def finish_background_refreshes():
+    """等待本次运行发起的后台刷新并清除其记录；守护进程在每条命令结束后调用"""
+    _join_background_refreshes()
+    _background_refreshes.clear()
+
+
+def revalidate_in_background(key: str, refresh: Callable[[requests.Session], object]):
+    """
+    在后台线程中刷新缓存，同一账号的同一 key 每次运行至多刷新一次。
+    只使用已保存的登录会话，不会触发交互式登录；没有可用会话时，留待下次 fetch 刷新。
+    """
+    account = current_account()
+    if account is not None:
+        key = f"{account}/{key}"
+    if key in _background_refreshes:
+        return
+
+    def run():
+        try:
+            session = load_session()
+            if session is None:
+                return
+            _ = refresh(session)
+        except REFRESH_ERRORS as e:
+            # 后台刷新失败不影响本次运行，过期缓存仍然可用
+            _background_failures.append(f"后台刷新 {key} 失败，仍在使用过期的缓存：{e}")
+
+    # 在发起刷新时的上下文中运行，以沿用其账号
+    context = contextvars.copy_context()
+    thread = threading.Thread(
+        target=context.run, args=(run,), name=f"jwc-revalidate-{key}", daemon=True
+    )
+    _background_refreshes[key] = thread
+    thread.start()
+
+
+def request_current_semester(session: requests.Session | None = None) -> CurrentSemester:
+    session = session or get_session()
     response = session.post(
         url="http://jw.hitsz.edu.cn/component/querydangqianxnxq", verify=False
     )
@@ -44,40 +201,84 @@ def request_current_semester() -> CurrentSemester:
     raise ConnectionError(f"获取当前学期失败: {response.status_code}")
 
 
+def root_cache() -> CacheManager:
+    return CacheManager(jwc_cache_dir(), ROOT_ARTIFACTS)
+
+
+def semester_cache(xn: str, xq: str) -> CacheManager:
+    return CacheManager(semester_cache_dir(xn, xq), SEMESTER_ARTIFACTS)
+
+
 def current_semester() -> tuple[str, str]:
-    cache_file = f"{jwc_cache_dir()}/current_semester.json"
+    manager = root_cache()
+    state = manager.check("current_semester")
     try:
-        if not os.path.exists(cache_file):
-            return refresh_semester_cache()
-
-        # Force refresh if cache is old
-        if (
-            datetime.datetime.now().timestamp() - os.path.getmtime(cache_file)
-        ) > 3 * 86400:
-            click.secho("[i] 学期信息缓存超过3天，自动刷新...", fg="yellow")
-            return refresh_semester_cache()
-        with open(cache_file) as f:
+        with open(manager.path("current_semester")) as f:
             semester = CurrentSemester.model_validate_json(f.read())
-        return semester.XN, semester.XQ
-    except:
+    except (OSError, ValidationError):
+        # 没有可用的缓存，只能当场请求
+        return refresh_semester_cache()
+
+    age = state.age or 0.0
+    if age > SEMESTER_CACHE_MAX_STALENESS:
+        click.secho(
+            f"[i] 学期信息缓存已有 {int(age) // DAY} 天未更新，正在刷新...", fg="yellow"
+        )
         return refresh_semester_cache()
 
+    if state.status != "hit":
+        click.secho("[i] 学期信息缓存超过3天，将在后台刷新", fg="yellow")
+        revalidate_in_background("current_semester", refresh_semester_cache)
 
-def refresh_semester_cache():
-    cache_file = f"{jwc_cache_dir()}/current_semester.json"
-    semester = request_current_semester()
-    with open(cache_file, "w") as f:
-        _ = f.write(semester.model_dump_json())
+    return semester.XN, semester.XQ
+
+
+def refresh_semester_cache(session: requests.Session | None = None):
+    manager = root_cache()
+    with single_flight(manager.path("current_semester")) as leader:
+        if leader:
+            semester = request_current_semester(session)
+            atomic_write_text(manager.path("current_semester"), semester.model_dump_json())
+            manager.record("current_semester")
+            return semester.XN, semester.XQ
+
+    with open(manager.path("current_semester")) as f:
+        semester = CurrentSemester.model_validate_json(f.read())
     return semester.XN, semester.XQ
 
 
 def semester_cache_dir(xn: str, xq: str) -> str:
     dir_path = f"{jwc_cache_dir()}/{xn}-{xq}"
     os.makedirs(dir_path, exist_ok=True)
+    touch_last_access(dir_path)
     return dir_path
 
 
+def gc_protected_dirs() -> set[str]:
+    """不应被清理的学期目录：缓存中记录的当前学期"""
+    try:
+        with open(root_cache().path("current_semester")) as f:
+            semester = CurrentSemester.model_validate_json(f.read())
+    except (OSError, ValidationError):
+        return set()
+    return {f"{jwc_cache_dir()}/{semester.XN}-{semester.XQ}"}
+
+
+def collect_garbage_opportunistically():
+    """每天至多一次，按默认策略清理缓存目录"""
+    n, freed = maybe_collect_garbage(jwc_cache_dir(), gc_protected_dirs())
+    if n:
+        click.echo(f"[i] 已自动清理 {n} 项旧缓存，释放 {format_size(freed)}")
+
+
 def request_xszykbzong(xn: str, xq: str):
+    manager = semester_cache(xn, xq)
+    with single_flight(manager.path("kb")) as leader:
+        if leader:
+            _request_xszykbzong(xn, xq, manager)
+
+
+def _request_xszykbzong(xn: str, xq: str, manager: CacheManager):
     session = get_session()
     request_data = {"xn": xn, "xq": xq}
 
@@ -87,19 +288,41 @@ def request_xszykbzong(xn: str, xq: str):
         verify=False,
     )
 
-    if response.ok:
-        print(f"[i] 已更新 xszykbzong")
-        cache_dir = semester_cache_dir(xn, xq)
-        path = f"{cache_dir}/response-queryxszykbzong.json"
-        with open(path, "w") as file:
-            _ = file.write(response.text)
-        # Validate the response immediately
-        try:
-            _ = XszykbzongResponse.model_validate_json(response.text)
-        except Exception as e:
-            click.secho(f"[!] 验证课表数据时出错: {e}", fg="red")
-    else:
-        print(f"[!] 在请求 queryxszykbzong 时出错了：{response.status_code}")
+    if not response.ok:
+        raise JwcRequestError(f"在请求 queryxszykbzong 时出错了：{response.status_code}")
+
+    print(f"[i] 已更新 xszykbzong")
+    _ = write_cache_text(manager.path("kb"), response.text)
+    manager.record("kb")
+    # Validate the response immediately
+    try:
+        _ = XszykbzongResponse.model_validate_json(response.text)
+    except ValidationError as e:
+        click.secho(f"[!] 验证课表数据时出错: {e}", fg="red")
+
+
+def _ask_refetch(what: str, state: ArtifactState) -> bool:
+    """缓存缺失时返回 True；过期时询问用户是否重新获取"""
+    if state.status == "miss":
+        return True
+    if state.status != "expired":
+        return False
+
+    ans = click.prompt(  # pyright: ignore[reportAny]
+        f"[?] 缓存中的{what}已有 {int(state.age or 0) // DAY} 天未更新，要重新获取吗？[Y/n]",
+        default="y",
+        type=str,
+        show_default=False,
+    )
+    return not cast(str, ans).lower().startswith("n")
+
+
+def ensure_xszykbzong(xn: str, xq: str) -> str:
+    """确保 queryxszykbzong 缓存可用，返回其路径"""
+    manager = semester_cache(xn, xq)
+    if _ask_refetch("课表", manager.check("kb")):
+        request_xszykbzong(xn, xq)
+    return manager.path("kb")
 
 
 def xszykbzong(xn: str, xq: str, path: str = "", text: str = "") -> XszykbzongResponse:
@@ -107,62 +330,53 @@ def xszykbzong(xn: str, xq: str, path: str = "", text: str = "") -> XszykbzongRe
     if text != "":
         return XszykbzongResponse.model_validate_json(text)
 
-    default_path = f"{semester_cache_dir(xn, xq)}/response-queryxszykbzong.json"
-    path = path or default_path
+    path = path or ensure_xszykbzong(xn, xq)
 
-    def should_fetch():
-        if not os.path.isfile(path):
-            return True
+    return XszykbzongResponse.model_validate_json(read_cache_text(path))
 
-        now = time.time()
-        DAY = 24 * 60 * 60  # seconds
-        stale_time = now - os.path.getmtime(path)
 
-        if stale_time > 7 * DAY:
-            ans = click.prompt(  # pyright: ignore[reportAny]
-                f"[?] 缓存中的课表已有 {int(stale_time) // DAY} 天未更新，要重新获取吗？[Y/n]",
-                default="y",
-                type=str,
-                show_default=False,
+def request_semester_start_date(
+    xn: str, xq: str, session: requests.Session | None = None
+):
+    manager = semester_cache(xn, xq)
+    with single_flight(manager.path("start_date")) as leader:
+        if not leader:
+            return datetime.date.fromisoformat(
+                read_cache_text(manager.path("start_date")).strip()
             )
-            return not cast(str, ans).lower().startswith("n")
 
-    if should_fetch():
-        request_xszykbzong(xn, xq)
+        session = session or get_session()
+        d0 = jwapi_get_semester_start_date(session, xn, xq)
 
-    with open(path) as f:
-        return XszykbzongResponse.model_validate_json(f.read())
-
-
-def request_semester_start_date(xn: str, xq: str):
-    session = get_session()
-    d0 = jwapi_get_semester_start_date(session, xn, xq)
+        if d0 is None:
+            raise JwcValueError("未找到第一周星期一的日期")
 
-    if d0 is None:
-        raise JwcValueError("未找到第一周星期一的日期")
-
-    cache_file = f"{semester_cache_dir(xn, xq)}/semester_start_date.txt"
-    with open(cache_file, "w") as f:
-        _ = f.write(d0.isoformat())
-    return d0
+        _ = write_cache_text(manager.path("start_date"), d0.isoformat())
+        manager.record("start_date")
+        return d0
 
 
 def semester_start_date(xn: str, xq: str) -> datetime.date:
     """动态获取学期开始日期"""
-    cache_file = f"{semester_cache_dir(xn, xq)}/semester_start_date.txt"
-    kb_file = f"{jwc_cache_dir()}/response-queryxszykbzong.json"
-
-    # 如果缓存存在且有效
-    if (
-        os.path.exists(cache_file)
-        and os.path.exists(kb_file)
-        and os.path.getmtime(cache_file) >= os.path.getmtime(kb_file)
-    ):
+    manager = semester_cache(xn, xq)
+    state = manager.check("start_date")
+
+    # 如果缓存存在且未超过最大时限，先使用之；若已过期或课表有变则在后台刷新
+    if state.status != "miss" and (state.age or 0.0) <= START_DATE_CACHE_MAX_STALENESS:
         try:
-            with open(cache_file) as f:
-                return datetime.date.fromisoformat(f.read().strip())
-        except:
-            pass
+            d0 = datetime.date.fromisoformat(
+                read_cache_text(manager.path("start_date")).strip()
+            )
+        except (OSError, ValueError):
+            d0 = None
+
+        if d0 is not None:
+            if state.status != "hit":
+                revalidate_in_background(
+                    f"semester_start_date-{xn}-{xq}",
+                    lambda session: request_semester_start_date(xn, xq, session),
+                )
+            return d0
 
     # 否则请求接口并缓存
     try:
@@ -179,7 +393,155 @@ def semester_start_date(xn: str, xq: str) -> datetime.date:
         return datetime.date(2025, 2, 24)
 
 
+def _snapshot_params() -> dict[str, str]:
+    # 解析逻辑随版本变化，版本不同的解析结果不可复用
+    return {"version": importlib.metadata.version("jwc")}
+
+
+def shared_render_cache() -> RenderCache:
+    """各账号共用的解析与渲染缓存，用完须 close()"""
+    return RenderCache(render_cache_path(jwc_cache_root()), _snapshot_params()["version"])
+
+
+def kb_schedule(
+    xn: str,
+    xq: str,
+    error_entries: list[ErrorEntry] | None = None,
+    parse: KbEntryParser = parse_kb_entry,
+) -> Schedule:
+    """
+    返回由课表解析得到的 Schedule；课表与学期开始日期均未变化时直接使用缓存的解析结果。
+    parse 为解析单个条目的函数，批量处理多个账号时可传入 RenderCache.parse_kb_entry。
+    """
+    kb_path = ensure_xszykbzong(xn, xq)
+    start_date = semester_start_date(xn, xq)
+
+    manager = semester_cache(xn, xq)
+    params = _snapshot_params()
+    if manager.check("snapshot", params).status == "hit":
+        try:
+            schedule, cached_errors = cast(
+                tuple[Schedule, list[ErrorEntry]],
+                pickle.loads(read_cache_bytes(manager.path("snapshot"))),
+            )
+            if schedule.start_date == start_date:
+                if error_entries is not None:
+                    error_entries += cached_errors
+                return schedule
+        except (*CACHE_READ_ERRORS, *UNPICKLE_ERRORS) as e:
+            # 缓存由旧版本写入或已损坏
+            click.secho(f"[!] 课表解析缓存无法读取，重新解析：{e}", fg="yellow")
+
+    errors: list[ErrorEntry] = []
+    with open_cache_text(kb_path) as f:
+        schedule = Schedule.from_kb_items(
+            iter_kb_entries(f), get_semester_desc_brief(xn, xq), start_date, errors, parse
+        )
+    _ = write_cache_bytes(manager.path("snapshot"), pickle.dumps((schedule, errors)))
+    manager.record("snapshot", params)
+
+    if error_entries is not None:
+        error_entries += errors
+    return schedule
+
+
+def kb_file_schedule(
+    path: str, xn: str, xq: str, error_entries: list[ErrorEntry] | None = None
+) -> Schedule:
+    """
+    由给定的课表文件（queryxszykbzong 响应，或多个响应依次排列的归档，如一个年级所有学生的课表）
+    逐条解析并合并出 Schedule，不将整个文件读入内存。
+    """
+    start_date = semester_start_date(xn, xq)
+    with open(path, encoding="utf-8") as f:
+        return Schedule.from_kb_items(
+            iter_kb_entries(f), get_semester_desc_brief(xn, xq), start_date, error_entries
+        )
+
+
+def render_kb_calendar(
+    xn: str, xq: str, schedule: Schedule, preference: JwcSchedulePreference
+) -> tuple[str, TransformationResults]:
+    """
+    将 kb_schedule 的结果渲染为 ics 文本。
+    解析结果与偏好设置均未变化且在同一天内时，直接使用缓存的渲染结果。
+    """
+    manager = semester_cache(xn, xq)
+    params = _snapshot_params() | {
+        "preference": preference.fingerprint(),
+        # 日历分类名称中含有当天日期
+        "date": datetime.date.today().isoformat(),
+    }
+    if manager.check("ics", params).status == "hit":
+        meta = manager.meta("ics") or {}
+        text = read_cache_text(manager.path("ics"), encoding="utf-8")
+        return text, TransformationResults(
+            set(meta.get("untransformed_lessons", [])),
+            set(meta.get("untransformed_labs", [])),
+            set(meta.get("untransformed_locations", [])),
+        )
+
+    calendar, transformation_results = schedule.to_ics(preference)
+    text = calendar.serialize()
+    _ = write_cache_text(manager.path("ics"), text, encoding="utf-8")
+    manager.record(
+        "ics",
+        params,
+        meta={
+            "untransformed_lessons": sorted(transformation_results.untransformed_lessons),
+            "untransformed_labs": sorted(transformation_results.untransformed_labs),
+            "untransformed_locations": sorted(
+                transformation_results.untransformed_locations
+            ),
+        },
+    )
+    return text, transformation_results
+
+
 def request_XsksByxhList(xn: str, xq: str):
+    manager = semester_cache(xn, xq)
+    with single_flight(manager.path("exams")) as leader:
+        if leader:
+            return _request_XsksByxhList(xn, xq, manager)
+
+    return XsksList.model_validate_json(read_cache_text(manager.path("exams")))
+
+
+def _exam_pages_dir(manager: CacheManager) -> str:
+    return os.path.join(manager.directory, EXAM_PAGES_DIR_NAME)
+
+
+def _load_exam_pages_checkpoint(
+    pages_dir: str, q: dict[str, str]
+) -> tuple[int, int, int]:
+    """
+    读取未完成的分页请求的进度，返回 (每页条数, 最后一页页码, 已完成的页数)。
+    没有可续传的进度时返回 (EXAM_PAGE_SIZE, 0, 0)。
+    """
+    try:
+        with open(os.path.join(pages_dir, "checkpoint.json"), encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if (
+            checkpoint["query"] != q
+            or time.time() - checkpoint["started_at"] > EXAM_PAGES_CHECKPOINT_TTL
+        ):
+            raise ValueError("checkpoint does not match")
+        page_size, last_page = int(checkpoint["page_size"]), int(checkpoint["last_page"])
+    except (OSError, ValueError, KeyError, TypeError):
+        shutil.rmtree(pages_dir, ignore_errors=True)
+        return EXAM_PAGE_SIZE, 0, 0
+
+    done = 0
+    while done < last_page and stored_path(_exam_page_path(pages_dir, done + 1)):
+        done += 1
+    return page_size, last_page, done
+
+
+def _exam_page_path(pages_dir: str, page: int) -> str:
+    return os.path.join(pages_dir, f"page-{page:04}.json")
+
+
+def _request_XsksByxhList(xn: str, xq: str, manager: CacheManager):
     session = get_session()
     q = {
         "ppylx": "",
@@ -188,29 +550,66 @@ def request_XsksByxhList(xn: str, xq: str):
         "pxq": xq,
     }
 
-    resp = request_XsksByxhList_page(session, q, 1)
-    l = resp.list
+    # 每一页到达后立即写入，中途失败时下次从最后完成的一页之后继续
+    pages_dir = _exam_pages_dir(manager)
+    page_size, last_page, done = _load_exam_pages_checkpoint(pages_dir, q)
+    if done:
+        click.echo(f"[i] 继续上次未完成的考试安排请求：已有 {done}/{last_page} 页")
+
+    if last_page == 0:
+        resp = request_XsksByxhList_page(session, q, 1, page_size)
+        # 服务器可能限制每页条数，之后的页按实际条数请求，页码才能对应
+        if resp.pageSize:
+            page_size = resp.pageSize
+        elif resp.navigateLastPage > 1:
+            page_size = len(resp.list)
+        last_page = max(resp.navigateLastPage, 1)
+
+        os.makedirs(pages_dir, exist_ok=True)
+        checkpoint = {
+            "query": q,
+            "page_size": page_size,
+            "last_page": last_page,
+            "started_at": time.time(),
+        }
+        atomic_write_text(
+            os.path.join(pages_dir, "checkpoint.json"), json.dumps(checkpoint), "utf-8"
+        )
+        _ = write_cache_text(
+            _exam_page_path(pages_dir, 1), XsksList(resp.list).model_dump_json()
+        )
+        done = 1
+
+    for i in range(done + 1, last_page + 1):
+        page = request_XsksByxhList_page(session, q, i, page_size)
+        _ = write_cache_text(
+            _exam_page_path(pages_dir, i), XsksList(page.list).model_dump_json()
+        )
 
-    # Process remaining pages
-    for i in range(2, resp.navigateLastPage + 1):
-        l += request_XsksByxhList_page(session, q, i).list
+    # 所有页都已到齐，合并为最终的缓存文件
+    l: list[XsksEntry] = []
+    for i in range(1, last_page + 1):
+        page_text = read_cache_text(_exam_page_path(pages_dir, i))
+        l += XsksList.model_validate_json(page_text).root
 
     print(f"[i] 已更新 XsksByxhList")
     # Create XsksResponse from validated entries
     all_entries = XsksList(l)
-    with open(
-        f"{semester_cache_dir(xn, xq)}/response-queryXsksByxhList.json", "w"
-    ) as file:
-        _ = file.write(all_entries.model_dump_json())
+    _ = write_cache_text(manager.path("exams"), all_entries.model_dump_json())
+    manager.record("exams")
+    shutil.rmtree(pages_dir, ignore_errors=True)
     return all_entries
 
 
 def request_XsksByxhList_page(
-    session: requests.Session, q: dict[str, str], page: int
+    session: requests.Session,
+    q: dict[str, str],
+    page: int,
+    page_size: int = EXAM_PAGE_SIZE,
 ) -> XsksByxhListResponse:
     request_data = q | {
         "pageNum": str(page),
-        "pageSize": "100",
+        "pageSize": str(page_size),
     }
 
     response = session.post(
@@ -219,7 +618,9 @@ def request_XsksByxhList_page(
         verify=False,
     )
     if not response.ok:
-        print(f"[!] 在请求 queryxszykbzong 时出错了：{response.status_code}")
+        raise JwcRequestError(
+            f"在请求 queryXsksByxhList 第{page}页时出错了：{response.status_code}"
+        )
 
     try:
         return XsksByxhListResponse.model_validate_json(response.text)
@@ -227,7 +628,7 @@ def request_XsksByxhList_page(
         click.secho(response.text, fg="yellow")
         click.secho(f"[!] ↑ 原始数据", fg="yellow")
         click.secho(
-            f"[!] request_XsksByxhList: 验证第1页考试条目时出错: {e}", fg="yellow"
+            f"[!] request_XsksByxhList: 验证第{page}页考试条目时出错: {e}", fg="yellow"
         )
         raise ValueError("由于以上错误，无法继续。请向开发者反馈此问题。")
 
@@ -238,27 +639,25 @@ def XsksByxhList(xn: str, xq: str, path: str = "", text: str = "") -> XsksList:
         return XsksList.model_validate_json(text)
 
     if path == "":
-        path = f"{semester_cache_dir(xn, xq)}/response-queryXsksByxhList.json"
-
-    def should_fetch():
-        if not os.path.isfile(path):
-            return True
-
-        now = time.time()
-        DAY = 24 * 60 * 60  # seconds
-        stale_time = now - os.path.getmtime(path)
-
-        if stale_time > 7 * DAY:
-            ans = click.prompt(  # pyright: ignore [reportAny]
-                f"[?] 缓存中的考试安排已有 {int(stale_time) // DAY} 天未更新，要重新获取吗？[Y/n]",
-                default="y",
-                type=str,
-                show_default=False,
-            )
-            return not cast(str, ans).lower().startswith("n")
+        manager = semester_cache(xn, xq)
+        path = manager.path("exams")
+        if _ask_refetch("考试安排", manager.check("exams")):
+            return request_XsksByxhList(xn, xq)
 
-    if should_fetch():
-        return request_XsksByxhList(xn, xq)
+    return XsksList.model_validate_json(read_cache_text(path))
 
-    with open(path) as f:
-        return XsksList.model_validate_json(f.read())
+
+def sync_cache_db(xn: str, xq: str) -> list[ErrorEntry]:
+    """启用了 SQLite 缓存库时，把该学期的缓存文件同步到库中"""
+    # 各账号共用缓存根目录中的同一个库
+    path = db_path(jwc_cache_root())
+    if not os.path.exists(path):
+        return []
+
+    # 只是给数据打上账号标签，不为此登录或请求服务器
+    account = current_account() or DEFAULT_ACCOUNT
+    db = CacheDB(path)
+    try:
+        return db.ingest_semester(account, xn, xq, semester_cache_dir(xn, xq))
+    finally:
+        db.close()
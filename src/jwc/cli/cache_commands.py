@@ -0,0 +1,164 @@
+"""
+jwc cache 命令组：查看各缓存产物的状态、清理旧的缓存文件，以及 SQLite 缓存库的导入与查询。
+"""
+
+import os
+
+import click
+
+from ..schedule import get_semester_description
+from . import cache
+from .cache import jwc_cache_dir
+from .common import add_semester_option, parse_semester_arg, report_semester
+
+
+@click.group(name="cache")
+def cache_group():
+    """管理缓存"""
+
+
+def _format_age(age: float | None) -> str:
+    if age is None:
+        return "-"
+    if age < 3600:
+        return f"{int(age) // 60} 分钟"
+    if age < cache.DAY:
+        return f"{age / 3600:.1f} 小时"
+    return f"{age / cache.DAY:.1f} 天"
+
+
+@cache_group.command(name="status")
+@add_semester_option
+def cache_status(semester: str | None):
+    """显示各缓存产物的命中情况与年龄"""
+    from .cache_manager import ArtifactState
+
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+
+    status_style = {
+        "hit": ("命中", "green"),
+        "expired": ("过期", "yellow"),
+        "outdated": ("上游已变", "yellow"),
+        "miss": ("缺失", "red"),
+    }
+
+    def show(state: ArtifactState, path: str):
+        label, color = status_style[state.status]
+        click.echo(f"  {state.artifact.description:<8}", nl=False)
+        click.secho(f"{label:<6}", fg=color, nl=False)
+        click.echo(f"  {_format_age(state.age):<10}  {path}")
+
+    for manager in (cache.root_cache(), cache.semester_cache(xn, xq)):
+        for state in manager.status():
+            show(state, manager.path(state.artifact.name))
+
+
+@cache_group.command(name="gc")
+@click.option("--dry-run", is_flag=True, help="只列出将被删除的项，不实际删除")
+@click.option(
+    "--max-size",
+    type=float,
+    default=None,
+    help="可淘汰的缓存（学期目录与导出的日历）总大小上限（MB）",
+)
+@click.option("--max-age", type=float, default=None, help="最长保留天数")
+@click.option("--keep-out", type=int, default=None, help="out 目录中保留的日历文件数")
+@click.option("--keep-auth-dumps", type=int, default=None, help="保留的认证错误转储数")
+def cache_gc(
+    dry_run: bool,
+    max_size: float | None,
+    max_age: float | None,
+    keep_out: int | None,
+    keep_auth_dumps: int | None,
+):
+    """清理旧的缓存文件"""
+    from .cache_gc import DAY, GcPolicy, format_size, plan_gc, run_gc
+
+    policy = GcPolicy()
+    if max_size is not None:
+        policy.max_total_bytes = int(max_size * 1024 * 1024)
+    if max_age is not None:
+        policy.max_age = max_age * DAY
+    if keep_out is not None:
+        policy.keep_out_files = keep_out
+    if keep_auth_dumps is not None:
+        policy.keep_auth_dumps = keep_auth_dumps
+
+    removals = plan_gc(jwc_cache_dir(), policy, cache.gc_protected_dirs())
+    if not removals:
+        click.echo("[i] 没有需要清理的缓存")
+        return
+
+    for r in removals:
+        click.echo(f"    {format_size(r.size):>9}  {r.path}")
+        click.secho(f"               ↳ {r.reason}", fg="cyan")
+
+    total = sum(r.size for r in removals)
+    if dry_run:
+        click.secho(
+            f"[i] 共 {len(removals)} 项，可释放 {format_size(total)}（未实际删除）",
+            fg="yellow",
+        )
+        return
+
+    freed = run_gc(removals)
+    click.secho(f"[i] 已删除 {len(removals)} 项，释放 {format_size(freed)}", fg="green")
+
+
+@cache_group.command(name="db-import")
+@click.option(
+    "--account", default=None, help="这些缓存所属的账号（学号），默认为 default"
+)
+def cache_db_import(account: str | None):
+    """将缓存目录中各学期的数据导入 SQLite 缓存库（若库不存在则创建并启用之）"""
+    from .cache_db import DEFAULT_ACCOUNT, CacheDB, db_path, migrate_from_directory
+
+    path = db_path(jwc_cache_dir())
+    db = CacheDB(path)
+    try:
+        imported = migrate_from_directory(db, jwc_cache_dir(), account or DEFAULT_ACCOUNT)
+    finally:
+        db.close()
+
+    for xn, xq in imported:
+        click.echo(f"[i] 已导入 {get_semester_description(xn, xq)}")
+    click.secho(f"[i] SQLite 缓存库：{path}", fg="green")
+    click.echo("[i] 之后每次 fetch 获取的数据也会记入该库。")
+
+
+@cache_group.command(name="history")
+@add_semester_option
+@click.option("--xn", default=None, help="只列出某学年，如 2024-2025")
+@click.option("--account", default=None, help="只列出某账号")
+@click.option("--exams", is_flag=True, help="列出考试而非课程")
+def cache_history(semester: str | None, xn: str | None, account: str | None, exams: bool):
+    """从 SQLite 缓存库中列出历史学期的课程"""
+    from .cache_db import CacheDB, db_path
+
+    path = db_path(jwc_cache_dir())
+    if not os.path.exists(path):
+        click.secho(
+            "[!] 尚未启用 SQLite 缓存库，请先运行 jwc cache db-import", fg="yellow"
+        )
+        return
+
+    xq = None
+    if semester:
+        xn, xq = parse_semester_arg(semester)
+
+    db = CacheDB(path)
+    try:
+        last_group = None
+        for row in db.courses(xn, xq, account, "EXAM" if exams else "LESSON"):
+            group = (row.account, row.xn, row.xq)
+            if group != last_group:
+                click.secho(
+                    f"[{row.account}] {get_semester_description(row.xn, row.xq)}",
+                    fg="cyan",
+                )
+                last_group = group
+            teacher = f"［{row.teacher}］" if row.teacher else ""
+            click.echo(f"    • {row.name}{teacher}")
+    finally:
+        db.close()
@@ -0,0 +1,266 @@
+"""
+可选的 SQLite 缓存库：按 (账号, 学年, 学期) 保存历次获取的原始响应、哈希、获取时间与解析结果，
+便于跨学期、跨账号地查询历史课表。
+
+缓存目录中存在 cache.sqlite3 时启用（由 `jwc cache db-import` 创建）；
+日常流程仍以缓存目录中的文件为准，每次 fetch 后把新获取的数据同步写入该库。
+"""
+
+import datetime
+import hashlib
+import locale
+import os
+import re
+import sqlite3
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from ..jwapi_model import ErrorEntry, XsksList, XszykbzongResponse
+from ..schedule import Schedule, get_semester_desc_brief
+from ..schedule_utils import ScheduledDates, ScheduleEntry, format_minutes
+from .cache_io import read_cache_bytes, stored_path
+
+DB_FILENAME = "cache.sqlite3"
+DEFAULT_ACCOUNT = "default"
+
+# 缓存目录中与数据库中 kind 列的对应
+PAYLOAD_FILES = {
+    "kb": "response-queryxszykbzong.json",
+    "exams": "response-queryXsksByxhList.json",
+    "start_date": "semester_start_date.txt",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    account TEXT NOT NULL,
+    xn TEXT NOT NULL,
+    xq TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES payloads(hash),
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (account, xn, xq, kind, hash)
+);
+CREATE INDEX IF NOT EXISTS fetches_by_time ON fetches (account, xn, xq, kind, fetched_at);
+CREATE TABLE IF NOT EXISTS entries (
+    account TEXT NOT NULL,
+    xn TEXT NOT NULL,
+    xq TEXT NOT NULL,
+    payload_hash TEXT NOT NULL REFERENCES payloads(hash),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    location TEXT NOT NULL,
+    lab_name TEXT NOT NULL,
+    day_of_week INTEGER,
+    weeks TEXT,
+    date TEXT,
+    start_time TEXT,
+    end_time TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_by_payload ON entries (payload_hash);
+CREATE INDEX IF NOT EXISTS entries_by_semester ON entries (xn, xq, kind, name);
+CREATE INDEX IF NOT EXISTS entries_by_account ON entries (account, xn, xq);
+CREATE VIEW IF NOT EXISTS latest_fetches AS
+    SELECT account, xn, xq, kind, hash, max(fetched_at) AS fetched_at
+    FROM fetches GROUP BY account, xn, xq, kind;
+"""
+
+
+@dataclass
+class CourseRow:
+    account: str
+    xn: str
+    xq: str
+    kind: str
+    name: str
+    teacher: str
+
+
+def db_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, DB_FILENAME)
+
+
+class CacheDB:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, timeout=30)
+        _ = self.conn.execute("PRAGMA journal_mode=WAL")
+        _ = self.conn.execute("PRAGMA synchronous=NORMAL")
+        _ = self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def store_payload(
+        self, account: str, xn: str, xq: str, kind: str, body: bytes, fetched_at: float
+    ) -> str:
+        """保存一次获取的原始响应，相同内容只存一份，返回其哈希"""
+        digest = hashlib.sha256(body).hexdigest()
+        with self.conn:
+            _ = self.conn.execute(
+                "INSERT OR IGNORE INTO payloads (hash, body) VALUES (?, ?)", (digest, body)
+            )
+            # 内容变回较早的版本（A→B→A）时须更新获取时间，latest_fetches 才会取到 A
+            _ = self.conn.execute(
+                """
+                INSERT INTO fetches VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (account, xn, xq, kind, hash) DO UPDATE
+                SET fetched_at = max(fetched_at, excluded.fetched_at)
+                """,
+                (account, xn, xq, kind, digest, fetched_at),
+            )
+        return digest
+
+    def store_entries(
+        self,
+        account: str,
+        xn: str,
+        xq: str,
+        payload_hash: str,
+        entries: list[ScheduleEntry],
+    ):
+        rows: list[tuple[object, ...]] = []
+        for e in entries:
+            match e.dates:
+                case ScheduledDates():
+                    day_of_week = e.dates.day_of_week
+                    weeks = ",".join(map(str, e.dates.weeks))
+                    date = None
+                case datetime.date():
+                    day_of_week = None
+                    weeks = None
+                    date = e.dates.isoformat()
+            for t0, t1 in e.time_ranges or [(None, None)]:
+                rows.append(
+                    (
+                        account,
+                        xn,
+                        xq,
+                        payload_hash,
+                        e.kind.name,
+                        e.name,
+                        e.teacher,
+                        e.location,
+                        e.lab_name,
+                        day_of_week,
+                        weeks,
+                        date,
+                        format_minutes(t0) if t0 is not None else None,
+                        format_minutes(t1) if t1 is not None else None,
+                    )
+                )
+        with self.conn:
+            _ = self.conn.execute(
+                "DELETE FROM entries WHERE account = ? AND payload_hash = ?",
+                (account, payload_hash),
+            )
+            _ = self.conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def has_entries(self, account: str, payload_hash: str) -> bool:
+        cur = self.conn.execute(
+            "SELECT 1 FROM entries WHERE account = ? AND payload_hash = ? LIMIT 1",
+            (account, payload_hash),
+        )
+        return cur.fetchone() is not None
+
+    def courses(
+        self,
+        xn: str | None = None,
+        xq: str | None = None,
+        account: str | None = None,
+        kind: str | None = "LESSON",
+    ) -> Iterator[CourseRow]:
+        """各学期最近一次获取的数据中的课程（去重）"""
+        conditions = ["1"]
+        args: list[str] = []
+        for column, value in (
+            ("e.xn", xn),
+            ("e.xq", xq),
+            ("e.account", account),
+            ("e.kind", kind),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                args.append(value)
+        cur = self.conn.execute(
+            f"""
+            SELECT DISTINCT e.account, e.xn, e.xq, e.kind, e.name, e.teacher
+            FROM entries e JOIN latest_fetches f
+                ON e.payload_hash = f.hash AND e.account = f.account
+                AND e.xn = f.xn AND e.xq = f.xq
+            WHERE {" AND ".join(conditions)}
+            ORDER BY e.account, e.xn, e.xq, e.kind, e.name
+            """,
+            args,
+        )
+        for row in cur:
+            yield CourseRow(*row)
+
+    def ingest_semester(
+        self, account: str, xn: str, xq: str, semester_dir: str
+    ) -> list[ErrorEntry]:
+        """把一个学期缓存目录中的文件同步到库中，解析尚未解析过的课表与考试数据"""
+        hashes: dict[str, str] = {}
+        bodies: dict[str, bytes] = {}
+        for kind, filename in PAYLOAD_FILES.items():
+            path = os.path.join(semester_dir, filename)
+            actual = stored_path(path)
+            if actual is None:
+                continue
+            # 库中保存解压后的内容，其哈希不随缓存目录的压缩设置改变
+            body = read_cache_bytes(path)
+            fetched_at = os.path.getmtime(actual)
+            hashes[kind] = self.store_payload(account, xn, xq, kind, body, fetched_at)
+            bodies[kind] = body
+
+        error_entries: list[ErrorEntry] = []
+        semester_desc = get_semester_desc_brief(xn, xq)
+
+        # 缓存文件以 open() 的默认编码写入
+        encoding = locale.getpreferredencoding(False)
+
+        if (
+            "kb" in hashes
+            and "start_date" in hashes
+            and not self.has_entries(account, hashes["kb"])
+        ):
+            start_date = datetime.date.fromisoformat(
+                bodies["start_date"].decode(encoding).strip()
+            )
+            kb = XszykbzongResponse.model_validate_json(bodies["kb"].decode(encoding))
+            schedule = Schedule.from_kb(kb, semester_desc, start_date, error_entries)
+            self.store_entries(account, xn, xq, hashes["kb"], schedule.entries)
+
+        if "exams" in hashes and not self.has_entries(account, hashes["exams"]):
+            exams = XsksList.model_validate_json(bodies["exams"].decode(encoding))
+            # 考试条目自带日期，不依赖学期开始日期
+            schedule = Schedule.from_xsks(
+                exams, semester_desc, datetime.date.min, error_entries
+            )
+            self.store_entries(account, xn, xq, hashes["exams"], schedule.entries)
+
+        return error_entries
+
+
+_SEMESTER_DIR_PATTERN = re.compile(r"^(\d{4}-\d{4})-([123])$")
+
+
+def migrate_from_directory(
+    db: CacheDB, cache_dir: str, account: str = DEFAULT_ACCOUNT
+) -> list[tuple[str, str]]:
+    """导入缓存目录中所有学期的数据，返回导入了的 (学年, 学期) 列表"""
+    imported: list[tuple[str, str]] = []
+    for name in sorted(os.listdir(cache_dir)):
+        m = _SEMESTER_DIR_PATTERN.match(name)
+        if m is None or not os.path.isdir(os.path.join(cache_dir, name)):
+            continue
+        xn, xq = m.groups()
+        _ = db.ingest_semester(account, xn, xq, os.path.join(cache_dir, name))
+        imported.append((xn, xq))
+    return imported
@@ -0,0 +1,225 @@
+"""
+缓存目录的清理策略：限制总大小与最长保留时间，
+out/ 中的日历与认证错误转储只保留最近若干个，学期目录按最近访问时间淘汰。
+"""
+
+import os
+import re
+import shutil
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .cache_io import LOCK_FILENAME, cache_lock
+
+DAY = 24 * 60 * 60  # seconds
+
+# 自动清理的最小间隔
+GC_INTERVAL = 1 * DAY
+GC_STAMP_FILENAME = ".last-gc"
+LAST_ACCESS_FILENAME = ".last-access"
+
+_SEMESTER_DIR_PATTERN = re.compile(r"^\d{4}-\d{4}-[123]$")
+_AUTH_DUMP_PATTERN = re.compile(r"^auth_error_.*\.pkl$")
+_PARTIAL_DIR_PREFIX = "partial-"
+
+
+@dataclass
+class GcPolicy:
+    # 可淘汰部分（未受保护的学期目录与导出的日历）的总大小上限
+    max_total_bytes: int = 200 * 1024 * 1024
+    max_age: float = 365 * DAY
+    keep_out_files: int = 30
+    keep_auth_dumps: int = 5
+    # 未完成的分页请求等临时目录的保留时长
+    max_partial_age: float = 1 * DAY
+
+
+@dataclass
+class Removal:
+    path: str
+    size: int
+    reason: str
+
+
+def _size_of(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _last_access(path: str) -> float:
+    """学期目录的最近访问时间，以其中的 .last-access 文件为准"""
+    try:
+        return os.path.getmtime(os.path.join(path, LAST_ACCESS_FILENAME))
+    except OSError:
+        return os.path.getmtime(path)
+
+
+_touched: set[str] = set()
+
+
+def forget_touched():
+    """此后每个目录的访问重新记录一次；守护进程在每条命令结束后调用"""
+    _touched.clear()
+
+
+def touch_last_access(directory: str):
+    """记录学期目录被访问，每个进程每个目录只记一次"""
+    if directory in _touched:
+        return
+    _touched.add(directory)
+    path = os.path.join(directory, LAST_ACCESS_FILENAME)
+    try:
+        with open(path, "a"):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def plan_gc(
+    cache_dir: str,
+    policy: GcPolicy,
+    protected_dirs: set[str] | None = None,
+    now: float | None = None,
+) -> list[Removal]:
+    """列出按策略应当删除的文件与目录；protected_dirs 中的学期目录（如当前学期）不会被删除"""
+    now = now or time.time()
+    protected = {os.path.abspath(d) for d in protected_dirs or set()}
+    removals: list[Removal] = []
+
+    def remove(path: str, reason: str):
+        removals.append(Removal(path, _size_of(path), reason))
+
+    # (路径, 时间) 列表，按时间从新到旧排列
+    def newest_first(
+        paths: list[str], key: Callable[[str], float] = os.path.getmtime
+    ) -> list[tuple[str, float]]:
+        return sorted(((p, key(p)) for p in paths), key=lambda x: x[1], reverse=True)
+
+    # 认证错误转储与 out/ 中的日历：只保留最近若干个，且不超过最长保留时间
+    auth_dumps = [
+        os.path.join(cache_dir, name)
+        for name in os.listdir(cache_dir)
+        if _AUTH_DUMP_PATTERN.match(name)
+    ]
+    out_dir = os.path.join(cache_dir, "out")
+    out_files = (
+        [os.path.join(out_dir, name) for name in os.listdir(out_dir)]
+        if os.path.isdir(out_dir)
+        else []
+    )
+    for paths, keep, what in (
+        (auth_dumps, policy.keep_auth_dumps, "认证错误转储"),
+        (out_files, policy.keep_out_files, "导出的日历"),
+    ):
+        for i, (path, mtime) in enumerate(newest_first(paths)):
+            if i >= keep:
+                remove(path, f"{what}只保留最近 {keep} 个")
+            elif now - mtime > policy.max_age:
+                remove(path, f"超过 {int(policy.max_age // DAY)} 天")
+
+    # 学期目录：按最近访问时间淘汰
+    semester_dirs = [
+        os.path.join(cache_dir, name)
+        for name in os.listdir(cache_dir)
+        if _SEMESTER_DIR_PATTERN.match(name)
+        and os.path.isdir(os.path.join(cache_dir, name))
+        and os.path.abspath(os.path.join(cache_dir, name)) not in protected
+    ]
+    lru = newest_first(semester_dirs, key=_last_access)
+    kept_semester_dirs: list[str] = []
+    for path, accessed in lru:
+        if now - accessed > policy.max_age:
+            remove(path, f"超过 {int(policy.max_age // DAY)} 天未使用")
+            continue
+        kept_semester_dirs.append(path)
+        for name in os.listdir(path):
+            sub = os.path.join(path, name)
+            if (
+                name.startswith(_PARTIAL_DIR_PREFIX)
+                and now - os.path.getmtime(sub) > policy.max_partial_age
+            ):
+                remove(sub, "未完成的请求已过期")
+
+    # 总大小超限时，从最久未使用的学期目录开始删，再删最旧的导出日历。
+    # 只计可淘汰的部分：缓存库、账号目录、受保护的学期目录等不会被删除，
+    # 若计入它们，一旦其本身超限，每次清理都会删光其余所有学期目录与日历
+    removed = {r.path for r in removals}
+    candidates = list(reversed(kept_semester_dirs)) + [
+        p for p, _ in reversed(newest_first(out_files)) if p not in removed
+    ]
+    sizes = {p: _size_of(p) for p in candidates}
+    total = sum(sizes.values()) - sum(
+        r.size for r in removals if os.path.dirname(r.path) in sizes
+    )
+    for path in candidates:
+        if total <= policy.max_total_bytes:
+            break
+        r = Removal(path, sizes[path], "缓存总大小超过上限")
+        removals.append(r)
+        total -= r.size
+
+    return removals
+
+
+def run_gc(removals: list[Removal]) -> int:
+    """执行删除，返回释放的字节数"""
+    freed = 0
+    for r in removals:
+        try:
+            if os.path.isdir(r.path):
+                # 持锁删除，避免删掉其他进程正在写入的学期目录；锁文件本身最后再删
+                with cache_lock(r.path):
+                    for name in os.listdir(r.path):
+                        if name == LOCK_FILENAME:
+                            continue
+                        sub = os.path.join(r.path, name)
+                        if os.path.isdir(sub):
+                            shutil.rmtree(sub)
+                        else:
+                            os.remove(sub)
+                shutil.rmtree(r.path, ignore_errors=True)
+            else:
+                os.remove(r.path)
+        except OSError:
+            continue
+        freed += r.size
+    return freed
+
+
+def maybe_collect_garbage(
+    cache_dir: str, protected_dirs: set[str] | None = None
+) -> tuple[int, int]:
+    """
+    距上次清理超过 GC_INTERVAL 时按默认策略清理一次，返回 (删除的项数, 释放的字节数)。
+    """
+    stamp = os.path.join(cache_dir, GC_STAMP_FILENAME)
+    try:
+        if time.time() - os.path.getmtime(stamp) < GC_INTERVAL:
+            return 0, 0
+    except OSError:
+        pass
+
+    with open(stamp, "a"):
+        pass
+    os.utime(stamp)
+
+    removals = plan_gc(cache_dir, GcPolicy(), protected_dirs)
+    return len(removals), run_gc(removals)
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
@@ -0,0 +1,268 @@
+"""
+缓存目录的读写与并发控制：
+原子写入（先写临时文件再改名）、可选的压缩存储，以及按目录加的跨进程咨询锁。
+"""
+
+import gzip
+import io
+import locale
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import BinaryIO, Literal, TextIO, cast
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f: BinaryIO):
+        _ = f.seek(0)
+        while True:
+            try:
+                # LK_LOCK 在重试约 10 秒后仍失败时抛出 OSError，此时继续等待
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(f: BinaryIO):
+        _ = f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(f: BinaryIO):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f: BinaryIO):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+LOCK_FILENAME = ".lock"
+
+type Compression = Literal["gzip", "zstd"]
+
+# 通过环境变量选择缓存文件的压缩方式：none（默认）、gzip 或 zstd
+COMPRESSION_ENV = "JWC_CACHE_COMPRESSION"
+COMPRESSION_SUFFIXES: dict[Compression, str] = {"gzip": ".gz", "zstd": ".zst"}
+
+# 读取（并解压）缓存文件时可能出现的错误：文件损坏、截断或缺少解压所需的库
+CACHE_READ_ERRORS: tuple[type[Exception], ...] = (OSError, EOFError, RuntimeError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+# 只能通过设置来读取 umask，故在导入时（尚无其他线程）读取一次
+_UMASK = os.umask(0o022)
+_ = os.umask(_UMASK)
+
+
+def _target_mode(path: str) -> int:
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """写入临时文件后改名为 path，读者只会看到旧文件或完整的新文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _ = f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            # mkstemp 创建的文件权限为 0600；沿用原文件的权限，新文件则同 open() 所创建的
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, text: str, encoding: str | None = None):
+    """encoding 默认与 open() 相同，即当前区域设置的首选编码"""
+    atomic_write_bytes(path, text.encode(encoding or locale.getpreferredencoding(False)))
+
+
+def configured_compression() -> Compression | None:
+    value = os.environ.get(COMPRESSION_ENV, "").strip().lower()
+    match value:
+        case "gzip" | "gz":
+            return "gzip"
+        case "zstd" | "zst":
+            # 未安装 zstandard 时退回 gzip
+            return "zstd" if zstandard is not None else "gzip"
+        case _:
+            return None
+
+
+def compress(data: bytes, method: Compression) -> bytes:
+    match method:
+        case "gzip":
+            # mtime=0 使相同内容的压缩结果相同，便于按哈希判断内容是否变化
+            return gzip.compress(data, mtime=0)
+        case "zstd":
+            if zstandard is None:
+                raise RuntimeError("需要安装 zstandard 才能使用 zstd 压缩")
+            return zstandard.ZstdCompressor().compress(data)
+
+
+def decompress(data: bytes, method: Compression) -> bytes:
+    match method:
+        case "gzip":
+            return gzip.decompress(data)
+        case "zstd":
+            if zstandard is None:
+                raise RuntimeError("需要安装 zstandard 才能读取 zstd 压缩的缓存")
+            return zstandard.ZstdDecompressor().decompress(data)
+
+
+def compression_of(path: str) -> Compression | None:
+    for method, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return method
+    return None
+
+
+def stored_path(path: str) -> str | None:
+    """缓存文件 path 实际存储的路径（可能带压缩后缀），不存在时返回 None"""
+    for candidate in (path, *(path + s for s in COMPRESSION_SUFFIXES.values())):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def write_cache_bytes(path: str, data: bytes, method: Compression | None = None) -> str:
+    """
+    按配置的压缩方式原子地写入缓存文件，并删除该文件其他压缩方式的旧副本。
+    返回实际写入的路径。
+    """
+    method = method or configured_compression()
+    target = path + COMPRESSION_SUFFIXES[method] if method else path
+    atomic_write_bytes(target, compress(data, method) if method else data)
+    for candidate in (path, *(path + s for s in COMPRESSION_SUFFIXES.values())):
+        if candidate != target:
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                pass
+    return target
+
+
+def write_cache_text(path: str, text: str, encoding: str | None = None) -> str:
+    """encoding 默认与 open() 相同，即当前区域设置的首选编码"""
+    return write_cache_bytes(
+        path, text.encode(encoding or locale.getpreferredencoding(False))
+    )
+
+
+def read_cache_bytes(path: str) -> bytes:
+    """读取缓存文件 path，如以压缩形式存储则即时解压"""
+    actual = stored_path(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    with open(actual, "rb") as f:
+        data = f.read()
+    method = compression_of(actual) if actual != path else None
+    return decompress(data, method) if method else data
+
+
+def read_cache_text(path: str, encoding: str | None = None) -> str:
+    return read_cache_bytes(path).decode(encoding or locale.getpreferredencoding(False))
+
+
+def open_stored_bytes(actual: str) -> BinaryIO:
+    """以二进制流打开实际存储的文件 actual（如 stored_path 的结果），带压缩后缀时边读边解压"""
+    match compression_of(actual):
+        case None:
+            return open(actual, "rb")
+        case "gzip":
+            return cast(BinaryIO, gzip.open(actual, "rb"))
+        case "zstd":
+            if zstandard is None:
+                raise RuntimeError("需要安装 zstandard 才能读取 zstd 压缩的缓存")
+            with ExitStack() as stack:
+                f = stack.enter_context(open(actual, "rb"))
+                # 读取器关闭时一并关闭 f；建立读取器失败时由 stack 关闭
+                raw = zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+                _ = stack.pop_all()
+            return cast(BinaryIO, raw)
+
+
+def open_cache_text(path: str, encoding: str | None = None) -> TextIO:
+    """以文本流打开缓存文件 path，如以压缩形式存储则边读边解压；用于不必整个读入内存的大文件"""
+    actual = stored_path(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    encoding = encoding or locale.getpreferredencoding(False)
+    if actual == path:
+        return open(actual, encoding=encoding)
+    return io.TextIOWrapper(open_stored_bytes(actual), encoding=encoding)
+
+
+@dataclass
+class _DirectoryLock:
+    # 进程内用可重入锁互斥，持有者首次进入时再取得跨进程的文件锁
+    rlock: threading.RLock = field(default_factory=threading.RLock)
+    depth: int = 0
+    file: BinaryIO | None = None
+
+
+_directory_locks: dict[str, _DirectoryLock] = {}
+_directory_locks_guard = threading.Lock()
+
+
+@contextmanager
+def cache_lock(directory: str) -> Iterator[None]:
+    """对缓存目录加排他锁，同一线程内可重入"""
+    key = os.path.abspath(directory)
+    with _directory_locks_guard:
+        lock = _directory_locks.setdefault(key, _DirectoryLock())
+
+    with lock.rlock:
+        if lock.depth == 0:
+            with ExitStack() as stack:
+                f = stack.enter_context(open(os.path.join(key, LOCK_FILENAME), "a+b"))
+                _lock_file(f)
+                # 加锁成功后文件留待最后一层退出时关闭
+                _ = stack.pop_all()
+            lock.file = f
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0 and lock.file is not None:
+                _unlock_file(lock.file)
+                lock.file.close()
+                lock.file = None
+
+
+@contextmanager
+def single_flight(path: str) -> Iterator[bool]:
+    """
+    对 path 所在目录加锁，以便并发的多个进程只有一个去请求服务器。
+    若等锁期间已有其他进程更新了 path，则得到 False，调用方应直接使用其结果；否则得到 True。
+    """
+    started = time.time()
+    with cache_lock(os.path.dirname(path)):
+        actual = stored_path(path)
+        updated_meanwhile = actual is not None and os.path.getmtime(actual) >= started
+        yield not updated_meanwhile
@@ -0,0 +1,187 @@
+"""
+缓存管理：每个缓存产物声明自己的输入与有效期，
+仅当产物缺失、过期或其上游产物的内容发生变化时才需要重新计算。
+"""
+
+import hashlib
+import json
+import locale
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Literal, cast
+
+from .cache_io import atomic_write_text, cache_lock, open_stored_bytes, stored_path
+
+type ArtifactStatus = Literal["hit", "miss", "expired", "outdated"]
+
+MANIFEST_FILENAME = "cache-manifest.json"
+
+
+@dataclass(frozen=True)
+class Artifact:
+    name: str
+    filename: str
+    description: str
+    # 有效期（秒），None 表示只要输入不变就一直有效
+    ttl: float | None = None
+    # 上游产物的名称，须在同一 CacheManager 中声明
+    inputs: tuple[str, ...] = ()
+
+
+@dataclass
+class ArtifactState:
+    artifact: Artifact
+    status: ArtifactStatus
+    # 距上次写入的秒数，文件不存在时为 None
+    age: float | None
+
+
+def file_digest(path: str) -> str:
+    """
+    path 为实际存储的路径；压缩存储的文件按解压后的内容计算，
+    故切换压缩方式不会改变哈希，也不会使下游产物失效
+    """
+    h = hashlib.sha256()
+    with open_stored_bytes(path) as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CacheManager:
+    """管理一个目录下的若干缓存产物，依赖信息记录在该目录的清单文件中"""
+
+    def __init__(self, directory: str, artifacts: list[Artifact]):
+        self.directory = directory
+        self.artifacts = {a.name: a for a in artifacts}
+        self.manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+        self._manifest: dict[str, dict[str, Any]] | None = None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, self.artifacts[name].filename)
+
+    def _load_manifest(self) -> dict[str, dict[str, Any]]:
+        """读取清单；清单不存在或已损坏时视为空"""
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    manifest: object = json.load(f)
+            except (OSError, ValueError):
+                manifest = None
+            self._manifest = (
+                cast(dict[str, dict[str, Any]], manifest)
+                if isinstance(manifest, dict)
+                else {}
+            )
+        return self._manifest
+
+    def _update_record(self, name: str, record: dict[str, Any]):
+        """重新读取清单后只改动一条记录再写回，以免覆盖他处对其他记录的更新"""
+        with cache_lock(self.directory):
+            self._manifest = None
+            manifest = self._load_manifest()
+            manifest[name] = record
+            atomic_write_text(
+                self.manifest_path,
+                json.dumps(manifest, ensure_ascii=False, indent=1),
+                encoding="utf-8",
+            )
+
+    def current_hash(self, name: str) -> str | None:
+        """
+        取产物当前内容的哈希，文件不存在时返回 None。
+        文件修改时间与清单一致时直接用清单中的记录，否则重新计算（并补记到清单）。
+        """
+        path = stored_path(self.path(name))
+        if path is None:
+            return None
+        mtime = os.path.getmtime(path)
+
+        record = self._load_manifest().get(name)
+        if record is not None and record.get("mtime") == mtime:
+            return record["hash"]
+
+        # 清单外写入的文件（如旧版本留下的缓存），视作没有已知输入的新产物
+        digest = file_digest(path)
+        self._update_record(name, {"hash": digest, "mtime": mtime, "inputs": None})
+        return digest
+
+    def check(self, name: str, params: dict[str, str] | None = None) -> ArtifactState:
+        """
+        检查产物状态。
+        params 为产物除上游产物外的其他决定因素（如偏好设置指纹），为 None 时不比较。
+        """
+        artifact = self.artifacts[name]
+        path = stored_path(self.path(name))
+        if path is None:
+            return ArtifactState(artifact, "miss", None)
+
+        age = time.time() - os.path.getmtime(path)
+        _ = self.current_hash(name)
+        record = self._load_manifest()[name]
+
+        recorded_inputs: dict[str, str | None] | None = record.get("inputs")
+        if artifact.inputs:
+            current_inputs = {i: self.current_hash(i) for i in artifact.inputs}
+            if recorded_inputs != current_inputs:
+                return ArtifactState(artifact, "outdated", age)
+        if params is not None and record.get("params") != params:
+            return ArtifactState(artifact, "outdated", age)
+
+        if artifact.ttl is not None and age > artifact.ttl:
+            return ArtifactState(artifact, "expired", age)
+        return ArtifactState(artifact, "hit", age)
+
+    def record(
+        self,
+        name: str,
+        params: dict[str, str] | None = None,
+        meta: dict[str, Any] | None = None,
+        validated: bool = False,
+    ):
+        """
+        在产物写入后调用，记录其内容哈希与当时各输入的哈希。
+        validated 表示写入的内容已通过完整校验，之后读取时可以走 read_validated 的快速路径。
+        """
+        artifact = self.artifacts[name]
+        path = stored_path(self.path(name))
+        if path is None:
+            raise FileNotFoundError(self.path(name))
+        inputs = {i: self.current_hash(i) for i in artifact.inputs}
+        self._update_record(
+            name,
+            {
+                "hash": file_digest(path),
+                "mtime": os.path.getmtime(path),
+                "inputs": inputs,
+                "params": params,
+                "meta": meta,
+                "validated": validated,
+            },
+        )
+
+    def read_validated(self, name: str) -> str | None:
+        """
+        若产物写入时已通过校验，且内容哈希与记录一致，则返回其文本，否则返回 None。
+        文本编码与 open() 的默认值一致。
+        """
+        record = self._load_manifest().get(name)
+        path = stored_path(self.path(name))
+        if record is None or not record.get("validated") or path is None:
+            return None
+        try:
+            with open_stored_bytes(path) as f:
+                data = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != record["hash"]:
+            return None
+        return data.decode(locale.getpreferredencoding(False))
+
+    def meta(self, name: str) -> dict[str, Any] | None:
+        record = self._load_manifest().get(name)
+        return record.get("meta") if record is not None else None
+
+    def status(self) -> list[ArtifactState]:
+        return [self.check(name) for name in self.artifacts]
@@ -0,0 +1,151 @@
+"""
+各命令共用的选项与辅助函数：学期与偏好设置选项的解析、偏好设置的载入，以及课表、考试日历的写出。
+"""
+
+import os
+import re
+from pathlib import Path
+
+import click
+from click.decorators import FC
+
+from ..jwapi_model import ErrorEntry
+from ..rules import RuleProblem
+from ..schedule import (
+    Schedule,
+    get_calendar_name,
+    get_semester_desc_brief,
+    get_semester_description,
+)
+from ..schedule_preference import JwcSchedulePreference
+from ..schedule_preset_trules import (
+    T_LAB_RULES_RAW,
+    T_LESSON_RULES_RAW,
+    T_LOCATION_RULES_RAW,
+    TransformationResults,
+)
+from ..schedule_utils import EXAM
+from . import cache
+from .share import resolve_calendar_output_path, write_calendar_file
+
+
+def load_schedule_preferences(preference_file: str | None) -> JwcSchedulePreference:
+    if not preference_file:
+        preference_file = cache.jwc_cache_dir() + "/schedule-preference.yaml"
+        if not os.path.exists(preference_file):
+            return JwcSchedulePreference()
+
+    from pydantic_yaml import parse_yaml_file_as
+
+    return parse_yaml_file_as(JwcSchedulePreference, preference_file)
+
+
+def load_schedule_preferences_with_preset(
+    preference_file: str | None, no_preset_rules: bool
+) -> JwcSchedulePreference:
+    from .preference_cache import load_cached_preference
+
+    if not preference_file:
+        default_file = cache.jwc_cache_dir() + "/schedule-preference.yaml"
+        preference_file = default_file if os.path.exists(default_file) else None
+
+    def build():
+        preference = load_schedule_preferences(preference_file)
+        # 只检查偏好设置文件中的规则（预置规则不必检查）
+        problems = preference.lint()
+        if not no_preset_rules:
+            preference.merge_with_preset_rules(
+                T_LESSON_RULES_RAW, T_LAB_RULES_RAW, T_LOCATION_RULES_RAW
+            )
+        return preference, problems
+
+    preference, problems = load_cached_preference(preference_file, no_preset_rules, build)
+    report_rule_problems(problems)
+    return preference
+
+
+def report_rule_problems(problems: list[RuleProblem]):
+    for problem in problems:
+        color = "red" if problem.severity == "error" else "yellow"
+        click.secho(f"[!] 偏好设置 {problem.describe()}", fg=color)
+
+
+def parse_semester_arg(s: str) -> tuple[str, str]:
+    """解析命令行中的学期选项，返回 (学年, 学期) 元组"""
+    match = re.match(r"^(\d+)(sp|su|au|fa|[afs春夏秋])?", s.lower())
+    if not match:
+        raise ValueError(f"无效的学期格式: {s}")
+
+    year_part, season_part = match.groups()
+    base_year_raw = int(year_part)
+    if base_year_raw < 100:
+        base_year = 2000 + int(year_part)
+    else:
+        base_year = base_year_raw
+
+    # Determine season
+    if season_part in {"春", "sp", "s"}:
+        xq = "2"
+        xn = f"{base_year - 1}-{base_year}"
+    elif season_part in {"夏", "su"}:
+        xq = "3"
+        xn = f"{base_year - 1}-{base_year}"
+    elif season_part in {"秋", "f", "au", "fa"} or season_part is None:  # Default to fall
+        xq = "1"
+        xn = f"{base_year}-{base_year + 1}"
+    else:
+        raise ValueError(f"未知的季节标识: {season_part}")
+
+    return (xn, xq)
+
+
+def add_semester_option(func: FC) -> FC:
+    return click.option("-s", "semester", help="指定学期，格式如 24秋/25s/2025夏")(func)
+
+
+def add_schedule_preference_options(f: FC) -> FC:
+    # fmt: off
+    f = click.option("--preference-file", "-p", default=None, help="指定偏好设置文件路径")(f)
+    f = click.option("--no-preset-rules", is_flag=True, help="不使用预置转换规则")(f)
+    # fmt: on
+    return f
+
+
+def report_semester(xn: str, xq: str):
+    click.secho(f"[i] 当前学期：{get_semester_description(xn, xq)}", fg="cyan")
+    click.echo("[i] 若要使用不同的学期，请更改命令行参数。")
+
+
+def write_kb_calendar(
+    xn: str,
+    xq: str,
+    schedule: Schedule,
+    preference: JwcSchedulePreference,
+    out_file: str | None = None,
+) -> tuple[Path, TransformationResults]:
+    ics_text, transformation_results = cache.render_kb_calendar(
+        xn, xq, schedule, preference
+    )
+    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq))
+    ics_filename = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
+    return write_calendar_file(ics_filename, ics_text), transformation_results
+
+
+def exam_schedule(xn: str, xq: str, error_entries: list[ErrorEntry]) -> Schedule:
+    data = cache.XsksByxhList(xn, xq)
+    start_date = cache.semester_start_date(xn, xq)
+    semester_desc = get_semester_desc_brief(xn, xq)
+    return Schedule.from_xsks(data, semester_desc, start_date, error_entries)
+
+
+def write_exam_calendar(
+    xn: str,
+    xq: str,
+    schedule: Schedule,
+    preference: JwcSchedulePreference,
+    out_file: str | None = None,
+) -> tuple[Path, TransformationResults]:
+    calendar, transformation_results = schedule.to_ics(preference)
+    calendar_name = get_calendar_name(get_semester_desc_brief(xn, xq), EXAM)
+    ics_filename = resolve_calendar_output_path(out_file, f"{calendar_name}.ics")
+    return write_calendar_file(ics_filename, calendar.serialize()), transformation_results
@@ -0,0 +1,374 @@
+"""
+常驻的守护进程：预先导入各模块并保持一个已验证的登录会话，
+在 Unix 套接字上执行由 jwc.cli_entry 转发来的命令。
+各连接在各自的线程中处理，但命令会替换标准输入输出、环境变量与工作目录，同一时间只能执行一条；
+忙碌时回复 {"busy": true}，客户端改在本进程中执行。
+"""
+
+import importlib
+import io
+import os
+import select
+import socket
+import sys
+import threading
+import traceback
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any, cast
+
+import click
+import requests
+from click import termui
+
+from ..cli_entry import (
+    FORWARDED_ENV_PREFIX,
+    LOCAL_COMMANDS,
+    command_name,
+    connect_daemon,
+    daemon_socket_path,
+    daemon_supported,
+    receive_message,
+    send_message,
+    send_request,
+)
+from ..jwapi_common import heartbeat
+from .cache import finish_background_refreshes
+from .cache_gc import forget_touched
+from .fetch import load_session, use_account
+
+# 启动时预先导入的较重的模块
+WARM_MODULES = (
+    "ics",
+    "openpyxl",
+    "xlrd",
+    "odf.opendocument",
+    "pydantic_yaml",
+    "jwc.phxp",
+    "jwc.schedule",
+    "jwc.schedule_preset_trules",
+)
+
+# 每隔多少秒发一次心跳以保持会话有效
+SESSION_CHECK_INTERVAL = 10 * 60
+# 客户端连接后须在此时间内发来请求
+REQUEST_TIMEOUT = 10.0
+# 等待客户端回答提问（或提供标准输入）的时间上限，超时视作输入结束
+INPUT_TIMEOUT = 10 * 60
+
+
+class WarmSession:
+    """守护进程持有的登录会话，定期心跳检查，失效后重新载入已保存的会话"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+
+    def get(self) -> requests.Session | None:
+        with self._lock:
+            if self._session is None:
+                self._session = load_session()
+            return self._session
+
+    def check(self):
+        with self._lock:
+            if self._session is not None and not heartbeat(self._session):
+                self._session = None
+
+    def keep_alive(self, stop: threading.Event):
+        while not stop.wait(SESSION_CHECK_INTERVAL):
+            try:
+                self.check()
+            except requests.RequestException:
+                continue
+
+
+def _warm_up():
+    for name in WARM_MODULES:
+        try:
+            _ = importlib.import_module(name)
+        except ImportError:
+            continue
+
+
+class _MessageWriter(io.RawIOBase):
+    """把写入的内容作为 {key: 文本} 消息发给客户端"""
+
+    def __init__(self, f: io.BufferedIOBase, key: str):
+        self._f = f
+        self._key = key
+
+    @property
+    def name(self) -> str:
+        # io.TextIOWrapper 要求被包装的流有 name
+        return f"<{self._key}>"
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        data = bytes(b)
+        send_message(self._f, {self._key: data.decode("utf-8", "replace")})
+        return len(data)
+
+
+class _MessageReader(io.RawIOBase):
+    """每次读取时向客户端要一行输入"""
+
+    def __init__(self, f: io.BufferedIOBase):
+        self._f = f
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if not self._pending:
+            self._pending = _request_input(self._f).encode("utf-8")
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def _request_input(f: io.BufferedIOBase, hidden: bool = False, prompt: str = "") -> str:
+    """向客户端要一行输入，输入结束时返回空字符串"""
+    try:
+        send_message(f, {"read": True, "hidden": hidden, "prompt": prompt})
+        return receive_message(f)["data"]
+    except TimeoutError:
+        return ""
+
+
+@contextmanager
+def _isolated(f: io.BufferedIOBase, request: dict[str, Any]) -> Generator[None]:
+    """在客户端的工作目录与 JWC_* 环境变量下执行，标准输入输出经由连接 f 与客户端交互"""
+    env: dict[str, str | None] = {
+        k: None for k in os.environ if k.startswith(FORWARDED_ENV_PREFIX)
+    }
+    env.update(request["env"])
+    old_env = {k: os.environ.get(k) for k in env}
+    old_cwd = os.getcwd()
+    old_streams = sys.stdin, sys.stdout, sys.stderr
+    old_hidden_prompt_func = termui.hidden_prompt_func
+
+    def hidden_input(prompt: str = "") -> str:
+        data = _request_input(f, hidden=True, prompt=prompt)
+        if not data:
+            raise EOFError()
+        return data.rstrip("\r\n")
+
+    def set_env(values: dict[str, str | None]):
+        for k, v in values.items():
+            if v is None:
+                _ = os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    set_env(env)
+    os.chdir(request["cwd"])
+    sys.stdin = io.TextIOWrapper(io.BufferedReader(_MessageReader(f)), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(
+        _MessageWriter(f, "stdout"), encoding="utf-8", write_through=True
+    )
+    sys.stderr = io.TextIOWrapper(
+        _MessageWriter(f, "stderr"),
+        encoding="utf-8",
+        errors="backslashreplace",
+        write_through=True,
+    )
+    termui.hidden_prompt_func = hidden_input
+    try:
+        yield
+    finally:
+        termui.hidden_prompt_func = old_hidden_prompt_func
+        sys.stdin, sys.stdout, sys.stderr = old_streams
+        os.chdir(old_cwd)
+        set_env(old_env)
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    click.echo(e.code, err=True)
+    return 1
+
+
+def run_forwarded(
+    cli: click.Group,
+    f: io.BufferedIOBase,
+    request: dict[str, Any],
+    session: requests.Session | None,
+) -> int:
+    """如同在客户端中运行一次 jwc 一样执行命令，返回其退出码"""
+    try:
+        with _isolated(f, request), use_account(None, session):
+            try:
+                cli.main(
+                    request["argv"],
+                    prog_name="jwc",
+                    standalone_mode=True,
+                    color=request["color"],
+                )
+            except SystemExit as e:
+                return _exit_code(e)
+            except Exception as e:  # noqa: BLE001
+                # 如同独立运行时未捕获的异常：输出回溯并以 1 退出，守护进程继续服务
+                click.echo("".join(traceback.format_exception(e)), err=True, nl=False)
+                return 1
+            finally:
+                # 在输出仍转发给客户端时等待后台刷新，以报告其中的失败
+                finish_background_refreshes()
+            return 0
+    finally:
+        # 使下一条命令如同在新进程中运行；载入的偏好设置以文件内容为键，可以保留
+        forget_touched()
+
+
+def _handle(
+    cli: click.Group, conn: socket.socket, session: WarmSession, busy: threading.Lock
+) -> bool:
+    """处理一个连接上的请求，收到退出请求时（等正在执行的命令结束后）返回 False"""
+    conn.settimeout(REQUEST_TIMEOUT)
+    with conn.makefile("rwb") as f:
+        request = receive_message(f)
+        if request.get("stop"):
+            with busy:
+                send_message(f, {"ok": True})
+            return False
+        if command_name(request["argv"]) in LOCAL_COMMANDS:
+            # 较旧的客户端可能转发这些命令
+            send_message(f, {"stderr": "[!] 守护进程不执行长时间运行的命令\n"})
+            send_message(f, {"exit_code": 1})
+            return True
+        if not busy.acquire(blocking=False):
+            send_message(f, {"busy": True})
+            return True
+        try:
+            conn.settimeout(INPUT_TIMEOUT)
+            exit_code = run_forwarded(cli, f, request, session.get())
+            send_message(f, {"exit_code": exit_code})
+        finally:
+            busy.release()
+    return True
+
+
+def _handle_in_thread(
+    cli: click.Group,
+    conn: socket.socket,
+    session: WarmSession,
+    busy: threading.Lock,
+    wake: socket.socket,
+):
+    with conn:
+        try:
+            if not _handle(cli, conn, session, busy):
+                # 唤醒 serve 中等待连接的主线程，使其退出
+                wake.send(b"\0")
+        except (OSError, ValueError):
+            # 客户端中途断开或请求格式有误，不影响之后的请求
+            pass
+
+
+def serve(cli: click.Group):
+    path = daemon_socket_path()
+    _warm_up()
+    session = WarmSession()
+    if session.get() is None:
+        click.secho(
+            "[!] 没有可用的登录会话，需要登录的命令将在守护进程中失败；"
+            "请先运行 jwc fetch 登录",
+            fg="yellow",
+        )
+
+    if os.path.exists(path):
+        # 遗留的套接字文件（上次未正常退出），或已有守护进程在运行
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            probe.close()
+            click.secho("[!] 守护进程已在运行", fg="yellow")
+            return
+        except OSError:
+            probe.close()
+            os.remove(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stop = threading.Event()
+    busy = threading.Lock()
+    wake_r, wake_w = socket.socketpair()
+    try:
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen()
+        threading.Thread(
+            target=session.keep_alive, args=(stop,), name="jwc-keep-alive", daemon=True
+        ).start()
+        click.secho(f"[i] 守护进程已启动：{path}", fg="green")
+        click.echo(
+            f"[i] 除 {'、'.join(sorted(LOCAL_COMMANDS))} 外的 jwc 命令将交给它执行"
+        )
+
+        while True:
+            ready, _, _ = select.select([server, wake_r], [], [])
+            if wake_r in ready:
+                break
+            conn, _ = server.accept()
+            threading.Thread(
+                target=_handle_in_thread,
+                args=(cli, conn, session, busy, wake_w),
+                name="jwc-connection",
+                daemon=True,
+            ).start()
+    except KeyboardInterrupt:
+        click.echo()
+    finally:
+        stop.set()
+        server.close()
+        wake_r.close()
+        wake_w.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    click.echo("[i] 守护进程已退出")
+
+
+@click.group(name="daemon")
+def daemon_group():
+    """【守护进程】常驻后台，省去每次运行 jwc 时导入模块与载入会话的开销"""
+
+
+@daemon_group.command(name="start")
+@click.pass_context
+def daemon_start(ctx: click.Context):
+    """在前台运行守护进程（可用 & 或服务管理器放到后台），按 ^C 退出"""
+    if not daemon_supported():
+        click.secho("[!] 当前平台不支持 Unix 套接字，无法使用守护进程", fg="red")
+        return
+    # 守护进程执行的是完整的 jwc 命令，故交给它根命令组
+    serve(cast(click.Group, ctx.find_root().command))
+
+
+@daemon_group.command(name="stop")
+def daemon_stop():
+    """让正在运行的守护进程退出"""
+    sock = connect_daemon()
+    if sock is None:
+        click.echo("[i] 守护进程没有在运行")
+        return
+    _ = send_request(sock, {"stop": True})
+    click.secho("[i] 守护进程已退出", fg="green")
+
+
+@daemon_group.command(name="status")
+def daemon_status():
+    """显示守护进程是否在运行"""
+    sock = connect_daemon()
+    if sock is None:
+        click.echo("[i] 守护进程没有在运行")
+        return
+    sock.close()
+    click.secho(f"[i] 守护进程正在运行：{daemon_socket_path()}", fg="green")
@@ -1,18 +1,76 @@
 import importlib.metadata
 import os
 import pickle
-import time
 import platform
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 import requests
-
 from idshit.cli_login import LoginCliConfig, LoginSessionManager, SessionCache
 
 from jwc.jwapi_common import heartbeat
 
+from .cache_io import atomic_write_bytes
 
 JW_CAS_SERVICE = "http://jw.hitsz.edu.cn/casLogin"
 
+_ACCOUNT_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# 当前使用的账号（None 为默认账号）及账号池为其预先载入的会话，
+# 仅在 use_account() 的作用范围内（按线程）生效
+_current_account: ContextVar[str | None] = ContextVar("jwc_account", default=None)
+_pooled_session: ContextVar[requests.Session | None] = ContextVar(
+    "jwc_pooled_session", default=None
+)
+# 为 True 时，get_session() 首次得到的会话在 reuse_session() 的作用范围内一直复用
+_reuse_session: ContextVar[bool] = ContextVar("jwc_reuse_session", default=False)
+
+
+def is_valid_account(account: str) -> bool:
+    return _ACCOUNT_PATTERN.match(account) is not None
+
+
+def current_account() -> str | None:
+    return _current_account.get()
+
+
+@contextmanager
+def use_account(
+    account: str | None, session: requests.Session | None = None
+) -> Iterator[None]:
+    """
+    在当前线程中切换到 account：其登录会话与缓存目录均与其他账号隔离。
+    给出 session 时，get_session() 直接返回它而不再登录。
+    """
+    if account is not None and not is_valid_account(account):
+        raise ValueError(f"无效的账号：{account!r}")
+    account_token = _current_account.set(account)
+    session_token = _pooled_session.set(session)
+    try:
+        yield
+    finally:
+        _pooled_session.reset(session_token)
+        _current_account.reset(account_token)
+
+
+@contextmanager
+def reuse_session() -> Iterator[None]:
+    """
+    作用范围内首次需要会话时才登录（或载入保存的会话），之后的请求都复用它，
+    而不是每次请求都重新载入、校验会话。都命中缓存时不会登录。
+    """
+    reuse_token = _reuse_session.set(True)
+    session_token = _pooled_session.set(_pooled_session.get())
+    try:
+        yield
+    finally:
+        _pooled_session.reset(session_token)
+        _reuse_session.reset(reuse_token)
+
 
 def get_session_cache_path() -> str:
     """获取 session 缓存文件路径"""
@@ -33,8 +91,7 @@ def dump_auth_error(session: requests.Session, res: requests.Response) -> None:
         "time": time.time(),
     }
     filename = f"auth_error_{time.time()}.pkl"
-    with open(os.path.join(cache_dir, filename), "wb") as f:
-        pickle.dump(dump_info, f)
+    atomic_write_bytes(os.path.join(cache_dir, filename), pickle.dumps(dump_info))
 
 
 def _accept_login_response(response: requests.Response) -> bool:
@@ -43,58 +100,82 @@ def _accept_login_response(response: requests.Response) -> bool:
 
 _USER_AGENT = f"Zjl37/jwc.py/{importlib.metadata.version('jwc')} ({requests.utils.default_user_agent()}, {platform.system()} {platform.machine()})"
 
-_LOGIN_MANAGER = LoginSessionManager(
-    LoginCliConfig(
-        service=JW_CAS_SERVICE,
-        session_cache_path=get_session_cache_path,
-        validate_session=heartbeat,
-        dump_auth_error=dump_auth_error,
-        accept_login_response=_accept_login_response,
-        target_name="本研教学管理与服务平台",
-        username_prompt="请输入用户名（学号）",
-        mfa_username_prompt="请输入用户名（学号，用于发送验证码）",
-        allow_cookie_login=True,
-        autologin_success_message="[i] 统一身份认证：7天免登录成功",
-        user_agent_factory=lambda: _USER_AGENT,
+
+def _create_login_manager() -> LoginSessionManager:
+    # 会话缓存路径在调用时求值；各账号的管理器只在该账号的作用范围内使用，故路径随账号而定
+    return LoginSessionManager(
+        LoginCliConfig(
+            service=JW_CAS_SERVICE,
+            session_cache_path=get_session_cache_path,
+            validate_session=heartbeat,
+            dump_auth_error=dump_auth_error,
+            accept_login_response=_accept_login_response,
+            target_name="本研教学管理与服务平台",
+            username_prompt="请输入用户名（学号）",
+            mfa_username_prompt="请输入用户名（学号，用于发送验证码）",
+            allow_cookie_login=True,
+            autologin_success_message="[i] 统一身份认证：7天免登录成功",
+            user_agent_factory=lambda: _USER_AGENT,
+        )
     )
-)
+
+
+_LOGIN_MANAGER = _create_login_manager()
+_account_login_managers: dict[str, LoginSessionManager] = {}
+_account_login_managers_guard = threading.Lock()
+
+
+def _login_manager() -> LoginSessionManager:
+    account = current_account()
+    if account is None:
+        return _LOGIN_MANAGER
+    with _account_login_managers_guard:
+        if account not in _account_login_managers:
+            _account_login_managers[account] = _create_login_manager()
+        return _account_login_managers[account]
 
 
 def save_session(session: requests.Session) -> None:
-    _LOGIN_MANAGER.save_session(session)
+    _login_manager().save_session(session)
 
 
 def load_session() -> requests.Session | None:
-    return _LOGIN_MANAGER.load_session()
+    return _pooled_session.get() or _login_manager().load_session()
 
 
 def clear_session_cache() -> None:
-    _LOGIN_MANAGER.clear_session_cache()
+    _login_manager().clear_session_cache()
 
 
 def ask_save_session(session: requests.Session) -> None:
-    _LOGIN_MANAGER.ask_save_session(session)
+    _login_manager().ask_save_session(session)
 
 
 def cli_auth_cookie(session: requests.Session) -> None:
-    _LOGIN_MANAGER.cli_inject_cookie(session)
+    _login_manager().cli_inject_cookie(session)
 
 
 def cli_auth_idshit_mfa(session: requests.Session, username: str | None = None) -> None:
-    _LOGIN_MANAGER.cli_auth_mfa(session, username)
+    _login_manager().cli_auth_mfa(session, username)
 
 
 def cli_auth_idshit_pwd(
     session: requests.Session, form_info: dict[str, str] | None = None
 ) -> None:
-    _LOGIN_MANAGER.cli_auth_pwd(session, form_info=form_info)
+    _login_manager().cli_auth_pwd(session, form_info=form_info)
 
 
 def cli_auth_qr(
     session: requests.Session, form_info: dict[str, str] | None = None
 ) -> None:
-    _LOGIN_MANAGER.cli_auth_qr(session, form_info=form_info)
+    _login_manager().cli_auth_qr(session, form_info=form_info)
 
 
 def get_session(force: bool = False) -> requests.Session:
-    return _LOGIN_MANAGER.get_session(force=force)
+    session = _pooled_session.get()
+    if session is not None and not force:
+        return session
+    session = _login_manager().get_session(force=force)
+    if _reuse_session.get():
+        _ = _pooled_session.set(session)
+    return session
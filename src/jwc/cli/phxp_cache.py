@@ -1,16 +1,37 @@
 import os
+
+from ..phxp.api_model import PhxpBriefResponse, PhxpResponse
 from .cache import jwc_cache_dir
-from ..phxp.api_model import PhxpResponse
+from .cache_manager import Artifact, CacheManager
+
+PHXP_ARTIFACTS = [
+    Artifact("lab_courses", "response-LoadUsedLabCourses.json", "大物实验选课"),
+]
+
 
+def phxp_cache() -> CacheManager:
+    return CacheManager(f"{jwc_cache_dir()}/phxp", PHXP_ARTIFACTS)
 
-def LoadUsedLabCourses(path: str | None = None) -> PhxpResponse:
+
+def LoadUsedLabCourses(path: str | None = None) -> PhxpResponse | PhxpBriefResponse:
+    manager = None
     if path is None:
-        path = f"{jwc_cache_dir()}/phxp/response-LoadUsedLabCourses.json"
+        manager = phxp_cache()
+        path = manager.path("lab_courses")
     if not os.path.isfile(path):
         print(
             f"[!] LoadUsedLabCourses 缓存文件不存在。请手动将该请求的响应内容存入 {path} 文件。"
         )
         exit(1)
 
+    if manager is not None:
+        # 该文件由用户手动放入，首次读取时完整校验；之后内容未变，则只解析用到的字段
+        text = manager.read_validated("lab_courses")
+        if text is not None:
+            return PhxpBriefResponse.model_validate_json(text)
+
     with open(path) as json_file:
-        return PhxpResponse.model_validate_json(json_file.read())
+        data = PhxpResponse.model_validate_json(json_file.read())
+    if manager is not None:
+        manager.record("lab_courses", validated=True)
+    return data
@@ -0,0 +1,112 @@
+"""
+编译后的偏好设置缓存。以偏好设置文件内容的哈希、预置规则的版本、是否使用预置规则
+及编译规则所用的正则模块（规则检查结果与之有关）为键，
+保存校验并合并了预置规则的 JwcSchedulePreference 及其规则检查结果（pickle），
+再次载入时省去导入 pydantic_yaml、解析 YAML 与检查规则；
+同一进程中再次载入时直接返回内存中的对象，其预编译的规则（CompiledPreferenceRules）也随之保留。
+"""
+
+import hashlib
+import importlib.metadata
+import os
+import pickle
+from collections.abc import Callable
+from functools import cache
+from typing import cast
+
+from ..rules import RuleProblem, compile_engine
+from ..schedule_preference import JwcSchedulePreference
+from ..schedule_preset_trules import (
+    T_LAB_RULES_RAW,
+    T_LESSON_RULES_RAW,
+    T_LOCATION_RULES_RAW,
+)
+from .cache import UNPICKLE_ERRORS, jwc_cache_root
+from .cache_io import CACHE_READ_ERRORS, read_cache_bytes, write_cache_bytes
+
+COMPILED_PREFERENCES_DIR_NAME = "compiled-preferences"
+# 缓存格式的版本。JwcSchedulePreference、CompiledPreferenceRules 或 RulePattern 的结构改变时
+# 须加一，使旧的缓存失效（开发中的版本号不会随之改变）
+CACHE_FORMAT = 3
+# 内存中至多保留几份偏好设置
+MAX_LOADED = 8
+
+type CachedPreference = tuple[JwcSchedulePreference, list[RuleProblem]]
+
+# 键为缓存键，值为已载入的偏好设置及其规则检查结果；按最近使用的顺序排列
+_loaded: dict[str, CachedPreference] = {}
+
+
+@cache
+def preset_rules_version() -> str:
+    raw = repr((T_LESSON_RULES_RAW, T_LAB_RULES_RAW, T_LOCATION_RULES_RAW))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@cache
+def _package_version() -> str:
+    # 偏好设置的数据结构随版本变化
+    return importlib.metadata.version("jwc")
+
+
+def preference_cache_key(content: bytes | None, no_preset_rules: bool) -> str:
+    """content 为偏好设置文件的内容，使用默认设置时为 None"""
+    parts = [
+        _package_version(),
+        str(CACHE_FORMAT),
+        "no-preset" if no_preset_rules else preset_rules_version(),
+        "default" if content is None else hashlib.sha256(content).hexdigest(),
+        compile_engine(),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _unpickle(data: bytes) -> CachedPreference | None:
+    try:
+        cached = pickle.loads(data)
+    except UNPICKLE_ERRORS:
+        return None
+    match cached:
+        case (JwcSchedulePreference() as preference, list()):
+            return preference, cast(list[RuleProblem], cached[1])
+        case _:
+            return None
+
+
+def load_cached_preference(
+    preference_file: str | None,
+    no_preset_rules: bool,
+    build: Callable[[], CachedPreference],
+) -> CachedPreference:
+    """
+    preference_file 为 None 时使用默认设置；缓存未命中时调用 build 解析偏好设置文件、检查规则并合并预置规则。
+    返回偏好设置及其规则检查结果，二者由同一进程中的各次载入共用，调用方不应修改。
+    """
+    content = None
+    if preference_file is not None:
+        with open(preference_file, "rb") as f:
+            content = f.read()
+    key = preference_cache_key(content, no_preset_rules)
+
+    cached = _loaded.pop(key, None)
+    if cached is None:
+        path = os.path.join(
+            jwc_cache_root(), COMPILED_PREFERENCES_DIR_NAME, f"{key}.pickle"
+        )
+        try:
+            data = read_cache_bytes(path)
+        except CACHE_READ_ERRORS:
+            data = b""
+        cached = _unpickle(data)
+        if cached is None:
+            # 没有缓存，或缓存损坏、由不兼容的版本写入，重新生成
+            cached = build()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _ = write_cache_bytes(path, pickle.dumps(cached))
+        # 预编译的规则不写入缓存文件，只随内存中的对象保留
+        _ = cached[0].compiled()
+
+    _loaded[key] = cached
+    while len(_loaded) > MAX_LOADED:
+        del _loaded[next(iter(_loaded))]
+    return cached
@@ -0,0 +1,90 @@
+"""
+对教务系统的请求限速：令牌桶的状态保存在缓存目录中并加锁读写，
+因此同时运行的多个进程、多个线程共用同一个速率上限。
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache_io import atomic_write_text, cache_lock
+
+JW_HOST = "jw.hitsz.edu.cn"
+
+# 默认每秒至多 2 个请求，允许短时突发 5 个
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 5.0
+
+BUCKET_FILENAME = "bucket.json"
+
+
+@dataclass
+class TokenBucket:
+    state_dir: str
+    # 每秒补充的令牌数
+    rate: float = DEFAULT_RATE
+    burst: float = DEFAULT_BURST
+    # 本进程取得的令牌数，用于统计吞吐量
+    acquired: int = 0
+
+    def _load(self, now: float) -> tuple[float, float]:
+        try:
+            with open(
+                os.path.join(self.state_dir, BUCKET_FILENAME), encoding="utf-8"
+            ) as f:
+                state = json.load(f)
+            return float(state["tokens"]), float(state["updated"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return self.burst, now
+
+    def _save(self, tokens: float, now: float):
+        atomic_write_text(
+            os.path.join(self.state_dir, BUCKET_FILENAME),
+            json.dumps({"tokens": tokens, "updated": now}),
+            encoding="utf-8",
+        )
+
+    def acquire(self) -> float:
+        """取得一个令牌，必要时等待，返回等待的秒数"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        waited = 0.0
+        while True:
+            with cache_lock(self.state_dir):
+                now = time.time()
+                tokens, updated = self._load(now)
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                if tokens >= 1:
+                    self._save(tokens - 1, now)
+                    self.acquired += 1
+                    return waited
+                self._save(tokens, now)
+                wait = (1 - tokens) / self.rate
+            # 不持锁等待，以免阻塞其他进程检查令牌
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """每次发送请求前从令牌桶取得令牌"""
+
+    def __init__(self, bucket: TokenBucket, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+
+    def send(
+        self, request: requests.PreparedRequest, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        _ = self.bucket.acquire()
+        return super().send(request, *args, **kwargs)
+
+
+def limit_session(session: requests.Session, bucket: TokenBucket):
+    """让 session 对教务系统的请求受 bucket 限速，对其他站点（如统一身份认证）的请求不受影响"""
+    adapter = RateLimitedAdapter(bucket)
+    for scheme in ("http", "https"):
+        session.mount(f"{scheme}://{JW_HOST}/", adapter)
@@ -0,0 +1,202 @@
+"""
+各账号共用的解析与渲染缓存（SQLite，位于缓存根目录，可供多个进程同时使用）。
+同一教学班的课表条目（RWH、KEY、SKSJ 等均相同）在许多学生的课表中重复出现，
+其解析结果，以及按同一偏好设置渲染出的日程，都只需计算一次。
+"""
+
+import dataclasses
+import datetime
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from ..jwapi_model import KbEntry
+from ..schedule import (
+    RenderedEntry,
+    get_calendar_name,
+    parse_kb_entry,
+    render_entry,
+)
+from ..schedule_preference import JwcSchedulePreference
+from ..schedule_utils import ScheduleEntry
+
+RENDER_CACHE_FILENAME = "render-cache.sqlite3"
+# prune 时删除超过这么久未使用的记录
+MAX_UNUSED_AGE = 30 * 24 * 60 * 60
+# 未命中时写入的记录每攒够这么多条提交一次，其余的在 close 时提交
+COMMIT_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rendered (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    used_at REAL NOT NULL
+);
+"""
+
+_TABLES = ("parsed", "rendered")
+
+
+def render_cache_path(cache_root: str) -> str:
+    return os.path.join(cache_root, RENDER_CACHE_FILENAME)
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _canonical_repr(entry: ScheduleEntry) -> str:
+    # 合并得到的条目，其 description 由集合求并而来，顺序随各进程的字符串哈希而变
+    return repr(dataclasses.replace(entry, description=sorted(entry.description)))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def describe(self) -> str:
+        total = self.hits + self.misses
+        if not total:
+            return "0/0"
+        return f"{self.hits}/{total}（{self.hits / total:.0%}）"
+
+
+class RenderCache:
+    """
+    parse_kb_entry 与 render_entry 可分别传给 Schedule.from_kb 与 Schedule.to_ics_variants。
+    version 不同的记录互不复用（解析与渲染逻辑随版本变化）。
+    """
+
+    def __init__(self, path: str, version: str):
+        self.version = version
+        self.conn = sqlite3.connect(path, timeout=30)
+        _ = self.conn.execute("PRAGMA journal_mode=WAL")
+        _ = self.conn.execute("PRAGMA synchronous=NORMAL")
+        _ = self.conn.executescript(_SCHEMA)
+        self.parse_stats = CacheStats()
+        self.render_stats = CacheStats()
+        # 命中的记录在 close 时一并更新使用时间
+        self._used: dict[str, set[str]] = {table: set() for table in _TABLES}
+        self._fingerprints: dict[int, tuple[JwcSchedulePreference, str]] = {}
+        self._uncommitted = 0
+
+    def close(self):
+        now = time.time()
+        with self.conn:
+            for table, keys in self._used.items():
+                _ = self.conn.executemany(
+                    f"UPDATE {table} SET used_at = ? WHERE key = ?",
+                    ((now, key) for key in keys),
+                )
+        self.conn.close()
+
+    def _get(self, table: str, key: str) -> bytes | None:
+        row = self.conn.execute(
+            f"SELECT value FROM {table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._used[table].add(key)
+        return row[0]
+
+    def _put(self, table: str, key: str, value: bytes):
+        _ = self.conn.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)",
+            (key, value, time.time()),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self.conn.commit()
+            self._uncommitted = 0
+
+    def prune(self, max_age: float = MAX_UNUSED_AGE) -> int:
+        """删除长时间未使用的记录，返回删除的条数"""
+        cutoff = time.time() - max_age
+        removed = 0
+        with self.conn:
+            for table in _TABLES:
+                removed += self.conn.execute(
+                    f"DELETE FROM {table} WHERE used_at < ?", (cutoff,)
+                ).rowcount
+        return removed
+
+    def parse_kb_entry(
+        self, item: KbEntry, start_date: datetime.date
+    ) -> ScheduleEntry | None:
+        # 以整个条目的内容为键：课程交流码等字段也会写入解析结果
+        key = _digest(self.version, item.model_dump_json(), start_date.isoformat())
+        cached = self._get("parsed", key)
+        if cached is not None:
+            self.parse_stats.hits += 1
+            entry, error = pickle.loads(cached)
+            if error is not None:
+                raise ValueError(error)
+            return entry
+
+        self.parse_stats.misses += 1
+        try:
+            entry = parse_kb_entry(item, start_date)
+        except ValueError as e:
+            self._put("parsed", key, pickle.dumps((None, str(e))))
+            raise
+        self._put("parsed", key, pickle.dumps((entry, None)))
+        return entry
+
+    def _fingerprint(self, preference: JwcSchedulePreference) -> str:
+        # 同一次运行中偏好设置对象不变，不必每个条目都重新计算哈希
+        cached = self._fingerprints.get(id(preference))
+        if cached is None or cached[0] is not preference:
+            cached = self._fingerprints[id(preference)] = (
+                preference,
+                preference.fingerprint(),
+            )
+        return cached[1]
+
+    def render_entry(
+        self,
+        entry: ScheduleEntry,
+        start_date: datetime.date,
+        semester_desc: str,
+        preferences: Sequence[JwcSchedulePreference],
+    ) -> list[RenderedEntry]:
+        entry_key = _digest(
+            self.version,
+            _canonical_repr(entry),
+            start_date.isoformat(),
+            # 日历分类名称中含有当天日期
+            get_calendar_name(semester_desc, entry.kind),
+        )
+        keys = [_digest(entry_key, self._fingerprint(p)) for p in preferences]
+        results: list[RenderedEntry | None] = []
+        for key in keys:
+            cached = self._get("rendered", key)
+            results.append(None if cached is None else pickle.loads(cached))
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        self.render_stats.hits += len(results) - len(missing)
+        self.render_stats.misses += len(missing)
+        if missing:
+            rendered = render_entry(
+                entry, start_date, semester_desc, [preferences[i] for i in missing]
+            )
+            for i, r in zip(missing, rendered):
+                self._put("rendered", keys[i], pickle.dumps(r))
+                results[i] = r
+        return [r for r in results if r is not None]
+
+    def describe_stats(self) -> str:
+        return f"解析 {self.parse_stats.describe()}，渲染 {self.render_stats.describe()}"
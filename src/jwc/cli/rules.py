@@ -0,0 +1,151 @@
+"""
+jwc rules 命令组：检查偏好设置中的正则规则，并按实际课表统计各条规则的命中与耗时。
+"""
+
+import click
+
+from ..rules import RuleUsage, analyze_rule_usage, set_profiling
+from ..schedule_preference import JwcSchedulePreference
+from ..schedule_preset_trules import (
+    T_LAB_RULES_RAW,
+    T_LESSON_RULES_RAW,
+    T_LOCATION_RULES_RAW,
+)
+from ..schedule_split import by_rules
+from . import cache
+from .accounts import add_accounts_option
+from .common import (
+    add_schedule_preference_options,
+    add_semester_option,
+    exam_schedule,
+    load_schedule_preferences,
+    parse_semester_arg,
+    report_rule_problems,
+)
+
+
+@click.group(name="rules")
+def rules_group():
+    """【偏好设置规则】检查偏好设置中的正则规则"""
+
+
+def _load_rules_preference(
+    preference_file: str | None, no_preset_rules: bool
+) -> JwcSchedulePreference:
+    """不经缓存载入偏好设置，可自由修改"""
+    preference = load_schedule_preferences(preference_file)
+    if not no_preset_rules:
+        preference.merge_with_preset_rules(
+            T_LESSON_RULES_RAW, T_LAB_RULES_RAW, T_LOCATION_RULES_RAW
+        )
+    return preference
+
+
+@rules_group.command(name="lint")
+@add_schedule_preference_options
+def rules_lint(preference_file: str | None, no_preset_rules: bool):
+    """检查各条规则：无法编译的（渲染时将被忽略），及可能导致回溯爆炸的写法"""
+    preference = _load_rules_preference(preference_file, no_preset_rules)
+    problems = preference.lint()
+    report_rule_problems(problems)
+    if not problems:
+        click.secho("[i] 没有发现问题", fg="green")
+    elif any(p.severity == "error" for p in problems):
+        raise SystemExit(1)
+
+
+def _format_rule(usage: RuleUsage) -> str:
+    return f"{usage.field} 第 {usage.index + 1} 条规则 {usage.pattern!r}"
+
+
+@rules_group.command(name="stats")
+@add_accounts_option("统计哪些账号的课表，可多次指定；默认为当前账号")
+@add_semester_option
+@add_schedule_preference_options
+@click.option("--no-exams", is_flag=True, help="不统计考试安排")
+@click.option("--top", type=click.IntRange(0), default=5, help="每类规则显示最耗时的几条")
+def rules_stats(
+    accounts: list[str],
+    semester: str | None,
+    preference_file: str | None,
+    no_preset_rules: bool,
+    no_exams: bool,
+    top: int,
+):
+    """按同一偏好设置渲染各课表，统计每条规则的命中次数与匹配耗时，找出从未匹配或被遮蔽的规则"""
+    from contextlib import nullcontext
+
+    from .fetch import use_account
+
+    preference = _load_rules_preference(preference_file, no_preset_rules)
+    set_profiling(True)
+    rendered = 0
+    try:
+        for account in list(dict.fromkeys(accounts)) or [None]:
+            with nullcontext() if account is None else use_account(account):
+                xn, xq = (
+                    parse_semester_arg(semester) if semester else cache.current_semester()
+                )
+                schedules = [cache.kb_schedule(xn, xq)]
+                if not no_exams:
+                    schedules.append(exam_schedule(xn, xq, []))
+            for schedule in schedules:
+                # 不经渲染缓存，每个条目都实际匹配一次
+                _ = schedule.to_ics(preference)
+                if preference.calendar_split_rules:
+                    # 拆分日历的规则不参与渲染，另按各条目匹配一次
+                    classify = by_rules(preference)
+                    for entry in schedule.entries:
+                        _ = classify(entry)
+                rendered += 1
+        # 关闭统计后 compiled() 会重新编译，须先取出带统计的规则
+        rule_lists = preference.compiled().rule_lists()
+    finally:
+        set_profiling(False)
+
+    usages = [
+        usage
+        for field, patterns in rule_lists.items()
+        for usage in analyze_rule_usage(field, patterns)
+    ]
+    total_ms = sum(u.elapsed_ns for u in usages) / 1e6
+    click.secho(
+        f"[i] 共渲染 {rendered} 个日历，规则匹配 {sum(u.attempts for u in usages)} 次，"
+        f"累计 {total_ms:.1f} ms",
+        fg="cyan",
+    )
+    by_field: dict[str, list[RuleUsage]] = {}
+    for usage in usages:
+        by_field.setdefault(usage.field, []).append(usage)
+    for field, field_usages in by_field.items():
+        field_ms = sum(u.elapsed_ns for u in field_usages) / 1e6
+        click.echo(
+            f"[i] {field}：{len(field_usages)} 条，"
+            f"命中 {sum(u.hits for u in field_usages)} 次，累计 {field_ms:.1f} ms"
+        )
+        slowest = sorted(field_usages, key=lambda u: u.elapsed_ns, reverse=True)
+        for u in slowest[:top]:
+            click.echo(
+                f"    第 {u.index + 1} 条 {u.pattern!r}：命中 {u.hits}/{u.attempts}，"
+                f"{u.elapsed_ns / 1e6:.2f} ms"
+            )
+
+    never = [u for u in usages if u.never_matches]
+    if never:
+        click.secho(f"[!] 以下 {len(never)} 条规则从未匹配：", fg="yellow")
+        for u in never:
+            click.echo(f"    {_format_rule(u)}")
+    shadowed = [u for u in usages if u.shadowed]
+    if shadowed:
+        click.secho(
+            f"[!] 以下 {len(shadowed)} 条规则能匹配，但总被更早的规则抢先：", fg="yellow"
+        )
+        pattern_of = {(u.field, u.index): u.pattern for u in usages}
+        for u in shadowed:
+            assert u.shadowed_by is not None
+            earlier = pattern_of[u.field, u.shadowed_by]
+            click.echo(
+                f"    {_format_rule(u)}（被第 {u.shadowed_by + 1} 条 {earlier!r} 遮蔽）"
+            )
+    if not never and not shadowed:
+        click.secho("[i] 每条规则都至少生效过一次", fg="green")
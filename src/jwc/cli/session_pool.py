@@ -0,0 +1,126 @@
+"""
+账号池：为多个账号分别保存登录会话与缓存，
+由线程池并发地为各账号执行任务，所有账号共用一个限速器。
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import requests
+
+from ..jwapi_common import JwcRequestError
+from .cache import ACCOUNT_ERRORS
+from .fetch import get_session_cache_path, load_session, use_account
+from .rate_limit import TokenBucket, limit_session
+
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 2
+# 第 n 次重试前等待 RETRY_BACKOFF * 2**(n-1) 秒
+RETRY_BACKOFF = 2.0
+
+# 网络错误或服务器返回错误时重试；其他异常（如数据无法解析）重试也无济于事
+RETRYABLE_ERRORS: tuple[type[Exception], ...] = (
+    requests.RequestException,
+    JwcRequestError,
+)
+
+
+@dataclass
+class AccountResult:
+    account: str
+    ok: bool
+    attempts: int
+    elapsed: float
+    error: str | None = None
+
+
+class SessionPool:
+    """按账号载入已保存的登录会话（不会触发交互式登录），并让它们共用 bucket 限速"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._sessions: dict[str, requests.Session] = {}
+        self._guard = threading.Lock()
+
+    def session(self, account: str) -> requests.Session | None:
+        with self._guard:
+            if account in self._sessions:
+                return self._sessions[account]
+        with use_account(account):
+            session = load_session()
+        if session is None:
+            return None
+        limit_session(session, self.bucket)
+        with self._guard:
+            return self._sessions.setdefault(account, session)
+
+    def discard(self, account: str):
+        """丢弃 account 的会话，下次使用时重新载入"""
+        with self._guard:
+            _ = self._sessions.pop(account, None)
+
+
+def has_saved_session(account: str) -> bool:
+    with use_account(account):
+        return os.path.exists(get_session_cache_path())
+
+
+def _run_one(
+    pool: SessionPool, account: str, task: Callable[[], object], retries: int
+) -> AccountResult:
+    started = time.monotonic()
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            session = pool.session(account)
+            if session is None:
+                return AccountResult(
+                    account,
+                    False,
+                    attempts,
+                    time.monotonic() - started,
+                    "没有可用的登录会话",
+                )
+            with use_account(account, session):
+                _ = task()
+            return AccountResult(account, True, attempts, time.monotonic() - started)
+        except RETRYABLE_ERRORS as e:
+            if attempts > retries:
+                return AccountResult(
+                    account, False, attempts, time.monotonic() - started, str(e)
+                )
+            # 会话可能已失效，重试时重新载入
+            pool.discard(account)
+            time.sleep(RETRY_BACKOFF * 2 ** (attempts - 1))
+        except ACCOUNT_ERRORS as e:
+            return AccountResult(
+                account, False, attempts, time.monotonic() - started, str(e)
+            )
+
+
+def run_for_accounts(
+    pool: SessionPool,
+    accounts: list[str],
+    task: Callable[[], object],
+    workers: int = DEFAULT_WORKERS,
+    retries: int = DEFAULT_RETRIES,
+    on_done: Callable[[AccountResult, int], None] | None = None,
+) -> list[AccountResult]:
+    """
+    在 workers 个线程中为每个账号执行一次 task；task 在该账号的作用范围内运行。
+    每完成一个账号即以 (结果, 已完成的账号数) 调用 on_done。返回的结果与 accounts 顺序一致。
+    """
+    results: dict[str, AccountResult] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jwc-pool") as ex:
+        futures = [ex.submit(_run_one, pool, a, task, retries) for a in accounts]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.account] = result
+            if on_done is not None:
+                on_done(result, len(results))
+    return [results[a] for a in accounts]
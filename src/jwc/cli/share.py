@@ -1,12 +1,24 @@
+import io
+import ipaddress
+import os
+import socket
 from functools import partial
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
-import ipaddress
 from pathlib import Path
-import socket
 from urllib.parse import quote
 
 import click
 
+from .cache_io import (
+    COMPRESSION_SUFFIXES,
+    atomic_write_text,
+    compression_of,
+    configured_compression,
+    decompress,
+    stored_path,
+    write_cache_text,
+)
+
 try:
     import ifaddr
 except ImportError:
@@ -39,7 +51,13 @@ def resolve_calendar_output_path(out_file: str | None, default_filename: str) ->
 def write_calendar_file(path: str | Path, content: str) -> Path:
     output_path = Path(path).expanduser()
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(content, encoding="utf-8")
+    if configured_compression() and output_path.resolve().is_relative_to(
+        out_dir().resolve()
+    ):
+        # 只压缩 out 目录中的日历；用户用 -o 指定的文件总是原样写出
+        output_path = Path(write_cache_text(str(output_path), content, encoding="utf-8"))
+    else:
+        atomic_write_text(str(output_path), content, encoding="utf-8")
     resolved = output_path.resolve()
     click.echo(f"[i] 日历已写入 {resolved} 文件。")
     return resolved
@@ -64,6 +82,12 @@ def maybe_offer_http_share(path: str | Path) -> None:
         return
 
     server = _create_http_server(share_dir)
+    # 压缩存储的日历仍以原文件名提供，由服务端处理压缩
+    method = compression_of(relative_path.name)
+    if method is not None:
+        relative_path = relative_path.with_name(
+            relative_path.name.removesuffix(COMPRESSION_SUFFIXES[method])
+        )
     relative_url = quote(relative_path.as_posix(), safe="/")
     file_url = f"http://{display_ip}:{server.server_port}/{relative_url}"
 
@@ -81,8 +105,45 @@ def maybe_offer_http_share(path: str | Path) -> None:
         server.server_close()
 
 
+class _PrecompressedFileHandler(SimpleHTTPRequestHandler):
+    """
+    对以压缩形式存储的文件（如 a.ics.gz），在请求 a.ics 时直接发送压缩数据并标明 Content-Encoding；
+    客户端不支持该编码时才解压后发送。
+    """
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        actual = None if os.path.exists(path) else stored_path(path)
+        method = compression_of(actual) if actual else None
+        if actual is None or method is None:
+            return super().send_head()
+
+        with open(actual, "rb") as f:
+            data = f.read()
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in self.headers.get("Accept-Encoding", "").split(",")
+        }
+        encoding = {"gzip": "gzip", "zstd": "zstd"}[method]
+        send_compressed = encoding in accepted
+
+        if not send_compressed:
+            data = decompress(data, method)
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        if send_compressed:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header(
+            "Last-Modified", self.date_time_string(int(os.path.getmtime(actual)))
+        )
+        self.end_headers()
+        return io.BytesIO(data)
+
+
 def _create_http_server(directory: Path) -> ThreadingHTTPServer:
-    handler = partial(SimpleHTTPRequestHandler, directory=str(directory))
+    handler = partial(_PrecompressedFileHandler, directory=str(directory))
 
     for port in range(DEFAULT_SHARE_PORT, DEFAULT_SHARE_PORT + 10):
         try:
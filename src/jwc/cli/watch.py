@@ -0,0 +1,316 @@
+"""
+监视模式：定期重新请求课表与考试安排，仅当内容哈希变化时重新生成日历并输出变化摘要。
+轮询间隔在选退课期间较短，内容未变化时逐次加倍；等待期间定期发送心跳以保持会话有效。
+"""
+
+import datetime
+import hashlib
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import click
+
+from ..json_stream import iter_kb_entries
+from ..jwapi_common import heartbeat
+from ..schedule import Schedule, get_semester_desc_brief
+from ..schedule_utils import ScheduledDates, ScheduleEntry, format_minutes
+from . import cache
+from .cache_io import open_cache_text, read_cache_bytes
+from .common import (
+    add_schedule_preference_options,
+    add_semester_option,
+    exam_schedule,
+    load_schedule_preferences_with_preset,
+    parse_semester_arg,
+    report_semester,
+    write_exam_calendar,
+    write_kb_calendar,
+)
+from .fetch import get_session
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+HEARTBEAT_INTERVAL = 10 * MINUTE
+# 出错后多久重试
+ERROR_RETRY_INTERVAL = 5 * MINUTE
+# 这些错误只影响本次检查，长时间运行时不应因此退出
+WATCH_ERRORS = cache.REFRESH_ERRORS
+
+# 选退课期间：开学前一周至开学后第三周结束
+ADD_DROP_BEFORE_START = datetime.timedelta(days=7)
+ADD_DROP_AFTER_START = datetime.timedelta(days=21)
+
+
+@dataclass
+class PollPolicy:
+    add_drop_interval: float = 10 * MINUTE
+    normal_interval: float = 2 * HOUR
+    # 内容未变化时间隔逐次加倍，至多到
+    max_interval: float = 12 * HOUR
+
+    def base_interval(self, add_drop: bool) -> float:
+        return self.add_drop_interval if add_drop else self.normal_interval
+
+    def wait_after(self, previous: float | None, changed: bool, add_drop: bool) -> float:
+        """一次检查后应等待的秒数；previous 为上一次等待的秒数"""
+        base = self.base_interval(add_drop)
+        if changed or previous is None:
+            return base
+        # 进入或离开选退课期时 base 改变，间隔仍不低于 base
+        return max(base, min(previous * 2, self.max_interval))
+
+
+def in_add_drop_period(start_date: datetime.date, today: datetime.date) -> bool:
+    return (
+        start_date - ADD_DROP_BEFORE_START <= today <= start_date + ADD_DROP_AFTER_START
+    )
+
+
+@dataclass
+class WatchedPayload:
+    description: str
+    # 缓存文件路径
+    path: str
+    # 请求服务器并写入缓存
+    fetch: Callable[[], object]
+    # 由缓存解析出条目，用于生成变化摘要
+    load: Callable[[], list[ScheduleEntry]]
+    # 重新生成日历，返回写入的路径
+    regenerate: Callable[[], Path]
+    digest: str | None = None
+    entries: list[ScheduleEntry] = field(default_factory=list)
+
+
+def payload_digest(path: str) -> str | None:
+    """缓存内容（解压后）的哈希，不受压缩设置影响"""
+    try:
+        return hashlib.sha256(read_cache_bytes(path)).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _format_weeks(weeks: list[int]) -> str:
+    """如 [1, 2, 3, 5] 显示为 1-3,5"""
+    spans: list[str] = []
+    i = 0
+    while i < len(weeks):
+        j = i
+        while j + 1 < len(weeks) and weeks[j + 1] == weeks[j] + 1:
+            j += 1
+        spans.append(str(weeks[i]) if i == j else f"{weeks[i]}-{weeks[j]}")
+        i = j + 1
+    return ",".join(spans)
+
+
+def _entry_detail(e: ScheduleEntry) -> str:
+    match e.dates:
+        case ScheduledDates():
+            weeks = _format_weeks(e.dates.weeks)
+            when = f"第{weeks}周 周{'一二三四五六日'[e.dates.day_of_week - 1]}"
+        case datetime.date():
+            when = e.dates.strftime("%m-%d")
+    times = " ".join(
+        f"{format_minutes(t0)}-{format_minutes(t1)}" for t0, t1 in e.time_ranges
+    )
+    return f"{when} {times} {e.location}".strip()
+
+
+def summarize_changes(old: list[ScheduleEntry], new: list[ScheduleEntry]) -> list[str]:
+    """按课程名称比较两组条目，返回新增、删除、变动的课程"""
+
+    def by_name(entries: list[ScheduleEntry]) -> dict[str, Counter[str]]:
+        result: dict[str, Counter[str]] = {}
+        for e in entries:
+            result.setdefault(e.name, Counter())[_entry_detail(e)] += 1
+        return result
+
+    old_map, new_map = by_name(old), by_name(new)
+    lines: list[str] = []
+    for name in sorted(new_map.keys() - old_map.keys()):
+        lines.append(f"+ {name}：{'；'.join(new_map[name])}")
+    for name in sorted(old_map.keys() - new_map.keys()):
+        lines.append(f"- {name}")
+    for name in sorted(old_map.keys() & new_map.keys()):
+        if old_map[name] == new_map[name]:
+            continue
+        added = new_map[name] - old_map[name]
+        removed = old_map[name] - new_map[name]
+        detail = "；".join([f"新 {d}" for d in added] + [f"原 {d}" for d in removed])
+        lines.append(f"~ {name}：{detail}")
+    return lines
+
+
+def _keep_alive():
+    session = get_session()
+    if not heartbeat(session):
+        # 会话失效时重新登录（优先使用已保存的凭据）
+        _ = get_session(force=True)
+
+
+def _sleep_with_heartbeat(seconds: float):
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        time.sleep(min(remaining, HEARTBEAT_INTERVAL))
+        if deadline - time.monotonic() <= 0:
+            break
+        try:
+            _keep_alive()
+        except WATCH_ERRORS as e:
+            click.secho(f"[!] 心跳失败：{e}", fg="yellow")
+
+
+def _poll(payload: WatchedPayload) -> bool:
+    """请求一次，内容变化时重新生成日历并输出摘要，返回是否变化"""
+    _ = payload.fetch()
+    digest = payload_digest(payload.path)
+    if digest == payload.digest:
+        return False
+
+    entries = payload.load()
+    changes = summarize_changes(payload.entries, entries)
+    payload.digest, payload.entries = digest, entries
+    written = payload.regenerate()
+
+    stamp = datetime.datetime.now().strftime("%m-%d %H:%M")
+    click.secho(f"[i] {stamp} {payload.description}有变化，已更新 {written}", fg="green")
+    for line in changes or ["（条目内容未变，仅原始数据有变化）"]:
+        click.echo(f"    {line}")
+    return True
+
+
+def watch(
+    payloads: list[WatchedPayload],
+    policy: PollPolicy,
+    add_drop: Callable[[], bool],
+):
+    """一直运行到 ^C；payloads 的 digest 与 entries 应已按当前缓存初始化"""
+    previous: float | None = None
+    while True:
+        try:
+            changed = False
+            for payload in payloads:
+                changed = _poll(payload) or changed
+            wait = policy.wait_after(previous, changed, add_drop())
+            previous = wait
+            if not changed:
+                stamp = datetime.datetime.now().strftime("%m-%d %H:%M")
+                click.echo(f"[i] {stamp} 没有变化，{_format_interval(wait)}后再次检查")
+        except WATCH_ERRORS as e:
+            click.secho(f"[!] 检查失败：{e}", fg="yellow")
+            wait = min(ERROR_RETRY_INTERVAL, previous or ERROR_RETRY_INTERVAL)
+        _sleep_with_heartbeat(wait)
+
+
+def _format_interval(seconds: float) -> str:
+    if seconds < HOUR:
+        return f"{int(seconds // MINUTE)} 分钟"
+    return f"{seconds / HOUR:.1f} 小时"
+
+
+@click.command(name="watch")
+@add_semester_option
+@add_schedule_preference_options
+@click.option("--no-exams", is_flag=True, help="不监视考试安排")
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=1),
+    default=None,
+    help="平时的检查间隔（分钟）",
+)
+@click.option(
+    "--add-drop-interval",
+    type=click.FloatRange(min=1),
+    default=None,
+    help="选退课期间的检查间隔（分钟）",
+)
+@click.option(
+    "--max-interval",
+    type=click.FloatRange(min=1),
+    default=None,
+    help="内容未变化时检查间隔逐次加倍的上限（分钟）",
+)
+@click.option(
+    "--add-drop/--no-add-drop",
+    default=None,
+    help="视为/不视为选退课期间，默认按学期开始日期判断",
+)
+def watch_command(
+    semester: str | None,
+    preference_file: str | None,
+    no_preset_rules: bool,
+    no_exams: bool,
+    interval: float | None,
+    add_drop_interval: float | None,
+    max_interval: float | None,
+    add_drop: bool | None,
+):
+    """【监视模式】定期检查课表与考试安排，有变化时重新生成日历，按 ^C 退出"""
+    xn, xq = parse_semester_arg(semester) if semester else cache.current_semester()
+    report_semester(xn, xq)
+    preference = load_schedule_preferences_with_preset(preference_file, no_preset_rules)
+    semester_desc = get_semester_desc_brief(xn, xq)
+    manager = cache.semester_cache(xn, xq)
+
+    policy = PollPolicy()
+    if interval is not None:
+        policy.normal_interval = interval * MINUTE
+    if add_drop_interval is not None:
+        policy.add_drop_interval = add_drop_interval * MINUTE
+    if max_interval is not None:
+        policy.max_interval = max_interval * MINUTE
+
+    def is_add_drop() -> bool:
+        if add_drop is not None:
+            return add_drop
+        start_date = cache.semester_start_date(xn, xq)
+        return in_add_drop_period(start_date, datetime.date.today())
+
+    # 直接读取给定路径的缓存来比较变化，不会因缓存过期而询问用户
+    def load_kb():
+        start_date = cache.semester_start_date(xn, xq)
+        with open_cache_text(manager.path("kb")) as f:
+            items = iter_kb_entries(f)
+            return Schedule.from_kb_items(items, semester_desc, start_date, []).entries
+
+    def load_exams():
+        data = cache.XsksByxhList(xn, xq, path=manager.path("exams"))
+        start_date = cache.semester_start_date(xn, xq)
+        return Schedule.from_xsks(data, semester_desc, start_date, []).entries
+
+    payloads = [
+        WatchedPayload(
+            "课表",
+            manager.path("kb"),
+            lambda: cache.request_xszykbzong(xn, xq),
+            load_kb,
+            lambda: write_kb_calendar(xn, xq, cache.kb_schedule(xn, xq), preference)[0],
+        )
+    ]
+    if not no_exams:
+        payloads.append(
+            WatchedPayload(
+                "考试安排",
+                manager.path("exams"),
+                lambda: cache.request_XsksByxhList(xn, xq),
+                load_exams,
+                lambda: write_exam_calendar(
+                    xn, xq, exam_schedule(xn, xq, []), preference
+                )[0],
+            )
+        )
+    for payload in payloads:
+        payload.digest = payload_digest(payload.path)
+        if payload.digest is not None:
+            payload.entries = payload.load()
+
+    click.echo("[i] 开始监视，按 ^C 退出")
+    try:
+        watch(payloads, policy, is_add_drop)
+    except KeyboardInterrupt:
+        click.echo()
+        click.echo("[i] bye!")
@@ -0,0 +1,158 @@
+"""
+命令行入口：`jwc daemon start` 启动的守护进程运行时，把命令转交给它执行，
+省去导入各模块、载入登录会话与心跳检查的开销；否则在本进程中执行。
+
+为使转发本身足够快，本模块只导入标准库与 appdirs，不导入 jwc.cli。
+"""
+
+import getpass
+import io
+import json
+import os
+import socket
+import sys
+from typing import Any
+
+from appdirs import user_data_dir
+
+APP_DIR_NAME = "jwc.py"
+APP_AUTHOR = "Zjl37"
+CACHE_DIR_NAME = "jwc-cache"
+
+DAEMON_SOCKET_FILENAME = "daemon.sock"
+# 设为 0 时总在本进程中执行
+DAEMON_ENV = "JWC_DAEMON"
+# 转发时一并传给守护进程的环境变量
+FORWARDED_ENV_PREFIX = "JWC_"
+# 长时间运行的命令总在本进程中执行，以免占住守护进程
+LOCAL_COMMANDS = frozenset({"watch", "daemon"})
+
+CONNECT_TIMEOUT = 1.0
+# 等待守护进程下一条消息的时间上限（秒）；命令等待网络时可能较久没有输出
+RESPONSE_TIMEOUT = 10 * 60
+
+
+def daemon_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def daemon_socket_path() -> str:
+    return os.path.join(
+        user_data_dir(appname=APP_DIR_NAME, appauthor=APP_AUTHOR),
+        CACHE_DIR_NAME,
+        DAEMON_SOCKET_FILENAME,
+    )
+
+
+def connect_daemon() -> socket.socket | None:
+    """连接守护进程，其未运行时返回 None"""
+    if not daemon_supported():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(daemon_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(RESPONSE_TIMEOUT)
+    return sock
+
+
+def send_message(f: io.BufferedIOBase, message: dict[str, Any]):
+    """双方的每条消息都是一行 JSON"""
+    _ = f.write(json.dumps(message).encode("utf-8") + b"\n")
+    f.flush()
+
+
+def receive_message(f: io.BufferedIOBase) -> dict[str, Any]:
+    line = f.readline()
+    if not line:
+        raise ConnectionError("连接已断开")
+    return json.loads(line)
+
+
+def send_request(sock: socket.socket, request: dict[str, Any]) -> dict[str, Any]:
+    """发送一条请求并返回一条响应"""
+    with sock, sock.makefile("rwb") as f:
+        send_message(f, request)
+        return receive_message(f)
+
+
+def command_name(argv: list[str]) -> str | None:
+    """argv 中的子命令名称，跳过 jwc 自身的选项"""
+    args = iter(argv)
+    for arg in args:
+        if arg == "--rule-timeout":
+            _ = next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _read_input(message: dict[str, Any]) -> str:
+    if message.get("hidden"):
+        try:
+            return getpass.getpass(message.get("prompt", "")) + "\n"
+        except EOFError:
+            return ""
+    return sys.stdin.readline()
+
+
+def forward(argv: list[str]) -> int | None:
+    """
+    守护进程在运行时由它执行命令并返回退出码；其未运行或正忙于执行别的命令时返回 None。
+    命令读取标准输入时由本进程代为读取（包括回答交互式提问），
+    其标准输出与标准错误分别写到本进程的标准输出与标准错误。
+    """
+    if os.environ.get(DAEMON_ENV) == "0" or command_name(argv) in LOCAL_COMMANDS:
+        return None
+
+    sock = connect_daemon()
+    if sock is None:
+        return None
+
+    with sock, sock.makefile("rwb") as f:
+        send_message(
+            f,
+            {
+                "argv": argv,
+                "cwd": os.getcwd(),
+                "env": {
+                    k: v
+                    for k, v in os.environ.items()
+                    if k.startswith(FORWARDED_ENV_PREFIX)
+                },
+                "color": sys.stdout.isatty(),
+            },
+        )
+        while True:
+            message = receive_message(f)
+            if "stdout" in message:
+                _ = sys.stdout.write(message["stdout"])
+                sys.stdout.flush()
+            elif "stderr" in message:
+                _ = sys.stderr.write(message["stderr"])
+                sys.stderr.flush()
+            elif "read" in message:
+                send_message(f, {"data": _read_input(message)})
+            elif message.get("busy"):
+                # 守护进程尚未执行这条命令
+                return None
+            else:
+                return int(message["exit_code"])
+
+
+def main():
+    try:
+        exit_code = forward(sys.argv[1:])
+    except (OSError, ValueError) as e:
+        # 已发出的命令可能执行了一部分，不再在本进程中重试
+        print(f"[!] 与守护进程通信时出错：{e}", file=sys.stderr)
+        sys.exit(1)
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from jwc.cli import cli
+
+    cli()
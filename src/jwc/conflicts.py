@@ -0,0 +1,104 @@
+"""
+课表内的时间冲突检测：将一个或多个来源（课表、考试安排、大物实验等）的条目展开为各次日程，
+按日期与开始时间排序后扫描一遍，找出所有两两重叠的日程，用时 O(n log n + 冲突数)。
+同一日程可能出现在多个来源中（写法不尽相同），检测前先按 schedule_combine 去重。
+"""
+
+import datetime
+import heapq
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from jwc.schedule import Schedule
+from jwc.schedule_combine import dedup_sources
+from jwc.schedule_utils import ScheduleEntry
+
+
+@dataclass
+class Conflict:
+    """两次日程在 date 的 [start, end) 内重叠（分钟数）"""
+
+    date: datetime.date
+    start: int
+    end: int
+    a: ScheduleEntry
+    b: ScheduleEntry
+    # a、b 所属来源的名称
+    source_a: str
+    source_b: str
+
+
+@dataclass
+class ConflictGroup:
+    """同一对条目的各次冲突"""
+
+    a: ScheduleEntry
+    b: ScheduleEntry
+    source_a: str
+    source_b: str
+    occurrences: list[tuple[datetime.date, int, int]] = field(
+        default_factory=list[tuple[datetime.date, int, int]]
+    )
+
+
+def find_conflicts(sources: Sequence[tuple[str, Schedule]]) -> list[Conflict]:
+    """
+    sources 为 (来源名称, 课表)，按优先级排列，各课表的条目合在一起检测。
+    各来源中的同一日程只保留优先级最高的一次（见 dedup_sources），不算冲突；
+    没有具体时间的（全天）条目不参与检测；结果按日期与时间排序。
+    """
+    # (日期, 开始, 结束, 序号)，序号指向 entries
+    occurrences: list[tuple[datetime.date, int, int, int]] = []
+    entries: list[tuple[ScheduleEntry, str]] = []
+    deduped, _ = dedup_sources(sources)
+    for name, schedule in deduped:
+        for entry in schedule.entries:
+            if not entry.time_ranges:
+                continue
+            k = len(entries)
+            entries.append((entry, name))
+            for date in entry.occurrence_dates(schedule.start_date):
+                occurrences.extend((date, t0, t1, k) for t0, t1 in entry.time_ranges)
+    occurrences.sort()
+
+    conflicts: list[Conflict] = []
+    # 当天尚未结束的日程：(结束, 开始, 序号) 的小顶堆
+    active: list[tuple[int, int, int]] = []
+    current_date: datetime.date | None = None
+    for date, t0, t1, k in occurrences:
+        if date != current_date:
+            active.clear()
+            current_date = date
+        while active and active[0][0] <= t0:
+            _ = heapq.heappop(active)
+        entry, source = entries[k]
+        for end, _start, other in active:
+            if other == k:
+                continue
+            other_entry, other_source = entries[other]
+            conflicts.append(
+                Conflict(
+                    date,
+                    t0,
+                    min(end, t1),
+                    other_entry,
+                    entry,
+                    other_source,
+                    source,
+                )
+            )
+        heapq.heappush(active, (t1, t0, k))
+    return conflicts
+
+
+def group_conflicts(conflicts: Sequence[Conflict]) -> list[ConflictGroup]:
+    """按条目对归并，顺序为各对首次冲突的先后"""
+    groups: dict[tuple[int, int], ConflictGroup] = {}
+    for c in conflicts:
+        # 各次冲突中 a、b 的先后取决于开始时间，可能不同
+        key = (min(id(c.a), id(c.b)), max(id(c.a), id(c.b)))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ConflictGroup(c.a, c.b, c.source_a, c.source_b)
+        group.occurrences.append((c.date, c.start, c.end))
+    return list(groups.values())
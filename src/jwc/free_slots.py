@@ -0,0 +1,190 @@
+"""
+多人共同空闲时间查找：将各人的课表展开为占用表 busy[人, 日期, 时间格]，
+对每个可能的开始时间一次性算出各人在所需时长内是否有日程，再按人数汇总，得出候选时间段。
+时间格可为固定步长（默认 5 分钟）的网格，也可为 time_slot_mapping 中的各节课。
+需要 numpy（见 jwc.schedule_columnar）。
+"""
+
+import datetime
+from collections.abc import Collection, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
+
+from jwc.schedule import Schedule
+from jwc.schedule_columnar import NO_TIME, ColumnarSchedule, require_numpy
+from jwc.schedule_utils import time_slot_mapping
+
+if TYPE_CHECKING:
+    import numpy
+    import numpy.typing as npt
+
+_PURPOSE = "查找共同空闲时间"
+
+
+@dataclass
+class SlotGrid:
+    """一天中的各时间格，按时间排序且互不重叠（相邻格之间可以有间隔，如课间）"""
+
+    starts: "npt.NDArray[numpy.int32]"
+    ends: "npt.NDArray[numpy.int32]"
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def minutes(
+        cls, step: int = 5, day_start: int = 8 * 60, day_end: int = 22 * 60
+    ) -> Self:
+        np = require_numpy(_PURPOSE)
+        starts = np.arange(day_start, day_end - step + 1, step, dtype=np.int32)
+        return cls(starts, starts + step)
+
+    @classmethod
+    def class_periods(cls) -> Self:
+        np = require_numpy(_PURPOSE)
+        # 特殊节次（午间、傍晚）的编号在最后，按时间排序
+        spans = sorted(time_slot_mapping.values())
+        return cls(
+            np.array([s for s, _ in spans], dtype=np.int32),
+            np.array([e for _, e in spans], dtype=np.int32),
+        )
+
+
+@dataclass
+class Occupancy:
+    people: list[str]
+    start_date: datetime.date
+    # 第 0 个日期
+    date_from: datetime.date
+    grid: SlotGrid
+    # [人, 日期, 时间格]，为 True 表示此人在该时间格内有日程
+    busy: "npt.NDArray[numpy.bool_]"
+
+    @classmethod
+    def from_schedules(
+        cls,
+        people: Sequence[str],
+        schedules: Sequence[Schedule],
+        grid: SlotGrid,
+        date_from: datetime.date,
+        date_to: datetime.date,
+    ) -> Self:
+        """各课表须属于同一学期；没有具体时间的（全天）日程不计入"""
+        np = require_numpy(_PURPOSE)
+        columnar = ColumnarSchedule.concat(
+            [ColumnarSchedule.from_schedule(s) for s in schedules]
+        )
+        occurrences = columnar.occurrences(date_from, date_to)
+        rows = occurrences.row
+        timed = columnar.start_minute[rows] != NO_TIME
+        rows = rows[timed]
+        person = columnar.source[rows]
+        day = (occurrences.date[timed] - np.datetime64(date_from, "D")).astype(np.intp)
+        # 与日程 [start, end) 重叠的时间格为 [first, last)
+        first = np.searchsorted(grid.ends, columnar.start_minute[rows], side="right")
+        last = np.searchsorted(grid.starts, columnar.end_minute[rows], side="left")
+        keep = first < last
+        person, day, first, last = person[keep], day[keep], first[keep], last[keep]
+
+        days = (date_to - date_from).days + 1
+        # 差分后沿时间格累加，一次标出所有日程占用的时间格
+        diff = np.zeros((len(people), days, len(grid) + 1), dtype=np.int32)
+        np.add.at(diff, (person, day, first), 1)
+        np.add.at(diff, (person, day, last), -1)
+        busy = np.cumsum(diff, axis=2)[:, :, :-1] > 0
+        return cls(list(people), schedules[0].start_date, date_from, grid, busy)
+
+    def date_of(self, day: int) -> datetime.date:
+        return self.date_from + datetime.timedelta(days=day)
+
+
+@dataclass
+class FreeSlot:
+    # 按周查找时为 None，此时 day_of_week 为每周的星期几
+    date: datetime.date | None
+    day_of_week: int
+    # 在 [start, end) 内任选所需时长均可（分钟数）
+    start: int
+    end: int
+    absent: list[str]
+
+
+def find_free_slots(
+    occupancy: Occupancy,
+    duration: int,
+    max_absent: int = 0,
+    days_of_week: Collection[int] = range(1, 8),
+    weekly: bool = False,
+    limit: int | None = None,
+) -> list[FreeSlot]:
+    """
+    查找至少 duration 分钟、至多 max_absent 人有日程的时间段。
+    weekly 为 True 时查找每周固定的时间段：某人在范围内任意一周的该时间有日程即算缺席。
+    按缺席人数、可选范围的长短（长者优先）、时间先后排序。
+    """
+    np = require_numpy(_PURPOSE)
+    grid = occupancy.grid
+    # 从第 i 格开始，到第 j 格结束时满足时长
+    j = np.searchsorted(grid.ends, grid.starts + duration, side="left")
+    valid = j < len(grid)
+    i, j = np.flatnonzero(valid), j[valid]
+
+    # 各人在各日期、各开始格对应的时段内是否有日程：前缀和之差
+    prefix = np.zeros(occupancy.busy.shape[:2] + (len(grid) + 1,), dtype=np.int32)
+    np.cumsum(occupancy.busy, axis=2, out=prefix[:, :, 1:])
+    in_window = (prefix[:, :, j + 1] - prefix[:, :, i]) > 0
+
+    dows = np.array(
+        [occupancy.date_of(d).isoweekday() for d in range(occupancy.busy.shape[1])]
+    )
+    if weekly:
+        # 按星期几合并各周；范围内没有的星期几不作为候选
+        days_of_week = set(days_of_week) & set(dows.tolist())
+        in_window = np.stack(
+            [in_window[:, dows == dow].any(axis=1) for dow in range(1, 8)], axis=1
+        )
+        dows = np.arange(1, 8)
+    absent_count = in_window.sum(axis=0)
+    feasible = (absent_count <= max_absent) & np.isin(dows, list(days_of_week))[:, None]
+
+    slots: list[FreeSlot] = []
+    for d in np.flatnonzero(feasible.any(axis=1)):
+        run_start: int | None = None
+        for w in range(len(i) + 1):
+            # 相邻开始格的缺席者相同且时间连续时合为一段
+            ends_run = (
+                w == len(i)
+                or not feasible[d, w]
+                or (
+                    run_start is not None
+                    and (
+                        i[w] != i[w - 1] + 1
+                        or not np.array_equal(in_window[:, d, w], in_window[:, d, w - 1])
+                    )
+                )
+            )
+            if ends_run and run_start is not None:
+                absent = np.flatnonzero(in_window[:, d, run_start])
+                slots.append(
+                    FreeSlot(
+                        None if weekly else occupancy.date_of(int(d)),
+                        int(dows[d]),
+                        int(grid.starts[i[run_start]]),
+                        int(grid.ends[j[w - 1]]),
+                        [occupancy.people[p] for p in absent],
+                    )
+                )
+                run_start = None
+            if w < len(i) and feasible[d, w] and run_start is None:
+                run_start = w
+
+    slots.sort(
+        key=lambda s: (
+            len(s.absent),
+            -(s.end - s.start),
+            s.date or datetime.date.min,
+            s.day_of_week,
+            s.start,
+        )
+    )
+    return slots if limit is None else slots[:limit]
@@ -0,0 +1,128 @@
+"""
+忙闲时间导出：由课表条目计算每天合并后的忙碌时间段，输出为 VFREEBUSY 或紧凑的 JSON，
+供只关心何时有空的下游系统使用，而不必接收完整展开的日历。
+时间均为 Asia/Shanghai 的本地时间，以当天零点起的分钟数表示；VFREEBUSY 中按规范转换为 UTC。
+"""
+
+import datetime
+import json
+import zoneinfo
+from collections.abc import Collection, Iterable
+from dataclasses import dataclass
+from typing import Self
+
+from ics.utils import uid_gen  # pyright: ignore[reportMissingTypeStubs]
+
+from jwc.schedule import Schedule
+from jwc.schedule_utils import MinuteSpan, ScheduleEntryKind
+
+DAY_MINUTES = 24 * 60
+TIMEZONE = "Asia/Shanghai"
+
+_ZONE = zoneinfo.ZoneInfo(TIMEZONE)
+_UTC_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+@dataclass
+class BusyTimes:
+    # 日期 -> 当天合并后的忙碌时间段，按日期与时间排序
+    days: dict[datetime.date, list[MinuteSpan]]
+    # 统计的日期范围（含两端）；未指定且没有任何日程时为 None
+    date_from: datetime.date | None
+    date_to: datetime.date | None
+
+    @classmethod
+    def from_schedules(
+        cls,
+        schedules: Iterable[Schedule],
+        exclude: Collection[ScheduleEntryKind] = (),
+        date_from: datetime.date | None = None,
+        date_to: datetime.date | None = None,
+        all_day_busy: bool = False,
+    ) -> Self:
+        """
+        exclude 中种类的条目不计入；没有具体时间的（全天）条目默认不计入，
+        all_day_busy 为 True 时视为全天忙碌。
+        """
+        intervals: list[tuple[datetime.date, int, int]] = []
+        for schedule in schedules:
+            for entry in schedule.entries:
+                if entry.kind in exclude:
+                    continue
+                spans = entry.time_ranges
+                if not spans:
+                    if not all_day_busy:
+                        continue
+                    spans = ((0, DAY_MINUTES),)
+                for date in entry.occurrence_dates(schedule.start_date):
+                    if date_from is not None and date < date_from:
+                        continue
+                    if date_to is not None and date > date_to:
+                        continue
+                    intervals.extend((date, t0, t1) for t0, t1 in spans if t0 < t1)
+
+        # 扫描：按开始时间排序后，与上一段重叠或相接的并入上一段
+        intervals.sort()
+        days: dict[datetime.date, list[MinuteSpan]] = {}
+        for date, t0, t1 in intervals:
+            spans = days.setdefault(date, [])
+            if spans and t0 <= spans[-1][1]:
+                if t1 > spans[-1][1]:
+                    spans[-1] = (spans[-1][0], t1)
+            else:
+                spans.append((t0, t1))
+
+        if days:
+            date_from = date_from or min(days)
+            date_to = date_to or max(days)
+        return cls(days, date_from, date_to)
+
+    def interval_count(self) -> int:
+        return sum(len(spans) for spans in self.days.values())
+
+    def to_json(self) -> str:
+        """如 {"timezone": ..., "from": "2025-09-01", "to": ..., "busy": {"2025-09-01": [[480, 585]]}}"""
+        obj = {
+            "timezone": TIMEZONE,
+            "from": self.date_from and self.date_from.isoformat(),
+            "to": self.date_to and self.date_to.isoformat(),
+            "busy": {date.isoformat(): spans for date, spans in self.days.items()},
+        }
+        return json.dumps(obj, separators=(",", ":"))
+
+    def to_vfreebusy(self) -> str:
+        """含一个 VFREEBUSY 组件的日历，每天的忙碌时间段写为一个 FREEBUSY 属性"""
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//jwc.py//freebusy//ZH",
+            "METHOD:PUBLISH",
+            "BEGIN:VFREEBUSY",
+            f"UID:{uid_gen()}",
+            f"DTSTAMP:{datetime.datetime.now(datetime.UTC).strftime(_UTC_FORMAT)}",
+        ]
+        if self.date_from is not None and self.date_to is not None:
+            end = self.date_to + datetime.timedelta(days=1)
+            lines.append(f"DTSTART:{_utc(self.date_from, 0)}")
+            lines.append(f"DTEND:{_utc(end, 0)}")
+        for date, spans in self.days.items():
+            periods = ",".join(f"{_utc(date, t0)}/{_utc(date, t1)}" for t0, t1 in spans)
+            lines.append(_fold(f"FREEBUSY;FBTYPE=BUSY:{periods}"))
+        lines += ["END:VFREEBUSY", "END:VCALENDAR"]
+        return "\r\n".join(lines) + "\r\n"
+
+
+def _utc(date: datetime.date, minutes: int) -> str:
+    local = datetime.datetime.combine(date, datetime.time(), _ZONE)
+    moment = local + datetime.timedelta(minutes=minutes)
+    return moment.astimezone(datetime.UTC).strftime(_UTC_FORMAT)
+
+
+def _fold(line: str) -> str:
+    """按 RFC 5545 将超过 75 个字符的行折行（此处内容均为 ASCII，字符数即字节数）"""
+    parts = [line[:75]]
+    rest = line[75:]
+    while rest:
+        parts.append(" " + rest[:74])
+        rest = rest[74:]
+    return "\r\n".join(parts)
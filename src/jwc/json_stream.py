@@ -0,0 +1,110 @@
+"""
+增量读取 JSON 数组：逐个产出顶层数组中的元素，而不必先读入整个文件。
+用于归档的多名学生课表等大文件；文件中也可以有多个依次排列的顶层数组（如每个年级一个）。
+"""
+
+import json
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+from jwc.jwapi_model import KbEntry
+
+CHUNK_SIZE = 64 * 1024
+# 单个元素的长度上限（字符）；超过仍无法解析时视为格式错误，而不是一直读到文件结束
+MAX_ITEM_SIZE = 16 * 1024 * 1024
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _Reader:
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, at_least: int) -> bool:
+        """再读入至少 at_least 个字符（或直到文件结束），返回是否读到了内容"""
+        if self.pos > self.chunk_size:
+            # 丢弃已解析的部分，避免缓冲区无限增长
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        read = 0
+        while read < at_least and not self.eof:
+            chunk = self.stream.read(max(self.chunk_size, at_least - read))
+            if not chunk:
+                self.eof = True
+                break
+            self.buffer += chunk
+            read += len(chunk)
+        return read > 0
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符；文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill(1):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            found = repr(c) if c else "文件结束"
+            raise json.JSONDecodeError(
+                f"应为 {' 或 '.join(map(repr, chars))}，实为 {found}",
+                self.buffer,
+                self.pos,
+            )
+        self.pos += 1
+        return c
+
+    def value(self, decoder: json.JSONDecoder) -> Any:
+        if not self.peek():
+            raise json.JSONDecodeError(
+                "应为 JSON 值，实为文件结束", self.buffer, self.pos
+            )
+        # 元素可能跨越多个块：解析失败时读入更多内容再试，每次读入的量加倍
+        want = self.chunk_size
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or len(self.buffer) - self.pos > MAX_ITEM_SIZE:
+                    raise
+                _ = self.fill(want)
+                want *= 2
+                continue
+            # 数字可能在块的末尾被截断（如 2.5 只读入了 2.），须读到其后的字符再确认
+            if not self.eof and (
+                end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS
+            ):
+                _ = self.fill(1)
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array_items(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """逐个产出 stream 中各顶层 JSON 数组的元素；同一时刻只在内存中保留一个元素及一块文本"""
+    reader = _Reader(stream, chunk_size)
+    decoder = json.JSONDecoder()
+    while reader.peek():
+        _ = reader.expect("[")
+        if reader.peek() == "]":
+            reader.pos += 1
+            continue
+        while True:
+            yield reader.value(decoder)
+            if reader.expect(",]") == "]":
+                break
+
+
+def iter_kb_entries(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[KbEntry]:
+    """逐个产出 queryxszykbzong 响应（或多个响应依次排列的归档）中的课表条目"""
+    for item in iter_json_array_items(stream, chunk_size):
+        yield KbEntry.model_validate(item)
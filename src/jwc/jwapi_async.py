@@ -0,0 +1,169 @@
+"""
+教务系统接口的异步版本（基于 httpx），与 jwapi_common、jwapi_schedule 及 cli.cache 中的请求一一对应。
+与 requests.Session 共用同一个 cookie jar，因此可直接沿用 idshit 登录得到的会话；
+同一客户端上的请求在一个事件循环中并发，并发数由 max_concurrency 限制。
+"""
+
+import asyncio
+import datetime
+from types import TracebackType
+from typing import TYPE_CHECKING, Self
+
+import requests
+
+from jwc.jwapi_common import JwcRequestError
+from jwc.jwapi_model import (
+    CurrentSemester,
+    RlZcSjResponse,
+    XsksByxhListResponse,
+    XsksEntry,
+    XsksList,
+    Xsxx,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+
+JW_BASE_URL = "http://jw.hitsz.edu.cn"
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_EXAM_PAGE_SIZE = 500
+
+
+def _require_httpx():
+    try:
+        import httpx
+    except ImportError as e:
+        raise RuntimeError("需要安装 httpx 才能使用异步客户端") from e
+    return httpx
+
+
+class AsyncJwClient:
+    """
+    用法：
+        async with AsyncJwClient(session) as client:
+            kb_text = await client.query_xszykbzong("2025-2026", "1")
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        httpx = _require_httpx()
+        # 直接传入 CookieJar 时 httpx 包装而不复制它，双方的 cookie 更新互相可见
+        self.client = httpx.AsyncClient(
+            base_url=JW_BASE_URL,
+            cookies=session.cookies,
+            headers=dict(session.headers),
+            timeout=timeout,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def post(
+        self, path: str, data: dict[str, str] | None = None
+    ) -> "httpx.Response":
+        async with self._semaphore:
+            return await self.client.post(path, data=data)
+
+    async def heartbeat(self) -> bool:
+        resp = await self.post("/component/online")
+        if resp.status_code != 200:
+            return False
+        try:
+            _ = resp.json()
+            return True
+        except ValueError:
+            return False
+
+    async def get_username(self) -> str | None:
+        response = await self.post("/UserManager/queryxsxx")
+        if not response.is_success:
+            return None
+        return Xsxx.model_validate_json(response.content).XH
+
+    async def get_current_semester(self) -> CurrentSemester:
+        response = await self.post("/component/querydangqianxnxq")
+        if response.is_success:
+            return CurrentSemester.model_validate_json(response.content)
+        raise JwcRequestError(f"获取当前学期失败: {response.status_code}")
+
+    async def get_semester_start_date(self, xn: str, xq: str) -> datetime.date | None:
+        response = await self.post(
+            "/component/queryRlZcSj", data={"xn": xn, "xq": xq, "djz": "1"}
+        )
+        if not response.is_success:
+            raise JwcRequestError(f"获取学期开始日期失败: {response.status_code}")
+
+        data = RlZcSjResponse.model_validate_json(response.content)
+        # 找到星期一（xqj=1）的日期
+        for entry in data.content:
+            if entry.xqj == "1":
+                return datetime.datetime.strptime(entry.rq, "%Y-%m-%d").date()
+        return None
+
+    async def query_xszykbzong(self, xn: str, xq: str) -> str:
+        """返回原始响应文本，与同步版本写入缓存的内容相同"""
+        response = await self.post("/xszykb/queryxszykbzong", data={"xn": xn, "xq": xq})
+        if not response.is_success:
+            raise JwcRequestError(
+                f"在请求 queryxszykbzong 时出错了：{response.status_code}"
+            )
+        return response.text
+
+    async def query_XsksByxhList_page(
+        self,
+        q: dict[str, str],
+        page: int,
+        page_size: int = DEFAULT_EXAM_PAGE_SIZE,
+    ) -> XsksByxhListResponse:
+        request_data = q | {
+            "pageNum": str(page),
+            "pageSize": str(page_size),
+        }
+        response = await self.post("/kscxtj/queryXsksByxhList", data=request_data)
+        if not response.is_success:
+            raise JwcRequestError(
+                f"在请求 queryXsksByxhList 第{page}页时出错了：{response.status_code}"
+            )
+        return XsksByxhListResponse.model_validate_json(response.content)
+
+    async def query_XsksByxhList(
+        self, xn: str, xq: str, page_size: int = DEFAULT_EXAM_PAGE_SIZE
+    ) -> XsksList:
+        """请求第一页得知总页数后，其余各页并发请求"""
+        q = {"ppylx": "", "pkkyx": "", "pxn": xn, "pxq": xq}
+        first = await self.query_XsksByxhList_page(q, 1, page_size)
+        # 服务器可能限制每页条数，之后的页按实际条数请求，页码才能对应
+        if first.pageSize:
+            page_size = first.pageSize
+        elif first.navigateLastPage > 1:
+            page_size = len(first.list)
+
+        rest = await asyncio.gather(
+            *(
+                self.query_XsksByxhList_page(q, i, page_size)
+                for i in range(2, first.navigateLastPage + 1)
+            )
+        )
+        entries: list[XsksEntry] = list(first.list)
+        for page in rest:
+            entries += page.list
+        return XsksList(entries)
@@ -1,4 +1,5 @@
 from typing import Optional
+
 from pydantic import BaseModel, RootModel
 
 
@@ -9,6 +10,13 @@ class CurrentSemester(BaseModel):
     XQ: str
 
 
+class Xsxx(BaseModel):
+    """学生信息（只取用到的字段）"""
+
+    # 学号
+    XH: str
+
+
 class KbEntry(BaseModel):
     # 课程文字说明
     KCWZSM: None | str
@@ -73,3 +81,5 @@ class XsksByxhListResponse(BaseModel):
 
     list: list[XsksEntry]  # 原始数据列表
     navigateLastPage: int  # 最后一页页码
+    pageSize: int | None = None  # 实际的每页条数
+    total: int | None = None  # 总条数
@@ -1,4 +1,5 @@
 import datetime
+
 import requests
 
 from jwc.jwapi_common import JwcRequestError
@@ -1,14 +1,14 @@
+import datetime
 import re
 from typing import IO
-import zoneinfo
-from openpyxl import load_workbook
-import datetime
 
 import openpyxl.utils
+from openpyxl import load_workbook
+
+from ..jwapi_model import ErrorEntry
 from ..schedule import Schedule, ScheduleEntry
 from ..schedule_utils import LAB
-from ..jwapi_model import ErrorEntry
-from .api_model import PhxpLabCourse, PhxpResponse
+from .api_model import PhxpBriefResponse, PhxpLabCourseBrief, PhxpResponse
 
 
 def arrange(
@@ -128,16 +128,15 @@ def arrange(
     wb.save(out_file)
 
 
-def parse_lab_entry(item: PhxpLabCourse):
-    zone = zoneinfo.ZoneInfo("Asia/Shanghai")
-
-    def _add_tz(t: str):
-        return datetime.datetime.strptime(t, "%H:%M").time().replace(tzinfo=zone)
+def parse_lab_entry(item: PhxpLabCourseBrief):
+    def _to_minutes(t: str):
+        hour, minute = map(int, t.split(":"))
+        return hour * 60 + minute
 
     return ScheduleEntry(
         item.ModuleName,
         datetime.datetime.strptime(item.ClassDate, "%Y/%m/%d %H:%M:%S").date(),
-        [(_add_tz(item.StartTime), _add_tz(item.EndTime))],
+        ((_to_minutes(item.StartTime), _to_minutes(item.EndTime)),),
         item.ClassRoom,
         LAB,
         teacher=item.TeacherName,
@@ -146,7 +145,7 @@ def parse_lab_entry(item: PhxpLabCourse):
 
 
 def create_schedule_from(
-    obj: PhxpResponse, semester_desc: str, start_date: datetime.date
+    obj: PhxpResponse | PhxpBriefResponse, semester_desc: str, start_date: datetime.date
 ):
     entries: list[ScheduleEntry] = []
     for item in obj.rows:
@@ -1,7 +1,20 @@
 from pydantic import BaseModel
 
 
-class PhxpLabCourse(BaseModel):
+class PhxpLabCourseBrief(BaseModel):
+    """物理实验课程条目中生成日历用到的字段"""
+
+    CourseName: str
+    TeacherName: str
+    ClassDate: str
+    StartTime: str
+    EndTime: str
+    LabName: str
+    ClassRoom: str
+    ModuleName: str
+
+
+class PhxpLabCourse(PhxpLabCourseBrief):
     """物理实验课程条目模型"""
 
     SemesterID: str
@@ -49,3 +62,10 @@ class PhxpResponse(BaseModel):
 
     total: str
     rows: list[PhxpLabCourse]
+
+
+class PhxpBriefResponse(BaseModel):
+    """物理实验平台响应模型，只校验生成日历用到的字段，用于已完整校验过的缓存"""
+
+    total: str
+    rows: list[PhxpLabCourseBrief]
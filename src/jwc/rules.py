@@ -0,0 +1,323 @@
+"""
+偏好设置中用户编写的正则规则：编译、检查与限时匹配。
+
+规则由用户的偏好设置文件提供，可能写错，也可能含有会导致回溯爆炸的写法（如 (a+)+）。
+编译失败的规则被跳过，并由 lint_rules 报告；设置了匹配时间预算且安装了 regex 模块时，
+用其 timeout 参数限制每次匹配的时间，超时视为不匹配，以免一条规则拖慢所有日历的渲染。
+开启统计时，规则记录匹配次数与耗时，analyze_rule_usage 据此找出从未匹配或被更早规则遮蔽的规则。
+"""
+
+import importlib
+import re
+import time
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import cache
+from types import ModuleType
+from typing import Any, Literal
+
+try:
+    import regex
+except ImportError:
+    regex = None
+
+
+# 每次匹配的时间预算（秒），None 为不限制
+_match_timeout: float | None = None
+# 为 True 时之后编译的规则记录匹配次数与耗时
+_profiling = False
+
+
+def match_timeout() -> float | None:
+    return _match_timeout
+
+
+def set_match_timeout(seconds: float | None):
+    """设置之后编译的规则的匹配时间预算；需安装 regex 模块才生效"""
+    global _match_timeout
+    _match_timeout = seconds
+
+
+def timeout_supported() -> bool:
+    return regex is not None
+
+
+def compile_engine() -> Literal["re", "regex"]:
+    """compile_rule 此时用哪个模块编译规则；二者支持的语法不尽相同（如 \\p{Han}、占有型重复）"""
+    return "regex" if regex is not None and _match_timeout is not None else "re"
+
+
+def profiling() -> bool:
+    return _profiling
+
+
+def set_profiling(enabled: bool):
+    """开启或关闭之后编译的规则的匹配统计"""
+    global _profiling
+    _profiling = enabled
+
+
+@dataclass(slots=True)
+class RuleStats:
+    attempts: int = 0
+    hits: int = 0
+    # 累计匹配耗时（纳秒）
+    elapsed_ns: int = 0
+    # 尝试匹配过的不同文本
+    texts: set[str] = field(default_factory=set[str])
+
+    def record(self, text: str, hit: bool, elapsed_ns: int):
+        self.attempts += 1
+        self.hits += hit
+        self.elapsed_ns += elapsed_ns
+        self.texts.add(text)
+
+
+class RulePattern:
+    """
+    一条规则的正则。设有时间预算时用 regex 模块匹配，超时视为不匹配并计入 timeouts；
+    profile 为 True 时每次匹配计入 stats。
+    """
+
+    __slots__ = ("_compiled", "flags", "pattern", "stats", "timeout", "timeouts")
+
+    def __init__(
+        self,
+        pattern: str,
+        flags: int = 0,
+        timeout: float | None = None,
+        profile: bool = False,
+    ):
+        self.pattern = pattern
+        self.flags = flags
+        self.timeout = timeout if regex is not None else None
+        self.timeouts = 0
+        self.stats = RuleStats() if profile else None
+        # re 与 regex 的 IGNORECASE、MULTILINE 等标志取值相同
+        self._compiled: Any = (
+            regex.compile(pattern, flags)
+            if regex is not None and self.timeout is not None
+            else re.compile(pattern, flags)
+        )
+
+    def __repr__(self) -> str:
+        return f"RulePattern({self.pattern!r})"
+
+    def search(self, text: str) -> bool:
+        if self.stats is None:
+            return self.test(text)
+        started = time.perf_counter_ns()
+        found = False
+        try:
+            found = self.test(text)
+        finally:
+            self.stats.record(text, found, time.perf_counter_ns() - started)
+        return found
+
+    def subn(self, repl: str, text: str) -> tuple[str, int]:
+        if self.stats is None:
+            return self._subn(repl, text)
+        started = time.perf_counter_ns()
+        n = 0
+        try:
+            result, n = self._subn(repl, text)
+        finally:
+            self.stats.record(text, n > 0, time.perf_counter_ns() - started)
+        return result, n
+
+    def test(self, text: str) -> bool:
+        """同 search，但不计入 stats"""
+        if self.timeout is None:
+            return self._compiled.search(text) is not None
+        try:
+            return self._compiled.search(text, timeout=self.timeout) is not None
+        except TimeoutError:
+            self.timeouts += 1
+            return False
+
+    def _subn(self, repl: str, text: str) -> tuple[str, int]:
+        if self.timeout is None:
+            return self._compiled.subn(repl, text)
+        try:
+            return self._compiled.subn(repl, text, timeout=self.timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            return text, 0
+
+
+_COMPILE_ERRORS: tuple[type[Exception], ...] = (
+    (re.error,) if regex is None else (re.error, regex.error)
+)
+
+
+def compile_rule(pattern: str, flags: int = 0) -> RulePattern | None:
+    """编译失败时返回 None（由 lint_rules 报告）"""
+    try:
+        return RulePattern(pattern, flags, _match_timeout, _profiling)
+    except _COMPILE_ERRORS:
+        return None
+
+
+@dataclass
+class RuleProblem:
+    field: str
+    # 从 0 开始
+    index: int
+    pattern: str
+    severity: Literal["error", "warning"]
+    message: str
+
+    def describe(self) -> str:
+        return f"{self.field} 第 {self.index + 1} 条规则 {self.pattern!r}：{self.message}"
+
+
+@cache
+def _sre_modules() -> tuple[ModuleType, ModuleType] | None:
+    """re 的内部模块 (_constants, _parser)，其他 Python 实现或版本中可能没有"""
+    try:
+        return importlib.import_module("re._constants"), importlib.import_module(
+            "re._parser"
+        )
+    except ImportError:
+        return None
+
+
+def _has_nested_unbounded_repeat(
+    items: Iterable[tuple[Any, Any]], inside: bool, c: ModuleType
+) -> bool:
+    """在无上限的重复中又有无上限的重复，如 (a+)+、(.*)*、(\\w+\\s?)*；c 为 re._constants"""
+    for op, av in items:
+        if op in (c.MAX_REPEAT, c.MIN_REPEAT, c.POSSESSIVE_REPEAT):
+            _, hi, sub = av
+            unbounded = hi == c.MAXREPEAT
+            if unbounded and inside:
+                return True
+            # 占有型重复不回溯
+            nested = inside or (unbounded and op != c.POSSESSIVE_REPEAT)
+            if _has_nested_unbounded_repeat(sub, nested, c):
+                return True
+        elif op == c.SUBPATTERN:
+            if _has_nested_unbounded_repeat(av[-1], inside, c):
+                return True
+        elif op == c.BRANCH:
+            if any(_has_nested_unbounded_repeat(b, inside, c) for b in av[1]):
+                return True
+        elif op in (c.ASSERT, c.ASSERT_NOT):
+            if _has_nested_unbounded_repeat(av[1], inside, c):
+                return True
+        # 固化分组（ATOMIC_GROUP）不回溯，不必检查
+    return False
+
+
+def lint_pattern(
+    pattern: str, flags: int = 0
+) -> tuple[Literal["error", "warning"], str] | None:
+    # 用 compile_rule 将用的模块检查能否编译
+    try:
+        if regex is not None and compile_engine() == "regex":
+            _ = regex.compile(pattern, flags)
+        else:
+            _ = re.compile(pattern, flags)
+    except _COMPILE_ERRORS as e:
+        return "error", f"无法编译（{e}），已忽略此规则"
+
+    sre = _sre_modules()
+    if sre is None:
+        return None
+    constants, parser = sre
+    try:
+        tree = parser.parse(pattern, flags)
+    except re.error:
+        # 只有 regex 模块支持的写法，不检查嵌套的重复（有时间预算时匹配也不会卡住）
+        return None
+    if _has_nested_unbounded_repeat(tree, False, constants):
+        return "warning", "嵌套的重复（如 (a+)+）可能导致匹配时间随文本长度指数增长"
+    return None
+
+
+def lint_rules(
+    field: str, rules: Iterable[tuple[str, object]], flags: int = 0
+) -> list[RuleProblem]:
+    problems: list[RuleProblem] = []
+    for i, (pattern, _) in enumerate(rules):
+        result = lint_pattern(pattern, flags)
+        if result is not None:
+            problems.append(RuleProblem(field, i, pattern, *result))
+    return problems
+
+
+@dataclass
+class RuleUsage:
+    field: str
+    # 从 0 开始
+    index: int
+    pattern: str
+    attempts: int
+    hits: int
+    elapsed_ns: int
+    # 在统计期间出现过的文本中，能匹配的个数，及其中由本规则最先匹配（即实际生效）的个数
+    matched: int
+    won: int
+    # 被遮蔽时，最常抢先匹配的更早规则的序号
+    shadowed_by: int | None
+
+    @property
+    def never_matches(self) -> bool:
+        return self.matched == 0
+
+    @property
+    def shadowed(self) -> bool:
+        return self.matched > 0 and self.won == 0
+
+
+def analyze_rule_usage(
+    field: str, patterns: Sequence[RulePattern | None]
+) -> list[RuleUsage]:
+    """
+    patterns 为按顺序取第一条匹配的规则，应已开启统计并匹配过一些文本。
+    以各规则见过的文本为样本，逐条重新匹配，找出从未匹配及总被更早规则抢先匹配的规则。
+    无法编译的规则（None）不在结果中。
+    """
+    texts: set[str] = set()
+    for p in patterns:
+        if p is not None and p.stats is not None:
+            texts |= p.stats.texts
+
+    matched = [0] * len(patterns)
+    won = [0] * len(patterns)
+    preempted_by = [Counter[int]() for _ in patterns]
+    for text in texts:
+        first: int | None = None
+        for i, p in enumerate(patterns):
+            if p is None or not p.test(text):
+                continue
+            matched[i] += 1
+            if first is None:
+                first = i
+                won[i] += 1
+            else:
+                preempted_by[i][first] += 1
+
+    usages: list[RuleUsage] = []
+    for i, p in enumerate(patterns):
+        if p is None:
+            continue
+        stats = p.stats or RuleStats()
+        shadowed_by = None
+        if matched[i] and not won[i]:
+            [(shadowed_by, _)] = preempted_by[i].most_common(1)
+        usages.append(
+            RuleUsage(
+                field,
+                i,
+                p.pattern,
+                stats.attempts,
+                stats.hits,
+                stats.elapsed_ns,
+                matched[i],
+                won[i],
+                shadowed_by,
+            )
+        )
+    return usages
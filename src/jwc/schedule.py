@@ -1,25 +1,34 @@
+import datetime
+from collections.abc import Callable, Iterable, Sequence
 from dataclasses import dataclass
-from typing import Self
-from typing_extensions import Hashable
+from functools import cache
+from typing import Any, Self, cast
+
 import ics  # pyright: ignore[reportMissingTypeStubs]
-import datetime
-from jwc.schedule_preset_trules import TransformationResults
+from ics.grammar.parse import Container  # pyright: ignore[reportMissingTypeStubs]
+from ics.serializers.event_serializer import (  # pyright: ignore[reportMissingTypeStubs]
+    EventSerializer,
+)
+from ics.utils import uid_gen  # pyright: ignore[reportMissingTypeStubs]
+from typing_extensions import Hashable
 
 from jwc.jwapi_model import (
     ErrorEntry,
+    KbEntry,
     XsksList,
     XszykbzongResponse,
 )
-
+from jwc.schedule_preference import JwcSchedulePreference
+from jwc.schedule_preset_trules import TransformationResults
 from jwc.schedule_utils import (
     EXAM,
     LESSON,
-    ScheduleEntryKind,
-    ScheduleEntry,
     ScheduledDates,
+    ScheduleEntry,
+    ScheduleEntryKind,
+    interning_time_ranges,
     time_slot_mapping,
 )
-from jwc.schedule_preference import JwcSchedulePreference
 
 
 def get_semester_desc_brief(xn: str, xq: str) -> str:
@@ -39,91 +48,227 @@ def get_calendar_name(semester_desc: str, kind: ScheduleEntryKind = LESSON):
     return f"{base_name} - {datetime.date.today().strftime('%m月%d日')}更新"
 
 
-def time_range_smart_merge(entries: list[ScheduleEntry]):
-    # print(f"[debug] time_range_smart_merge: {len(entries)} entries before merging")
-
-    def make_identifying_key(e: ScheduleEntry):
-        # 将以下这些字段全同的条目视为可合并的同一课程
-        # 目前，我们不对 ScheduledDates 中的周次做进一步的细拆
-        return (e.name, e.dates, e.location, e.kind, e.teacher, e.lab_name)
-
-    grouped_entries: dict[Hashable, list[ScheduleEntry]] = {}
-
-    # def debug_pprint_entry(entry: ScheduleEntry):
-    #     from pprint import pprint
-
-    #     pprint(entry)
-    #     print("---")
-
-    for entry in sorted(entries, key=lambda e: e.name):
-        key = make_identifying_key(entry)
-        if key not in grouped_entries:
-            grouped_entries[key] = []
-        grouped_entries[key].append(entry)
-
-    final_entries: list[ScheduleEntry] = []
-
-    for key, group in grouped_entries.items():
-        # print(f"#####  GROUP {key}  #####")
-
-        def is_candidate_or_finalize(e: ScheduleEntry):
-            """如果条目是考试，或者没有具体时间范围，则直接加入最终结果，并返回 False
-            否则返回 True，表示该条目是潜在可合并的候选条目"""
-            if not e.time_ranges or e.kind == EXAM:
-                final_entries.append(e)
-                return False
-            return True
-
-        def get_start_time(e: ScheduleEntry) -> datetime.time:
-            return e.time_ranges[0][0]
-
-        group = sorted(filter(is_candidate_or_finalize, group), key=get_start_time)
-
-        # print(f"#####  group have {len(group)} candidate entries")
-        # for e in group:
-        #     debug_pprint_entry(e)
-
-        # 对同一课程时间重叠或相邻的条目进行合并
-        # 相邻的条件是：一条目开始时间不晚于另一条目结束的后 15 分钟
-        # 目前假定 time_ranges 中只会有一个范围
-
-        # 不能使用 for 循环，因为待会要删元素
-        i = 0
-        while i < len(group):
-            entryA = group[i]
-            stA = group[i].time_ranges[0][0]
-            etA = group[i].time_ranges[0][1]
-
-            j = i + 1
-            while j < len(group):
-                entryB = group[j]
-                etB = group[j].time_ranges[0][1]
-                if entryA.overlaps_or_adjacent_to(entryB.time_ranges[0], allow_gap=15):
-                    newEntry = ScheduleEntry(
-                        name=entryA.name,
-                        dates=entryA.dates,
-                        time_ranges=[(stA, max(etA, etB))],
-                        location=entryA.location,
-                        kind=entryA.kind,
-                        teacher=entryA.teacher,
-                        lab_name=entryA.lab_name,
-                        description=list(
-                            set(entryA.description) | set(entryB.description)
-                        ),
-                    )
-                    # print(f"[debug] new merged entry:")
-                    # debug_pprint_entry(newEntry)
+# ics-py 按方法名的顺序调用各 serialize_* 方法输出日程的各行，其中这些方法输出的行取决于偏好设置
+_PREFERENCE_DEPENDENT_SERIALIZERS = frozenset(
+    {
+        "serialize_alarm",
+        "serialize_description",
+        "serialize_location",
+        "serialize_summary",
+    }
+)
+
+type _Serializer = Callable[[ics.Event, Container], None]
+
+
+@cache
+def _serializer_runs() -> list[tuple[bool, list[_Serializer]]]:
+    """将 serialize_* 方法按顺序分为若干段，每段或都取决于偏好设置，或都与之无关"""
+    runs: list[tuple[bool, list[_Serializer]]] = []
+    serializers = cast(list[Any], EventSerializer.get_serializers())
+    for serialize in serializers:
+        dependent = serialize.__name__ in _PREFERENCE_DEPENDENT_SERIALIZERS
+        if runs and runs[-1][0] == dependent:
+            runs[-1][1].append(serialize)
+        else:
+            runs.append((dependent, [serialize]))
+    return runs
+
+
+def _serialize_with(event: ics.Event, serializers: list[_Serializer]) -> str:
+    container = Container("VEVENT")
+    for serialize in serializers:
+        serialize(event, container)
+    return "\r\n".join(str(line) for line in container)
+
+
+type _MergeKey = tuple[
+    str, ScheduledDates | datetime.date, str, ScheduleEntryKind, str, str
+]
+
+
+def _identifying_key(e: ScheduleEntry) -> _MergeKey:
+    # 将以下这些字段全同的条目视为可合并的同一课程
+    # 目前，我们不对 ScheduledDates 中的周次做进一步的细拆
+    return (e.name, e.dates, e.location, e.kind, e.teacher, e.lab_name)
+
+
+def _merge_group(group: list[ScheduleEntry], final_entries: list[ScheduleEntry]):
+    """合并同一课程的各条目，结果追加到 final_entries"""
+
+    def is_candidate_or_finalize(e: ScheduleEntry):
+        """如果条目是考试，或者没有具体时间范围，则直接加入最终结果，并返回 False
+        否则返回 True，表示该条目是潜在可合并的候选条目"""
+        if not e.time_ranges or e.kind == EXAM:
+            final_entries.append(e)
+            return False
+        return True
+
+    def get_start_time(e: ScheduleEntry) -> int:
+        return e.time_ranges[0][0]
+
+    group = sorted(filter(is_candidate_or_finalize, group), key=get_start_time)
+
+    # print(f"#####  group have {len(group)} candidate entries")
+    # for e in group:
+    #     debug_pprint_entry(e)
+
+    # 对同一课程时间重叠或相邻的条目进行合并
+    # 相邻的条件是：一条目开始时间不晚于另一条目结束的后 15 分钟
+    # 目前假定 time_ranges 中只会有一个范围
+
+    # 不能使用 for 循环，因为待会要删元素
+    i = 0
+    while i < len(group):
+        entryA = group[i]
+        stA = group[i].time_ranges[0][0]
+        etA = group[i].time_ranges[0][1]
+
+        j = i + 1
+        while j < len(group):
+            entryB = group[j]
+            etB = group[j].time_ranges[0][1]
+            if entryA.overlaps_or_adjacent_to(entryB.time_ranges[0], allow_gap=15):
+                newEntry = ScheduleEntry(
+                    name=entryA.name,
+                    dates=entryA.dates,
+                    time_ranges=((stA, max(etA, etB)),),
+                    location=entryA.location,
+                    kind=entryA.kind,
+                    teacher=entryA.teacher,
+                    lab_name=entryA.lab_name,
+                    description=list(set(entryA.description) | set(entryB.description)),
+                )
+                # print(f"[debug] new merged entry:")
+                # debug_pprint_entry(newEntry)
+
+                group[i] = newEntry
+                del group[j]
+                j -= 1
+            j += 1
+        i += 1
+
+    final_entries.extend(group)
+
+
+class SmartMerger:
+    """
+    time_range_smart_merge 的增量版本：可逐个加入条目（如边解析边加入），不必先建立完整的列表。
+    _merge_group 按开始时间稳定排序，同一开始时间的条目按到达顺序相邻；
+    接连到达的完全相同的条目，只保留两个与保留全部的合并结果相同，其余到达时即丢弃。
+    因此合并许多学生的课表时，内存只随不同条目的数量增长。
+    """
+
+    def __init__(self):
+        self._groups: dict[_MergeKey, list[ScheduleEntry]] = {}
+        # (组, 开始时间) -> 最后到达的可合并条目的（时间范围, 描述），及其前一个是否与之相同
+        self._last: dict[tuple[_MergeKey, int], tuple[Hashable | None, bool]] = {}
+
+    def add(self, entry: ScheduleEntry):
+        key = _identifying_key(entry)
+        group = self._groups.setdefault(key, [])
+        if entry.time_ranges and entry.kind != EXAM:
+            block = (key, entry.time_ranges[0][0])
+            duplicate_key = (entry.time_ranges, tuple(entry.description))
+            last_key, last_repeated = self._last.get(block, (None, False))
+            repeated = last_key == duplicate_key
+            if repeated and last_repeated:
+                return
+            self._last[block] = (duplicate_key, repeated)
+        group.append(entry)
+
+    def result(self) -> list[ScheduleEntry]:
+        final_entries: list[ScheduleEntry] = []
+        # 各组按课程名称排序，同名的按首次出现的顺序（排序是稳定的）
+        for _, group in sorted(self._groups.items(), key=lambda kv: kv[0][0]):
+            _merge_group(group, final_entries)
+        return final_entries
+
+
+def time_range_smart_merge(entries: Iterable[ScheduleEntry]) -> list[ScheduleEntry]:
+    merger = SmartMerger()
+    for entry in entries:
+        merger.add(entry)
+    return merger.result()
+
+
+# 预先渲染的日程中 UID 的占位符，组装日历时逐个替换为新生成的 UID
+UID_PLACEHOLDER = "JWC-UID-PLACEHOLDER"
+
+
+@dataclass
+class RenderedEntry:
+    """一个条目按一组偏好设置渲染出的各次日程（VEVENT 文本，其中 UID 为占位符）"""
+
+    events: list[str]
+    transformation_results: TransformationResults
+
+
+def render_entry(
+    entry: ScheduleEntry,
+    start_date: datetime.date,
+    semester_desc: str,
+    preferences: Sequence[JwcSchedulePreference],
+) -> list[RenderedEntry]:
+    """
+    按各组偏好设置渲染一个条目。日程的展开及时间、分类等行的序列化只做一次；
+    名称、描述、地点、提醒每组偏好只算一次，而非每次日程都算。
+    """
+    runs = _serializer_runs()
+    categories = [get_calendar_name(semester_desc, entry.kind)]
+    results = [
+        RenderedEntry([], TransformationResults(set(), set(), set())) for _ in preferences
+    ]
+
+    # 每组偏好下，各段取决于偏好设置的行
+    dependent_parts: list[list[str]] = []
+    for preference, r in zip(preferences, results):
+        event = ics.Event()
+        entry.get_ics_fields(r.transformation_results, preference).apply(event)
+        dependent_parts.append(
+            [_serialize_with(event, ser) if dep else "" for dep, ser in runs]
+        )
+
+    for base in entry.ics_base_events(start_date, categories):
+        base.uid = UID_PLACEHOLDER
+        fixed = [_serialize_with(base, ser) if not dep else "" for dep, ser in runs]
+        for r, parts in zip(results, dependent_parts):
+            lines = [p if dep else f for (dep, _), p, f in zip(runs, parts, fixed)]
+            r.events.append(
+                "\r\n".join(["BEGIN:VEVENT", *filter(None, lines), "END:VEVENT"])
+            )
+    return results
+
+
+def _add_rendered(out: list[str], tr: TransformationResults, r: RenderedEntry):
+    """将渲染结果中的日程（填入新的 UID）追加到 out，并汇总转换结果"""
+    tr.untransformed_lessons |= r.transformation_results.untransformed_lessons
+    tr.untransformed_labs |= r.transformation_results.untransformed_labs
+    tr.untransformed_locations |= r.transformation_results.untransformed_locations
+    out += (e.replace(UID_PLACEHOLDER, uid_gen(), 1) for e in r.events)
+
+
+def _assemble_calendar(events: list[str]) -> str:
+    head = ics.Calendar().serialize().removesuffix("\r\nEND:VCALENDAR")
+    return "\r\n".join([head, *events, "END:VCALENDAR"])
+
+
+type EntryRenderer = Callable[
+    [ScheduleEntry, datetime.date, str, Sequence[JwcSchedulePreference]],
+    list[RenderedEntry],
+]
+
 
-                    group[i] = newEntry
-                    del group[j]
-                    j -= 1
-                j += 1
-            i += 1
+def parse_kb_entry(item: KbEntry, start_date: datetime.date) -> ScheduleEntry | None:
+    """解析课表中的一项，无法识别时返回 None，格式有误时抛出 ValueError"""
+    return (
+        ScheduleEntry.parse_exam(item, start_date)
+        or ScheduleEntry.parse_lab(item)
+        or ScheduleEntry.parse_lesson(item)
+    )
 
-        final_entries.extend(group)
 
-    # print(f"[debug] time_range_smart_merge: {len(final_entries)} entries after merging")
-    return final_entries
+type KbEntryParser = Callable[[KbEntry, datetime.date], ScheduleEntry | None]
 
 
 @dataclass
@@ -139,31 +284,44 @@ class Schedule:
         semester_desc: str,
         start_date: datetime.date,
         error_entries: list[ErrorEntry] | None = None,
+        parse: KbEntryParser = parse_kb_entry,
     ) -> Self:
-        entries: list[ScheduleEntry] = []
-        for item in obj.root:
-            if item.KEY == "bz":
-                # 忽略备注条目
-                continue
-            entry = None
-            try:
-                entry = (
-                    ScheduleEntry.parse_exam(item, start_date)
-                    or ScheduleEntry.parse_lab(item)
-                    or ScheduleEntry.parse_lesson(item)
-                )
-            except ValueError as e:
-                if error_entries is not None:
-                    error_entries.append(
-                        ErrorEntry(entry=item.model_dump_json(), reason=str(e))
-                    )
-                continue
-            if entry is not None:
-                entries.append(entry)
+        return cls.from_kb_items(
+            obj.root, semester_desc, start_date, error_entries, parse
+        )
 
-        entries = time_range_smart_merge(entries)
-
-        return cls(entries, semester_desc, start_date)
+    @classmethod
+    def from_kb_items(
+        cls,
+        items: Iterable[KbEntry],
+        semester_desc: str,
+        start_date: datetime.date,
+        error_entries: list[ErrorEntry] | None = None,
+        parse: KbEntryParser = parse_kb_entry,
+    ) -> Self:
+        """
+        同 from_kb，但逐个读取条目并边解析边合并，items 可以是 jwc.json_stream.iter_kb_entries
+        产出的流，不必先将整个响应读入内存。
+        """
+        with interning_time_ranges():
+            merger = SmartMerger()
+            for item in items:
+                if item.KEY == "bz":
+                    # 忽略备注条目
+                    continue
+                entry = None
+                try:
+                    entry = parse(item, start_date)
+                except ValueError as e:
+                    if error_entries is not None:
+                        error_entries.append(
+                            ErrorEntry(entry=item.model_dump_json(), reason=str(e))
+                        )
+                    continue
+                if entry is not None:
+                    merger.add(entry)
+
+            return cls(merger.result(), semester_desc, start_date)
 
     def to_ics(
         self, preference: JwcSchedulePreference
@@ -182,6 +340,47 @@ class Schedule:
             )
         return cal, transformation_results
 
+    def to_ics_variants(
+        self,
+        preferences: Sequence[JwcSchedulePreference],
+        render: EntryRenderer = render_entry,
+    ) -> list[tuple[str, TransformationResults]]:
+        """
+        按多组偏好设置分别渲染 ics 文本，结果与逐个调用 to_ics 再 serialize 等价。
+        render 可替换为带缓存的版本（见 jwc.cli.render_cache）。
+        """
+        results = [TransformationResults(set(), set(), set()) for _ in preferences]
+        events: list[list[str]] = [[] for _ in preferences]
+
+        for entry in self.entries:
+            rendered = render(entry, self.start_date, self.semester_desc, preferences)
+            for out, tr, r in zip(events, results, rendered):
+                _add_rendered(out, tr, r)
+
+        return [(_assemble_calendar(out), tr) for out, tr in zip(events, results)]
+
+    def to_ics_partitions(
+        self,
+        preference: JwcSchedulePreference,
+        classify: Callable[[ScheduleEntry], str],
+        render: EntryRenderer = render_entry,
+    ) -> dict[str, tuple[str, TransformationResults]]:
+        """
+        按 classify 给出的分组名称将条目分到多个日历，各条目只渲染一次。
+        返回 分组名称 -> (ics 文本, 转换结果)，按各分组首次出现的顺序；没有条目的分组不在结果中。
+        """
+        partitions: dict[str, tuple[list[str], TransformationResults]] = {}
+        for entry in self.entries:
+            out, tr = partitions.setdefault(
+                classify(entry), ([], TransformationResults(set(), set(), set()))
+            )
+            [r] = render(entry, self.start_date, self.semester_desc, [preference])
+            _add_rendered(out, tr, r)
+
+        return {
+            key: (_assemble_calendar(out), tr) for key, (out, tr) in partitions.items()
+        }
+
     def query_lesson_at(
         self,
         q_week_id: int,
@@ -0,0 +1,289 @@
+"""
+课表的列式（struct-of-arrays）表示：各字段存为 numpy 数组，字符串存为字符串表中的下标，
+可一次性向量化地展开所有日程的发生日期，用于统计分析或批量处理多名学生的课表。
+
+每个时间范围占一行，同一条目的各行相邻，entry 列为其在原 entries 中的序号；
+没有时间范围的（全天）条目占一行，其开始、结束分钟数为 -1。
+日期与时间均为 Asia/Shanghai 的本地时间，不带时区。
+"""
+
+import datetime
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Self
+
+from jwc.schedule import Schedule
+from jwc.schedule_utils import (
+    ScheduledDates,
+    ScheduleEntry,
+    ScheduleEntryKind,
+)
+
+if TYPE_CHECKING:
+    import numpy
+    import numpy.typing as npt
+
+
+# 周次位掩码为 uint64，可表示第 0~63 周
+MAX_WEEK = 63
+# 按周重复的条目，其 date 列为 NaT；按日期的条目，其 day_of_week 列为 0
+NO_DAY_OF_WEEK = 0
+NO_TIME = -1
+
+
+def require_numpy(purpose: str = "使用列式课表"):
+    """载入 numpy；未安装时报错，说明是 purpose 需要它"""
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError(f"需要安装 numpy 才能{purpose}") from e
+    return numpy
+
+
+class _StringTable:
+    def __init__(self, strings: Sequence[str] = ()):
+        self.strings: list[str] = list(strings)
+        self._index: dict[str, int] = {s: i for i, s in enumerate(self.strings)}
+
+    def add(self, s: str) -> int:
+        i = self._index.get(s)
+        if i is None:
+            i = self._index[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+
+def _week_mask(weeks: list[int]) -> int:
+    mask = 0
+    for w in weeks:
+        if not 0 <= w <= MAX_WEEK:
+            raise ValueError(f"周次超出范围：{w}")
+        mask |= 1 << w
+    return mask
+
+
+@dataclass
+class Occurrences:
+    """展开后的每次日程，按开始时间排序；row 为其在 ColumnarSchedule 中的行号"""
+
+    row: "npt.NDArray[numpy.intp]"
+    date: "npt.NDArray[numpy.datetime64]"
+    # 全天日程的 start、end 为 NaT
+    start: "npt.NDArray[numpy.datetime64]"
+    end: "npt.NDArray[numpy.datetime64]"
+
+    def __len__(self) -> int:
+        return len(self.row)
+
+
+@dataclass
+class ColumnarSchedule:
+    semester_desc: str
+    start_date: datetime.date
+    strings: list[str]
+    # 以下各列长度相同，均按行
+    entry: "npt.NDArray[numpy.int32]"
+    # 由 concat 合并时，行来自第几个课表
+    source: "npt.NDArray[numpy.int32]"
+    kind: "npt.NDArray[numpy.int8]"
+    day_of_week: "npt.NDArray[numpy.int8]"
+    week_mask: "npt.NDArray[numpy.uint64]"
+    date: "npt.NDArray[numpy.datetime64]"
+    start_minute: "npt.NDArray[numpy.int16]"
+    end_minute: "npt.NDArray[numpy.int16]"
+    name: "npt.NDArray[numpy.int32]"
+    location: "npt.NDArray[numpy.int32]"
+    teacher: "npt.NDArray[numpy.int32]"
+    lab_name: "npt.NDArray[numpy.int32]"
+    # 条目描述不适合按列存储，按条目序号保存
+    descriptions: list[list[str]]
+
+    def __len__(self) -> int:
+        return len(self.entry)
+
+    @classmethod
+    def from_schedule(cls, schedule: Schedule) -> Self:
+        np = require_numpy()
+        table = _StringTable()
+        rows: list[
+            tuple[int, int, int, int, datetime.date | None, int, int, int, int, int, int]
+        ] = []
+        descriptions: list[list[str]] = []
+        for i, e in enumerate(schedule.entries):
+            match e.dates:
+                case ScheduledDates():
+                    dow, mask, date = e.dates.day_of_week, _week_mask(e.dates.weeks), None
+                case datetime.datetime():
+                    dow, mask, date = NO_DAY_OF_WEEK, 0, e.dates.date()
+                case datetime.date():
+                    dow, mask, date = NO_DAY_OF_WEEK, 0, e.dates
+            strings = (
+                table.add(e.name),
+                table.add(e.location),
+                table.add(e.teacher),
+                table.add(e.lab_name),
+            )
+            for t0, t1 in e.time_ranges or ((NO_TIME, NO_TIME),):
+                rows.append((i, e.kind.value, dow, mask, date, t0, t1, *strings))
+            descriptions.append(e.description)
+
+        columns = list(zip(*rows)) or [()] * 11
+        return cls(
+            schedule.semester_desc,
+            schedule.start_date,
+            table.strings,
+            entry=np.array(columns[0], dtype=np.int32),
+            source=np.zeros(len(rows), dtype=np.int32),
+            kind=np.array(columns[1], dtype=np.int8),
+            day_of_week=np.array(columns[2], dtype=np.int8),
+            week_mask=np.array(columns[3], dtype=np.uint64),
+            date=np.array(
+                [d if d is not None else "NaT" for d in columns[4]],
+                dtype="datetime64[D]",
+            ),
+            start_minute=np.array(columns[5], dtype=np.int16),
+            end_minute=np.array(columns[6], dtype=np.int16),
+            name=np.array(columns[7], dtype=np.int32),
+            location=np.array(columns[8], dtype=np.int32),
+            teacher=np.array(columns[9], dtype=np.int32),
+            lab_name=np.array(columns[10], dtype=np.int32),
+            descriptions=descriptions,
+        )
+
+    @classmethod
+    def concat(cls, schedules: Sequence["ColumnarSchedule"]) -> "ColumnarSchedule":
+        """合并同一学期的多个课表（如一个班级的所有学生），source 列为其在参数中的序号"""
+        np = require_numpy()
+        if not schedules:
+            raise ValueError("concat: 没有要合并的课表")
+        first = schedules[0]
+        if any(s.start_date != first.start_date for s in schedules):
+            raise ValueError("concat: 只能合并开学日期相同的课表")
+
+        table = _StringTable(first.strings)
+        entry_offset = 0
+        entries: list[npt.NDArray[numpy.int32]] = []
+        string_columns: dict[str, list[npt.NDArray[numpy.int32]]] = {
+            "name": [],
+            "location": [],
+            "teacher": [],
+            "lab_name": [],
+        }
+        for s in schedules:
+            remap = np.array([table.add(x) for x in s.strings], dtype=np.int32)
+            for key, parts in string_columns.items():
+                parts.append(remap[getattr(s, key)])
+            entries.append(s.entry + entry_offset)
+            entry_offset += len(s.descriptions)
+
+        def cat(key: str):
+            return np.concatenate([getattr(s, key) for s in schedules])
+
+        return cls(
+            first.semester_desc,
+            first.start_date,
+            table.strings,
+            entry=np.concatenate(entries),
+            source=np.concatenate(
+                [np.full(len(s), i, dtype=np.int32) for i, s in enumerate(schedules)]
+            ),
+            kind=cat("kind"),
+            day_of_week=cat("day_of_week"),
+            week_mask=cat("week_mask"),
+            date=cat("date"),
+            start_minute=cat("start_minute"),
+            end_minute=cat("end_minute"),
+            name=np.concatenate(string_columns["name"]),
+            location=np.concatenate(string_columns["location"]),
+            teacher=np.concatenate(string_columns["teacher"]),
+            lab_name=np.concatenate(string_columns["lab_name"]),
+            descriptions=[d for s in schedules for d in s.descriptions],
+        )
+
+    def occurrences(
+        self,
+        date_from: datetime.date | None = None,
+        date_to: datetime.date | None = None,
+    ) -> Occurrences:
+        """展开所有日程的发生日期，可按日期范围（含两端）筛选"""
+        np = require_numpy()
+        # 按周重复的行：(行, 周次) 两两组合，取位掩码中为 1 的
+        bits = np.unpackbits(
+            self.week_mask.astype("<u8").view(np.uint8).reshape(-1, 8),
+            axis=1,
+            bitorder="little",
+        )
+        weekly_row, week = np.nonzero(bits)
+        weekly_offset = 7 * (week.astype(np.int64) - 1) + (
+            self.day_of_week[weekly_row].astype(np.int64) - 1
+        )
+        weekly_date = np.datetime64(self.start_date, "D") + weekly_offset
+
+        dated_row = np.flatnonzero(~np.isnat(self.date))
+        row = np.concatenate([weekly_row, dated_row])
+        date = np.concatenate([weekly_date, self.date[dated_row]])
+
+        keep = np.ones(len(row), dtype=bool)
+        if date_from is not None:
+            keep &= date >= np.datetime64(date_from, "D")
+        if date_to is not None:
+            keep &= date <= np.datetime64(date_to, "D")
+        row, date = row[keep], date[keep]
+
+        start_minute = self.start_minute[row]
+        all_day = start_minute == NO_TIME
+        day_start = date.astype("datetime64[m]")
+        start = day_start + start_minute.astype("timedelta64[m]")
+        end = day_start + self.end_minute[row].astype("timedelta64[m]")
+        start[all_day] = np.datetime64("NaT")
+        end[all_day] = np.datetime64("NaT")
+
+        # 全天日程排在当天最前
+        order = np.lexsort((start_minute, date))
+        return Occurrences(row[order], date[order], start[order], end[order])
+
+    def to_entries(
+        self, rows: "npt.NDArray[numpy.intp] | None" = None
+    ) -> list[ScheduleEntry]:
+        """
+        转换回 ScheduleEntry，rows 为要转换的行号（默认全部），同一条目的行合为一个条目。
+        按日期的条目转换回 datetime.date（考试原为 datetime.datetime）。
+        """
+        np = require_numpy()
+        if rows is None:
+            rows = np.arange(len(self), dtype=np.intp)
+        rows = np.unique(rows)
+
+        result: list[ScheduleEntry] = []
+        for group in np.split(rows, np.flatnonzero(np.diff(self.entry[rows])) + 1):
+            if not len(group):
+                continue
+            r = int(group[0])
+            dates: ScheduledDates | datetime.date
+            if np.isnat(self.date[r]):
+                mask = int(self.week_mask[r])
+                weeks = [w for w in range(MAX_WEEK + 1) if mask >> w & 1]
+                dates = ScheduledDates(weeks, int(self.day_of_week[r]))  # pyright: ignore[reportArgumentType]
+            else:
+                dates = self.date[r].item()
+            time_ranges = tuple(
+                (int(self.start_minute[g]), int(self.end_minute[g]))
+                for g in group
+                if self.start_minute[g] != NO_TIME
+            )
+            result.append(
+                ScheduleEntry(
+                    self.strings[int(self.name[r])],
+                    dates,
+                    time_ranges,
+                    self.strings[int(self.location[r])],
+                    ScheduleEntryKind(int(self.kind[r])),
+                    teacher=self.strings[int(self.teacher[r])],
+                    description=list(self.descriptions[int(self.entry[r])]),
+                    lab_name=self.strings[int(self.lab_name[r])],
+                )
+            )
+        return result
+
+    def to_schedule(self, rows: "npt.NDArray[numpy.intp] | None" = None) -> Schedule:
+        return Schedule(self.to_entries(rows), self.semester_desc, self.start_date)
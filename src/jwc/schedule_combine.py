@@ -0,0 +1,188 @@
+"""
+合并多个来源的课表并去重：同一场考试既出现在课表（parse_exam）中，也出现在考试安排
+（from_XsksList_item）中；同一次实验既出现在课表（parse_lab）中，也出现在物理实验选课平台
+（phxp.parse_lab_entry）中。各来源的写法不尽相同（名称带不带“期末考试”、全角半角、
+时间按节次还是按实际时间），故按 (日期, 种类) 建立哈希索引，在同一桶内比较时间是否重叠，
+以及规范化后的名称是否相近或地点是否相同。
+"""
+
+import dataclasses
+import datetime
+import re
+import unicodedata
+from collections.abc import Sequence
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import cache
+
+from jwc.schedule import Schedule
+from jwc.schedule_utils import (
+    MinuteSpan,
+    ScheduledDates,
+    ScheduleEntry,
+    ScheduleEntryKind,
+)
+
+DAY_MINUTES = 24 * 60
+# 规范化后的名称互不包含时，相似度不低于此值即视为同名
+NAME_SIMILARITY = 0.8
+
+_NON_WORD = re.compile(r"[\W_]+")
+_EXAM_SUFFIX = re.compile(r"(期中|期末|补考|缓考|重修)?考试$")
+
+
+def normalize_name(name: str) -> str:
+    """全角转半角、忽略大小写、去掉空白与标点，以及考试名称末尾的“期末考试”等"""
+    text = _NON_WORD.sub("", unicodedata.normalize("NFKC", name).casefold())
+    return _EXAM_SUFFIX.sub("", text)
+
+
+def normalize_location(location: str) -> str:
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", location).casefold())
+
+
+@cache
+def similar_names(a: str, b: str) -> bool:
+    """a、b 为规范化后的名称"""
+    if not a or not b:
+        return False
+    if a in b or b in a:
+        return True
+    return SequenceMatcher(None, a, b).ratio() >= NAME_SIMILARITY
+
+
+@dataclass
+class Duplicate:
+    """source 中 entry 在 date 的日程与更早来源 kept_source 中 kept 的日程相同，已去除"""
+
+    date: datetime.date
+    entry: ScheduleEntry
+    source: str
+    kept: ScheduleEntry
+    kept_source: str
+
+
+@dataclass(slots=True)
+class _Indexed:
+    spans: tuple[MinuteSpan, ...]
+    names: tuple[str, ...]
+    location: str
+    entry: ScheduleEntry
+    source: str
+
+
+def _spans(entry: ScheduleEntry) -> tuple[MinuteSpan, ...]:
+    # 全天条目视为占据整天
+    return entry.time_ranges or ((0, DAY_MINUTES),)
+
+
+def _names(entry: ScheduleEntry) -> tuple[str, ...]:
+    return tuple(n for n in map(normalize_name, (entry.name, entry.lab_name)) if n)
+
+
+class DedupIndex:
+    """已收录的各次日程，按 (日期, 种类) 分桶"""
+
+    def __init__(self):
+        self._buckets: dict[tuple[datetime.date, ScheduleEntryKind], list[_Indexed]] = {}
+
+    def add(self, entry: ScheduleEntry, dates: Sequence[datetime.date], source: str):
+        item = _Indexed(
+            _spans(entry),
+            _names(entry),
+            normalize_location(entry.location),
+            entry,
+            source,
+        )
+        for date in dates:
+            self._buckets.setdefault((date, entry.kind), []).append(item)
+
+    def find(
+        self,
+        date: datetime.date,
+        entry: ScheduleEntry,
+        names: tuple[str, ...],
+        location: str,
+    ) -> _Indexed | None:
+        """与 entry 在 date 的日程相同的已收录日程：时间重叠，且名称相近或地点相同"""
+        spans = _spans(entry)
+        for item in self._buckets.get((date, entry.kind), ()):
+            if not any(
+                max(s1, s2) < min(e1, e2) for s1, e1 in spans for s2, e2 in item.spans
+            ):
+                continue
+            if (location and location == item.location) or any(
+                similar_names(a, b) for a in names for b in item.names
+            ):
+                return item
+        return None
+
+
+def _keep_dates(
+    entry: ScheduleEntry, dates: list[datetime.date], kept: list[bool]
+) -> ScheduleEntry | None:
+    """只保留 entry 中 kept 为 True 的各次日程；都不保留时返回 None"""
+    if all(kept):
+        return entry
+    if not any(kept):
+        return None
+    # 只有按周重复的条目会有多个日期，其 all_dates 与 weeks 一一对应
+    assert isinstance(entry.dates, ScheduledDates)
+    weeks = [w for w, k in zip(entry.dates.weeks, kept) if k]
+    return dataclasses.replace(
+        entry, dates=ScheduledDates(weeks, entry.dates.day_of_week)
+    )
+
+
+def dedup_sources(
+    sources: Sequence[tuple[str, Schedule]],
+) -> tuple[list[tuple[str, Schedule]], list[Duplicate]]:
+    """
+    sources 为 (来源名称, 课表)，按优先级排列。
+    某次日程与更早来源中的日程相同时去除（同一来源内不去重），
+    按周重复的条目只去除相同的那几周。返回各来源去重后的课表及被去除的日程。
+    """
+    index = DedupIndex()
+    deduped: list[tuple[str, Schedule]] = []
+    duplicates: list[Duplicate] = []
+    for name, schedule in sources:
+        entries: list[ScheduleEntry] = []
+        # 本来源的条目在处理完整个来源后才加入索引
+        pending: list[tuple[ScheduleEntry, list[datetime.date]]] = []
+        for entry in schedule.entries:
+            dates = entry.occurrence_dates(schedule.start_date)
+            names = _names(entry)
+            location = normalize_location(entry.location)
+            kept: list[bool] = []
+            for date in dates:
+                found = index.find(date, entry, names, location)
+                if found is not None:
+                    duplicates.append(
+                        Duplicate(date, entry, name, found.entry, found.source)
+                    )
+                kept.append(found is None)
+            remaining = _keep_dates(entry, dates, kept)
+            if remaining is not None:
+                entries.append(remaining)
+                pending.append((remaining, [d for d, k in zip(dates, kept) if k]))
+        for entry, dates in pending:
+            index.add(entry, dates, name)
+        deduped.append(
+            (name, Schedule(entries, schedule.semester_desc, schedule.start_date))
+        )
+    return deduped, duplicates
+
+
+def combine_schedules(
+    sources: Sequence[tuple[str, Schedule]],
+) -> tuple[Schedule, list[Duplicate]]:
+    """
+    sources 为 (来源名称, 课表)，按优先级排列，各课表须属于同一学期。
+    按 dedup_sources 去重后合并，返回合并后的课表及被去除的日程。
+    """
+    if not sources:
+        raise ValueError("没有要合并的课表")
+    _, first = sources[0]
+    deduped, duplicates = dedup_sources(sources)
+    entries = [entry for _, schedule in deduped for entry in schedule.entries]
+    return Schedule(entries, first.semester_desc, first.start_date), duplicates
@@ -4,18 +4,83 @@
 """
 
 from __future__ import annotations
-from typing_extensions import Literal
-from pydantic import BaseModel, Field
+
 import datetime
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any
 
+from pydantic import BaseModel, Field, PrivateAttr
+from typing_extensions import Literal
+
+from jwc.rules import (
+    RulePattern,
+    RuleProblem,
+    compile_rule,
+    lint_rules,
+    match_timeout,
+    profiling,
+)
 
 type TextRules1 = list[tuple[str, str]]
+# 预编译的规则；无法编译的正则为 None，匹配时跳过
+type CompiledTextRules1 = list[tuple[RulePattern | None, str]]
+type CompiledReminderRules = list[tuple[RulePattern | None, list[datetime.timedelta]]]
 
 type SegmentDisplayOptionSimple = (
     Literal["in_description"] | Literal["none"] | Literal["in_title"] | Literal["both"]
 )
 
 
+def _compile_rules(rules: list[tuple[str, Any]], flags: int = 0):
+    return [(compile_rule(pattern, flags), value) for pattern, value in rules]
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPreferenceRules:
+    """偏好设置中各规则的正则预编译结果，标志与逐条匹配时所用的一致"""
+
+    lesson_emoji_rules: CompiledTextRules1
+    lab_emoji_rules: CompiledTextRules1
+    location_trules: CompiledTextRules1
+    lesson_trules: CompiledTextRules1
+    lesson_reminder_rules: CompiledReminderRules
+    calendar_split_rules: CompiledTextRules1
+    # 编译时的匹配时间预算及是否开启统计
+    timeout: float | None
+    profiling: bool
+
+    @classmethod
+    def compile(cls, pref: JwcSchedulePreference) -> CompiledPreferenceRules:
+        return cls(
+            lesson_emoji_rules=_compile_rules(pref.lesson_emoji_rules, re.MULTILINE),
+            lab_emoji_rules=_compile_rules(pref.lab_emoji_rules, re.MULTILINE),
+            location_trules=_compile_rules(pref.location_trules),
+            lesson_trules=_compile_rules(pref.lesson_trules),
+            lesson_reminder_rules=_compile_rules(
+                pref.lesson_reminder_rules, re.MULTILINE
+            ),
+            calendar_split_rules=_compile_rules(pref.calendar_split_rules, re.MULTILINE),
+            timeout=match_timeout(),
+            profiling=profiling(),
+        )
+
+    def rule_lists(self) -> dict[str, list[RulePattern | None]]:
+        """各规则列表，以偏好设置中的字段名为键"""
+        return {
+            "lesson_emoji_rules": [p for p, _ in self.lesson_emoji_rules],
+            "lab_emoji_rules": [p for p, _ in self.lab_emoji_rules],
+            "location_trules": [p for p, _ in self.location_trules],
+            "lesson_trules": [p for p, _ in self.lesson_trules],
+            "lesson_reminder_rules": [p for p, _ in self.lesson_reminder_rules],
+            "calendar_split_rules": [p for p, _ in self.calendar_split_rules],
+        }
+
+    def is_current(self) -> bool:
+        return self.timeout == match_timeout() and self.profiling == profiling()
+
+
 class JwcSchedulePreference(BaseModel):
     """用户偏好设置数据结构"""
 
@@ -59,10 +124,39 @@ class JwcSchedulePreference(BaseModel):
     lesson_reminder_rules: list[tuple[str, list[datetime.timedelta]]] = Field(
         default_factory=list
     )
+    # 按课程名称将日历拆分为多个文件的规则（to-ics --split-by rules），值为所属日历的名称
+    calendar_split_rules: TextRules1 = Field(default_factory=list)
 
     lab_lesson_name_display_option: SegmentDisplayOptionSimple = "in_description"
     teacher_display_option: SegmentDisplayOptionSimple = "in_title"
 
+    _compiled: CompiledPreferenceRules | None = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            # 规则改变后需重新编译；规则列表请整体赋值或用 +=，不要原地 append
+            self._compiled = None
+
+    def compiled(self) -> CompiledPreferenceRules:
+        """预编译的规则，首次使用或匹配时间预算、统计开关改变时编译"""
+        if self._compiled is None or not self._compiled.is_current():
+            self._compiled = CompiledPreferenceRules.compile(self)
+        return self._compiled
+
+    def lint(self) -> list[RuleProblem]:
+        """检查各规则的正则：无法编译的（将被忽略）及可能导致回溯爆炸的"""
+        return [
+            *lint_rules("lesson_emoji_rules", self.lesson_emoji_rules, re.MULTILINE),
+            *lint_rules("lab_emoji_rules", self.lab_emoji_rules, re.MULTILINE),
+            *lint_rules("location_trules", self.location_trules),
+            *lint_rules("lesson_trules", self.lesson_trules),
+            *lint_rules(
+                "lesson_reminder_rules", self.lesson_reminder_rules, re.MULTILINE
+            ),
+            *lint_rules("calendar_split_rules", self.calendar_split_rules, re.MULTILINE),
+        ]
+
     def merge_with_preset_rules(
         self,
         preset_lesson_emoji_rules: TextRules1,
@@ -77,3 +171,7 @@ class JwcSchedulePreference(BaseModel):
         self.lesson_emoji_rules += preset_lesson_emoji_rules
         self.lab_emoji_rules += preset_lab_emoji_rules
         self.location_trules += preset_location_trules
+
+    def fingerprint(self) -> str:
+        """偏好设置内容的哈希，用于判断依赖偏好设置的缓存是否可复用"""
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()
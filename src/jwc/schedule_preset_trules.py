@@ -1,5 +1,6 @@
 import re
 from dataclasses import dataclass
+
 try:
     from warnings import deprecated  # ty:ignore[unresolved-import]
 except:
@@ -0,0 +1,73 @@
+"""
+将课表拆分为多个日历（如课程、实验、考试各一个订阅源）时，决定各条目所属日历的分类函数。
+"""
+
+from collections.abc import Callable
+from typing import Literal
+
+from jwc.schedule_preference import JwcSchedulePreference
+from jwc.schedule_utils import (
+    EXAM,
+    LAB,
+    LESSON,
+    ScheduleEntry,
+    get_emoji,
+)
+
+type EntryClassifier = Callable[[ScheduleEntry], str]
+type SplitMode = Literal["kind", "emoji", "course", "rules"]
+
+SPLIT_MODES: tuple[SplitMode, ...] = ("kind", "emoji", "course", "rules")
+# 不属于任何分类的条目所在日历的名称
+OTHER = "其他"
+
+_KIND_NAMES = {LESSON: "课程", LAB: "实验", EXAM: "考试"}
+
+
+def by_kind(entry: ScheduleEntry) -> str:
+    return _KIND_NAMES[entry.kind]
+
+
+def by_course(entry: ScheduleEntry) -> str:
+    return entry.name
+
+
+def by_emoji(preference: JwcSchedulePreference) -> EntryClassifier:
+    """按课程名称匹配到的 emoji 分类（即使关闭了 emoji 前缀）；考试单独为一类"""
+    compiled = preference.compiled()
+
+    def classify(entry: ScheduleEntry) -> str:
+        if entry.kind == EXAM:
+            return _KIND_NAMES[EXAM]
+        rules = (
+            compiled.lab_emoji_rules if entry.kind == LAB else compiled.lesson_emoji_rules
+        )
+        emoji, _ = get_emoji(entry.name, rules)
+        return emoji or OTHER
+
+    return classify
+
+
+def by_rules(preference: JwcSchedulePreference) -> EntryClassifier:
+    """按偏好设置中 calendar_split_rules 第一条匹配课程名称的规则分类"""
+    compiled = preference.compiled()
+
+    def classify(entry: ScheduleEntry) -> str:
+        for pattern, calendar in compiled.calendar_split_rules:
+            if pattern is not None and pattern.search(entry.name):
+                return calendar
+        return OTHER
+
+    return classify
+
+
+def classifier(mode: SplitMode, preference: JwcSchedulePreference) -> EntryClassifier:
+    match mode:
+        case "kind":
+            return by_kind
+        case "course":
+            return by_course
+        case "emoji":
+            return by_emoji(preference)
+        case "rules":
+            return by_rules(preference)
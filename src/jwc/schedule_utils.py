@@ -1,22 +1,24 @@
 import datetime
-from collections.abc import Iterable
-from enum import Enum
-from dataclasses import dataclass, field
-from functools import partial
 import re
+import sys
+import zoneinfo
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Literal, Self, cast
+
 import ics  # pyright: ignore[reportMissingTypeStubs]
-from ics.alarm.display import timedelta  # pyright: ignore[reportMissingTypeStubs]
 
+from jwc.jwapi_model import KbEntry, XsksEntry
+from jwc.schedule_preference import CompiledTextRules1, JwcSchedulePreference
 from jwc.schedule_preset_trules import TransformationResults
-from jwc.schedule_preference import JwcSchedulePreference, TextRules1
-from jwc.jwapi_model import XsksEntry, KbEntry
-from typing import cast, Self, Literal
-import zoneinfo
 
 
-def get_emoji(name: str, emoji_rules: TextRules1) -> tuple[str, bool]:
+def get_emoji(name: str, emoji_rules: CompiledTextRules1) -> tuple[str, bool]:
     for pattern, emoji in emoji_rules:
-        if re.search(pattern, name, flags=re.M):
+        if pattern is not None and pattern.search(name):
             return emoji, True
     return "", False
 
@@ -25,20 +27,22 @@ def get_lab_emoji(name: str, pref: JwcSchedulePreference) -> tuple[str, bool]:
     """取实验 emoji（只根据课程名称）"""
     if not pref.enable_emoji_prefix:
         return ("", True)
-    return get_emoji(name, pref.lab_emoji_rules)
+    return get_emoji(name, pref.compiled().lab_emoji_rules)
 
 
 def get_lesson_emoji(name: str, pref: JwcSchedulePreference) -> tuple[str, bool]:
     """取课程 emoji"""
     if not pref.enable_emoji_prefix:
         return ("", True)
-    return get_emoji(name, pref.lesson_emoji_rules)
+    return get_emoji(name, pref.compiled().lesson_emoji_rules)
 
 
-def apply_trules(text: str, trules: TextRules1):
+def apply_trules(text: str, trules: CompiledTextRules1):
     for pattern, repl in trules:
+        if pattern is None:
+            continue
         try:
-            res, n = re.subn(pattern, repl, text)
+            res, n = pattern.subn(repl, text)
             if n:
                 return res, True
         except:
@@ -51,7 +55,7 @@ def transform_lesson_name_with_preference(
 ) -> tuple[str, bool]:
     """取课程课程显示名称（添加emoji前缀）"""
     emoji, has_emoji = get_lesson_emoji(name, pref)
-    name, _ = apply_trules(name, pref.lesson_trules)
+    name, _ = apply_trules(name, pref.compiled().lesson_trules)
 
     return emoji + name, has_emoji
 
@@ -65,13 +69,13 @@ def transform_lab_name_with_preference(
     if lab_name:
         match pref.lab_lesson_name_display_option:
             case "both" | "in_title":
-                name, _ = apply_trules(name, pref.lesson_trules)
+                name, _ = apply_trules(name, pref.compiled().lesson_trules)
                 seg_lesson_name = f"（{name}）"
             case _:
                 seg_lesson_name = ""
         return f"{emoji}{lab_name}{seg_lesson_name}", has_emoji
 
-    name, _ = apply_trules(name, pref.lesson_trules)
+    name, _ = apply_trules(name, pref.compiled().lesson_trules)
     return emoji + name, has_emoji
 
 
@@ -82,8 +86,10 @@ def location_detail_with_preference(
     if not preference.enable_location_transformation:
         return location, False
 
-    for pattern, replacement in preference.location_trules:
-        res, n = re.subn(pattern, replacement, location)
+    for pattern, replacement in preference.compiled().location_trules:
+        if pattern is None:
+            continue
+        res, n = pattern.subn(replacement, location)
         if n:
             return res, True
 
@@ -108,14 +114,48 @@ def _to_ranges(text: str) -> list[tuple[int, int]]:
     return [_to_range(r) for r in text.split(",")]
 
 
-def _to_time_span(
-    from_hr: int, from_min: int, to_hr: int, to_min: int
-) -> tuple[datetime.time, datetime.time]:
-    zone = zoneinfo.ZoneInfo("Asia/Shanghai")
-    return (
-        datetime.time(from_hr, from_min, 0, tzinfo=zone),
-        datetime.time(to_hr, to_min, 0, tzinfo=zone),
-    )
+# 时间范围以 (开始, 结束) 当天的分钟数表示，时区为 Asia/Shanghai
+type MinuteSpan = tuple[int, int]
+
+_ZONE = zoneinfo.ZoneInfo("Asia/Shanghai")
+
+
+def _to_time_span(from_hr: int, from_min: int, to_hr: int, to_min: int) -> MinuteSpan:
+    return (from_hr * 60 + from_min, to_hr * 60 + to_min)
+
+
+def minutes_to_time(minutes: int) -> datetime.time:
+    return datetime.time(minutes // 60, minutes % 60, 0, tzinfo=_ZONE)
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+# 大量构造条目时，内容相同的字符串与时间范围共用同一个对象。
+# 时间范围只在一次解析内共用，解析结束即释放，以免长期运行的守护进程中无限增长
+_time_ranges_pool: ContextVar[
+    dict[tuple[MinuteSpan, ...], tuple[MinuteSpan, ...]] | None
+] = ContextVar("_time_ranges_pool", default=None)
+
+
+@contextmanager
+def interning_time_ranges() -> Generator[None]:
+    """在此范围内构造的条目共用内容相同的时间范围；可以嵌套"""
+    if _time_ranges_pool.get() is not None:
+        yield
+        return
+    token = _time_ranges_pool.set({})
+    try:
+        yield
+    finally:
+        _time_ranges_pool.reset(token)
+
+
+def intern_time_ranges(time_ranges: Iterable[MinuteSpan]) -> tuple[MinuteSpan, ...]:
+    t = tuple(time_ranges)
+    pool = _time_ranges_pool.get()
+    return t if pool is None else pool.setdefault(t, t)
 
 
 time_slot_mapping = {
@@ -137,7 +177,7 @@ time_slot_mapping = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduledDates:
     weeks: list[int]
     day_of_week: Literal[1, 2, 3, 4, 5, 6, 7]
@@ -189,18 +229,44 @@ def _parse_date(text: str, d0: datetime.date) -> datetime.date:
     return date
 
 
-# 注意：这个类若加新字段时，请同时更新 time_range_smart_merge 中的 make_identifying_key 函数
-@dataclass
+@dataclass(slots=True)
+class IcsFields:
+    name: str
+    description: str
+    location: str
+    alarms: list[ics.DisplayAlarm]
+
+    def apply(self, event: ics.Event):
+        event.name = self.name
+        event.description = self.description
+        event.location = self.location
+        event.alarms = list(self.alarms)
+
+
+# 注意：这个类若加新字段时，请同时更新 schedule.py 中的 _identifying_key 函数
+@dataclass(slots=True)
 class ScheduleEntry:
     name: str
     dates: ScheduledDates | datetime.date
-    time_ranges: list[tuple[datetime.time, datetime.time]]
+    time_ranges: tuple[MinuteSpan, ...]
     location: str
     kind: ScheduleEntryKind
     teacher: str = ""
     description: list[str] = field(default_factory=lambda: [])
     lab_name: str = ""
 
+    def __post_init__(self):
+        # 批量解析时，课程名称、地点、教师等大量重复
+        self.name = sys.intern(self.name)
+        self.location = sys.intern(self.location)
+        self.teacher = sys.intern(self.teacher)
+        self.lab_name = sys.intern(self.lab_name)
+        self.time_ranges = intern_time_ranges(self.time_ranges)
+
+    def time_spans(self) -> list[tuple[datetime.time, datetime.time]]:
+        """时间范围对应的（带时区的）datetime.time"""
+        return [(minutes_to_time(t0), minutes_to_time(t1)) for t0, t1 in self.time_ranges]
+
     @staticmethod
     def parse_day_of_week(obj: KbEntry) -> Literal[1, 2, 3, 4, 5, 6, 7]:
         r = int(obj.KEY[2])
@@ -240,10 +306,10 @@ class ScheduleEntry:
                 result.group("节次"),
                 obj.KEY[6] if len(obj.KEY) >= 7 else None,  # '5' as in 'xq1_jc5'
             )
-            time_ranges = [
+            time_ranges = tuple(
                 (time_slot_mapping[t[0]][0], time_slot_mapping[t[1]][1])
                 for t in time_slot_ranges
-            ]
+            )
         except:
             raise ValueError(f"parse_lesson: 无法解析节次：{result.group('节次')}")
         description: list[str] = []
@@ -279,17 +345,17 @@ http://jw.hitsz.edu.cn/byyfile{obj.FILEURL}
             return None
 
         name = result.group("课程名称")
-        lab_name = result.group("实验名称")
+        lab_name = result.group("实验名称") or ""
         location = result.group("地点")
         try:
             time_slot_ranges = cls.determine_time_slot_ranges(
                 result.group("节次"),
                 obj.KEY[6] if len(obj.KEY) >= 7 else None,  # '5' as in 'xq1_jc5'
             )
-            time_ranges = [
+            time_ranges = tuple(
                 (time_slot_mapping[t[0]][0], time_slot_mapping[t[1]][1])
                 for t in time_slot_ranges
-            ]
+            )
         except:
             raise ValueError(f"parse_lab: 无法解析节次：{result.group('节次')}")
 
@@ -314,13 +380,13 @@ http://jw.hitsz.edu.cn/byyfile{obj.FILEURL}
         name = result.group("名称")
         location = result.group("地点")
         time_ranges_str = result.group("时间").split("-")
-        time_ranges = [
+        time_ranges = (
             _to_time_span(
                 *map(
                     int, [*time_ranges_str[0].split(":"), *time_ranges_str[-1].split(":")]
                 )
-            )
-        ]
+            ),
+        )
 
         return cls(
             name, _parse_date(result.group("日期"), d0), time_ranges, location, EXAM
@@ -331,13 +397,13 @@ http://jw.hitsz.edu.cn/byyfile{obj.FILEURL}
         name = f"{obj.KCMC} {obj.KSSJDMC}考试"
         location = obj.CDDM
         time_ranges_str = obj.KSJTSJ.split("-")
-        time_ranges = [
+        time_ranges = (
             _to_time_span(
                 *map(
                     int, [*time_ranges_str[0].split(":"), *time_ranges_str[-1].split(":")]
                 )
-            )
-        ]
+            ),
+        )
 
         return cls(
             name,
@@ -356,8 +422,8 @@ http://jw.hitsz.edu.cn/byyfile{obj.FILEURL}
         if self.kind == EXAM:
             return pref.exam_reminders
 
-        for pattern, reminders in pref.lesson_reminder_rules:
-            if re.search(pattern, self.name, flags=re.M):
+        for pattern, reminders in pref.compiled().lesson_reminder_rules:
+            if pattern is not None and pattern.search(self.name):
                 return reminders
 
         if self.kind == LAB:
@@ -418,81 +484,83 @@ http://jw.hitsz.edu.cn/byyfile{obj.FILEURL}
             desc += self.description
         return "\n".join(desc)
 
-    def to_ics_event(
+    def get_ics_fields(
         self,
-        semester_start_date: datetime.date,
-        categories: list[str],
         transformation_results: TransformationResults,
         preference: JwcSchedulePreference,
-    ) -> Iterable[ics.Event]:
-        combine = datetime.datetime.combine
+    ) -> IcsFields:
+        """日程中取决于偏好设置的字段，同一条目的各次日程相同"""
+        location, location_was_transformed = location_detail_with_preference(
+            self.location, preference
+        )
+        if not location_was_transformed:
+            transformation_results.untransformed_locations.add(self.location)
+        return IcsFields(
+            name=self.get_ics_name(transformation_results, preference),
+            description=self.get_ics_description(preference),
+            location=location,
+            # 全天日程不设提醒
+            alarms=self.get_ics_alarms(preference) if self.time_ranges else [],
+        )
+
+    def occurrence_dates(self, semester_start_date: datetime.date) -> list[datetime.date]:
+        """条目发生的各个日期"""
         match self.dates:
+            case datetime.datetime():
+                return [self.dates.date()]
             case datetime.date():
-                dates = [self.dates]
+                return [self.dates]
             case ScheduledDates():
-                dates = list(self.dates.all_dates(semester_start_date))
+                return list(self.dates.all_dates(semester_start_date))
 
-        transformed_location, location_was_transformed = (
-            location_detail_with_preference(self.location, preference)
-        )
-        if not location_was_transformed:
-            transformation_results.untransformed_locations.add(self.location)
+    def ics_base_events(
+        self, semester_start_date: datetime.date, categories: list[str]
+    ) -> Iterable[ics.Event]:
+        """展开后的各次日程，只含时间与分类等与偏好设置无关的字段"""
+        combine = datetime.datetime.combine
+        dates = self.occurrence_dates(semester_start_date)
 
         if not self.time_ranges:
             # 生成全天日程
-            t0 = time_slot_mapping[1][0]
+            t0 = minutes_to_time(time_slot_mapping[1][0])
             # 不知为何这里要去掉时区才对
             zone = zoneinfo.ZoneInfo("UTC")
             for date in dates:
-                event = ics.Event(
-                    name=self.get_ics_name(transformation_results, preference),
-                    begin=combine(date, t0, zone),
-                    description=self.get_ics_description(preference),
-                    location=transformed_location,
-                    categories=categories,
-                )
+                event = ics.Event(begin=combine(date, t0, zone), categories=categories)
                 event.make_all_day()
                 yield event
             return
 
-        for t0, t1 in self.time_ranges:
-            # ics-py 尚未支持重复日程，故作展开
-            # https://github.com/ics-py/ics-py/issues/14
-            match self.dates:
-                case datetime.date():
-                    dates = [self.dates]
-                case ScheduledDates():
-                    dates = list(self.dates.all_dates(semester_start_date))
+        # ics-py 尚未支持重复日程，故作展开
+        # https://github.com/ics-py/ics-py/issues/14
+        for t0, t1 in self.time_spans():
             for date in dates:
-                d0 = combine(date, t0)
-                d1 = combine(date, t1)
-
-                event = ics.Event(
-                    name=self.get_ics_name(transformation_results, preference),
-                    begin=d0,
-                    end=d1,
-                    description=self.get_ics_description(preference),
-                    location=transformed_location,
-                    categories=categories,
-                    alarms=self.get_ics_alarms(preference),
+                yield ics.Event(
+                    begin=combine(date, t0), end=combine(date, t1), categories=categories
                 )
-                yield event
 
-    def overlaps_with(self, time_span: tuple[datetime.time, datetime.time]):
+    def to_ics_event(
+        self,
+        semester_start_date: datetime.date,
+        categories: list[str],
+        transformation_results: TransformationResults,
+        preference: JwcSchedulePreference,
+    ) -> Iterable[ics.Event]:
+        fields = self.get_ics_fields(transformation_results, preference)
+        for event in self.ics_base_events(semester_start_date, categories):
+            fields.apply(event)
+            yield event
+
+    def overlaps_with(self, time_span: MinuteSpan):
         s2, e2 = time_span
         for s1, e1 in self.time_ranges:
             if max(s1, s2) < min(e1, e2):
                 return True
         return False
 
-    def overlaps_or_adjacent_to(
-        self, time_span: tuple[datetime.time, datetime.time], allow_gap: int = 0
-    ):
+    def overlaps_or_adjacent_to(self, time_span: MinuteSpan, allow_gap: int = 0):
         s2, e2 = time_span
-        _to_datetime = partial(datetime.datetime.combine, datetime.date(2025, 9, 1))
         for s1, e1 in self.time_ranges:
-            if _to_datetime(max(s1, s2)) - timedelta(minutes=allow_gap) <= _to_datetime(
-                min(e1, e2)
-            ):
+            if max(s1, s2) - allow_gap <= min(e1, e2):
                 return True
         return False
@@ -0,0 +1,62 @@
+from jwc.cli.cache_db import CacheDB
+
+
+def _latest_hash(db: CacheDB) -> str:
+    [(digest,)] = db.conn.execute(
+        "SELECT hash FROM latest_fetches WHERE account = 'a' AND kind = 'kb'"
+    ).fetchall()
+    return digest
+
+
+def test_payload_reverting_to_earlier_content_is_latest(tmp_path):
+    db = CacheDB(str(tmp_path / "cache.sqlite3"))
+    try:
+        a = db.store_payload("a", "2025-2026", "1", "kb", b"A", 1.0)
+        b = db.store_payload("a", "2025-2026", "1", "kb", b"B", 2.0)
+        assert _latest_hash(db) == b
+        assert db.store_payload("a", "2025-2026", "1", "kb", b"A", 3.0) == a
+        assert _latest_hash(db) == a
+        # 补录较早的获取记录不会使其变为最新
+        _ = db.store_payload("a", "2025-2026", "1", "kb", b"B", 0.5)
+        assert _latest_hash(db) == a
+    finally:
+        db.close()
+
+
+def test_sync_does_not_log_in(tmp_path, monkeypatch):
+    from jwc.cli import cache
+    from jwc.cli.cache_db import DEFAULT_ACCOUNT, db_path
+
+    def fail():
+        raise AssertionError("同步缓存库时不应登录")
+
+    monkeypatch.setattr(cache, "get_session", fail)
+    monkeypatch.setattr(cache, "current_account", lambda: None)
+    monkeypatch.setattr(cache, "jwc_cache_root", lambda: str(tmp_path))
+    semester_dir = tmp_path / "2025-2026-1"
+    semester_dir.mkdir()
+    _ = (semester_dir / "response-queryxszykbzong.json").write_text("[]")
+    monkeypatch.setattr(cache, "semester_cache_dir", lambda _xn, _xq: str(semester_dir))
+    CacheDB(db_path(str(tmp_path))).close()
+
+    _ = cache.sync_cache_db("2025-2026", "1")
+    db = CacheDB(db_path(str(tmp_path)))
+    try:
+        accounts = db.conn.execute("SELECT DISTINCT account FROM fetches").fetchall()
+    finally:
+        db.close()
+    assert accounts == [(DEFAULT_ACCOUNT,)]
+
+
+def test_background_refresh_failure_is_reported(monkeypatch, capsys):
+    from jwc.cli import cache
+    from jwc.jwapi_common import JwcRequestError
+
+    def refresh(_session):
+        raise JwcRequestError("登录已失效")
+
+    monkeypatch.setattr(cache, "current_account", lambda: None)
+    monkeypatch.setattr(cache, "load_session", object)
+    cache.revalidate_in_background("kb", refresh)
+    cache.finish_background_refreshes()
+    assert "登录已失效" in capsys.readouterr().out
@@ -0,0 +1,38 @@
+import os
+
+from jwc.cli.cache_gc import GcPolicy, plan_gc
+
+
+def _write(path: str, size: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        _ = f.write(b"\0" * size)
+
+
+def _cache_dir(tmp_path) -> str:
+    root = str(tmp_path)
+    # 不可淘汰的部分：缓存库与受保护的当前学期
+    _write(os.path.join(root, "cache.sqlite3"), 4000)
+    _write(os.path.join(root, "2025-2026-1", "kb.json"), 1000)
+    for i, name in enumerate(["2023-2024-1", "2023-2024-2", "2024-2025-1"]):
+        _write(os.path.join(root, name, "kb.json"), 100)
+        os.utime(os.path.join(root, name), (1000 + i, 1000 + i))
+    _write(os.path.join(root, "out", "a.ics"), 100)
+    return root
+
+
+def test_unevictable_bytes_do_not_trigger_eviction(tmp_path):
+    root = _cache_dir(tmp_path)
+    policy = GcPolicy(max_total_bytes=1000)
+    protected = {os.path.join(root, "2025-2026-1")}
+    assert plan_gc(root, policy, protected, now=2000) == []
+
+
+def test_evicts_least_recently_used_until_within_bound(tmp_path):
+    root = _cache_dir(tmp_path)
+    policy = GcPolicy(max_total_bytes=250)
+    protected = {os.path.join(root, "2025-2026-1")}
+    removed = [
+        os.path.basename(r.path) for r in plan_gc(root, policy, protected, now=2000)
+    ]
+    assert removed == ["2023-2024-1", "2023-2024-2"]
@@ -0,0 +1,27 @@
+import os
+import stat
+
+from jwc.cli.cache_io import atomic_write_bytes
+
+
+def _mode(path: str) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_atomic_write_keeps_existing_mode(tmp_path):
+    path = str(tmp_path / "a.ics")
+    with open(path, "wb") as f:
+        _ = f.write(b"old")
+    os.chmod(path, 0o640)
+    atomic_write_bytes(path, b"new")
+    assert _mode(path) == 0o640
+    with open(path, "rb") as f:
+        assert f.read() == b"new"
+
+
+def test_atomic_write_new_file_matches_open(tmp_path):
+    reference = str(tmp_path / "reference")
+    open(reference, "wb").close()
+    path = str(tmp_path / "b.ics")
+    atomic_write_bytes(path, b"data")
+    assert _mode(path) == _mode(reference)
@@ -0,0 +1,39 @@
+from jwc.cli.cache_io import write_cache_bytes, write_cache_text
+from jwc.cli.cache_manager import MANIFEST_FILENAME, Artifact, CacheManager
+
+
+def _manager(directory: str) -> CacheManager:
+    return CacheManager(
+        directory,
+        [
+            Artifact("kb", "kb.json", "课表"),
+            Artifact("ics", "kb.ics", "日历", inputs=("kb",)),
+        ],
+    )
+
+
+def test_hash_ignores_compression(tmp_path):
+    manager = _manager(str(tmp_path))
+    _ = write_cache_text(manager.path("kb"), '{"kbList": []}', "utf-8")
+    manager.record("kb", validated=True)
+    plain = manager.current_hash("kb")
+    _ = write_cache_text(manager.path("ics"), "BEGIN:VCALENDAR", "utf-8")
+    manager.record("ics")
+
+    # 同样的内容改为压缩存储，下游产物不应失效
+    _ = write_cache_bytes(manager.path("kb"), b'{"kbList": []}', "gzip")
+    manager = _manager(str(tmp_path))
+    assert manager.current_hash("kb") == plain
+    assert manager.check("ics").status == "hit"
+
+    manager.record("kb", validated=True)
+    assert manager.read_validated("kb") == '{"kbList": []}'
+
+
+def test_non_object_manifest_is_empty(tmp_path):
+    manager = _manager(str(tmp_path))
+    _ = (tmp_path / MANIFEST_FILENAME).write_text("null")
+    assert manager.check("kb").status != "hit"
+    _ = write_cache_text(manager.path("kb"), '{"kbList": []}', "utf-8")
+    manager.record("kb")
+    assert manager.check("kb").status == "hit"
@@ -0,0 +1,48 @@
+import datetime
+
+from jwc.conflicts import find_conflicts
+from jwc.schedule import Schedule
+from jwc.schedule_utils import EXAM, LESSON, ScheduledDates, ScheduleEntry
+
+START = datetime.date(2024, 9, 2)
+EXAM_DATE = datetime.date(2025, 1, 6)
+
+
+def _schedule(*entries: ScheduleEntry) -> Schedule:
+    return Schedule(list(entries), "2024-2025 秋", START)
+
+
+def test_exam_in_both_sources_is_not_a_conflict():
+    # 课表中的考试与考试安排中的同一场考试写法不同
+    kb = _schedule(
+        ScheduleEntry("高等数学", EXAM_DATE, ((8 * 60, 10 * 60),), "教一-101", EXAM)
+    )
+    exams = _schedule(
+        ScheduleEntry(
+            "高等数学 期末考试", EXAM_DATE, ((8 * 60, 10 * 60),), "教一101", EXAM
+        )
+    )
+    assert find_conflicts([("考试", exams), ("课表", kb)]) == []
+
+
+def test_overlap_is_still_reported():
+    kb = _schedule(
+        ScheduleEntry("高等数学", EXAM_DATE, ((8 * 60, 10 * 60),), "教一-101", EXAM),
+        ScheduleEntry(
+            "大学英语",
+            ScheduledDates([19], 1),
+            ((9 * 60, 10 * 60 + 35),),
+            "教二-201",
+            LESSON,
+        ),
+    )
+    exams = _schedule(
+        ScheduleEntry(
+            "高等数学 期末考试", EXAM_DATE, ((8 * 60, 10 * 60),), "教一101", EXAM
+        )
+    )
+    conflicts = find_conflicts([("考试", exams), ("课表", kb)])
+    assert len(conflicts) == 1
+    c = conflicts[0]
+    assert {c.a.name, c.b.name} == {"高等数学 期末考试", "大学英语"}
+    assert c.date == EXAM_DATE
@@ -0,0 +1,83 @@
+import io
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+
+import click
+
+from jwc import cli_entry
+from jwc.cli import daemon
+
+
+@click.group()
+def demo():
+    pass
+
+
+@demo.command()
+@click.option("--code", default=0)
+def ask(code: int):
+    name = click.prompt("name")
+    click.echo(f"hello {name}")
+    click.echo("warn", err=True)
+    click.echo(sys.stdin.read(), nl=False)
+    raise SystemExit(code)
+
+
+class _Session:
+    def get(self):
+        return None
+
+
+def _serve_once(server: socket.socket, busy: bool):
+    lock = threading.Lock()
+    if busy:
+        _ = lock.acquire()
+    _ = daemon._handle(demo, server, _Session(), lock)
+    # 命令执行完后释放锁
+    os._exit(0 if lock.locked() == busy else 1)
+
+
+def _forward(monkeypatch, argv: list[str], stdin: str, busy: bool = False) -> int | None:
+    # 守护进程会替换 sys.stdout 等，须在另一个进程中运行
+    client, server = socket.socketpair()
+    monkeypatch.setattr(cli_entry, "connect_daemon", lambda: client)
+    monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+    handler = multiprocessing.get_context("fork").Process(
+        target=_serve_once, args=(server, busy)
+    )
+    handler.start()
+    server.close()
+    try:
+        return cli_entry.forward(argv)
+    finally:
+        handler.join()
+        assert handler.exitcode == 0
+
+
+def test_forward_relays_stdin_and_streams(monkeypatch, capsys):
+    assert _forward(monkeypatch, ["ask"], "alice\nrest\n") == 0
+    out, err = capsys.readouterr()
+    assert out == "name: hello alice\nrest\n"
+    assert err == "warn\n"
+
+
+def test_forward_returns_exit_code(monkeypatch, capsys):
+    assert _forward(monkeypatch, ["ask", "--code", "3"], "bob\n") == 3
+    assert "hello bob" in capsys.readouterr().out
+
+
+def test_busy_daemon_leaves_the_command_to_the_client(monkeypatch, capsys):
+    assert _forward(monkeypatch, ["ask"], "carol\n", busy=True) is None
+    assert capsys.readouterr().out == ""
+
+
+def test_long_running_commands_stay_local(monkeypatch):
+    def fail():
+        raise AssertionError("不应连接守护进程")
+
+    monkeypatch.setattr(cli_entry, "connect_daemon", fail)
+    assert cli_entry.forward(["--rule-timeout", "1", "watch"]) is None
+    assert cli_entry.forward(["daemon", "start"]) is None
@@ -0,0 +1,74 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from jwc import json_stream
+from jwc.json_stream import iter_json_array_items
+
+
+def _items(text: str, chunk_size: int) -> list[object]:
+    return list(iter_json_array_items(io.StringIO(text), chunk_size))
+
+
+def test_items_split_across_chunks():
+    items = [
+        {"KEY": f"k{i}", "SKSJ": "第1-16周 星期一 第1-2节", "XB": i} for i in range(20)
+    ]
+    text = json.dumps(items, ensure_ascii=False)
+    for chunk_size in (1, 2, 3, 7, 16, 100, len(text)):
+        assert _items(text, chunk_size) == items
+
+
+def test_concatenated_arrays():
+    text = '[1, 2]\n[]  [{"a": [3, "]"]}]\n\n[4]\n'
+    for chunk_size in range(1, len(text) + 1):
+        assert _items(text, chunk_size) == [1, 2, {"a": [3, "]"]}, 4]
+
+
+def test_numbers_cut_at_chunk_end():
+    text = "[12345,-2.5e10,0.125]"
+    # 逐个块大小试过去，总有一次恰好在数字中间截断
+    for chunk_size in range(1, len(text) + 1):
+        assert _items(text, chunk_size) == [12345, -2.5e10, 0.125]
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "{}", "[1,]"])
+def test_malformed(text: str):
+    with pytest.raises(json.JSONDecodeError):
+        _ = _items(text, 2)
+
+
+class _CountingStream(io.StringIO):
+    consumed = 0
+
+    def read(self, size: int | None = -1) -> str:
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+def test_malformed_item_does_not_read_to_end(monkeypatch):
+    monkeypatch.setattr(json_stream, "MAX_ITEM_SIZE", 1024)
+    text = '[{"a": 1}, {bad}, ' + ", ".join(['{"a": 1}'] * 100_000) + "]"
+    stream = _CountingStream(text)
+    with pytest.raises(json.JSONDecodeError):
+        _ = list(iter_json_array_items(stream, 64))
+    assert stream.consumed < 4096
+
+
+def test_peak_memory_is_bounded():
+    item = {"KEY": "k", "SKSJ": "第1-16周 星期一 第1-2节", "KCWZSM": "x" * 200}
+    text = "[" + ", ".join([json.dumps(item, ensure_ascii=False)] * 20_000) + "]"
+    stream = io.StringIO(text)
+    chunk_size = 16 * 1024
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in iter_json_array_items(stream, chunk_size))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count == 20_000
+    # 内存中只保留一个元素及几块文本，远小于整个文本
+    assert peak < len(text) // 10
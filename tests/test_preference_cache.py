@@ -0,0 +1,77 @@
+from jwc.cli import preference_cache
+from jwc.schedule_preference import JwcSchedulePreference
+
+
+def _build_default():
+    return JwcSchedulePreference(), []
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(preference_cache, "jwc_cache_root", lambda: str(tmp_path))
+    monkeypatch.setattr(preference_cache, "_loaded", {})
+
+
+def test_loaded_preferences_are_shared(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    built: list[JwcSchedulePreference] = []
+
+    def build():
+        built.append(JwcSchedulePreference(lesson_trules=[("马.+原", "马原")]))
+        return built[-1], []
+
+    first, _ = preference_cache.load_cached_preference(None, True, build)
+    second, _ = preference_cache.load_cached_preference(None, True, build)
+    assert len(built) == 1
+    assert second is first
+    # 预编译的规则随内存中的对象保留，不必重新编译
+    compiled = first.compiled()
+    assert second.compiled() is compiled
+    assert compiled.lesson_trules[0][0] is not None
+
+    # 换一个进程再载入时从缓存文件重建，规则重新编译
+    monkeypatch.setattr(preference_cache, "_loaded", {})
+    third, _ = preference_cache.load_cached_preference(None, True, build)
+    assert len(built) == 1
+    assert third is not first
+    assert third.lesson_trules == [("马.+原", "马原")]
+    assert third.compiled() is not compiled
+
+
+def test_loaded_is_bounded(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    for i in range(preference_cache.MAX_LOADED + 3):
+        path = tmp_path / f"{i}.yaml"
+        _ = path.write_text(f"# {i}\n")
+        _ = preference_cache.load_cached_preference(str(path), True, _build_default)
+    assert len(preference_cache._loaded) == preference_cache.MAX_LOADED
+
+
+def test_key_follows_cache_format(monkeypatch):
+    key = preference_cache.preference_cache_key(b"", True)
+    monkeypatch.setattr(
+        preference_cache, "CACHE_FORMAT", preference_cache.CACHE_FORMAT + 1
+    )
+    assert preference_cache.preference_cache_key(b"", True) != key
+
+
+def test_lint_results_survive_the_cache(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+
+    def build():
+        preference = JwcSchedulePreference(lesson_trules=[("(a+)+", "a"), ("[", "b")])
+        return preference, preference.lint()
+
+    _, problems = preference_cache.load_cached_preference(None, True, build)
+    assert [p.index for p in problems] == [0, 1]
+    # 换一个进程再载入，仍能得到检查结果
+    monkeypatch.setattr(preference_cache, "_loaded", {})
+    _, cached = preference_cache.load_cached_preference(None, True, _build_default)
+    assert cached == problems
+
+
+def test_key_follows_compile_engine(monkeypatch):
+    # 规则检查结果与编译规则所用的模块有关
+    monkeypatch.setattr(preference_cache, "compile_engine", lambda: "re")
+    key = preference_cache.preference_cache_key(b"", True)
+    monkeypatch.setattr(preference_cache, "compile_engine", lambda: "regex")
+    assert preference_cache.preference_cache_key(b"", True) != key
@@ -0,0 +1,52 @@
+import datetime
+
+from jwc.cli.render_cache import RenderCache
+from jwc.schedule_preference import JwcSchedulePreference
+from jwc.schedule_utils import LESSON, ScheduledDates, ScheduleEntry
+
+START = datetime.date(2025, 9, 1)
+
+
+def _entry(description: list[str]) -> ScheduleEntry:
+    return ScheduleEntry(
+        "高等数学",
+        ScheduledDates([1, 2, 3], 1),
+        ((510, 610),),
+        "T2101",
+        LESSON,
+        teacher="张三",
+        description=description,
+    )
+
+
+def test_description_order_does_not_change_the_key(tmp_path):
+    path = str(tmp_path / "render.sqlite3")
+    preference = JwcSchedulePreference()
+    first = RenderCache(path, "1")
+    try:
+        _ = first.render_entry(_entry(["甲", "乙"]), START, "25秋", [preference])
+    finally:
+        first.close()
+
+    # 合并得到的 description 在另一个进程中可能是另一种顺序
+    second = RenderCache(path, "1")
+    try:
+        _ = second.render_entry(_entry(["乙", "甲"]), START, "25秋", [preference])
+        assert (second.render_stats.hits, second.render_stats.misses) == (1, 0)
+    finally:
+        second.close()
+
+
+def test_writes_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / "render.sqlite3")
+    preference = JwcSchedulePreference()
+    cache = RenderCache(path, "1")
+    other = RenderCache(path, "1")
+    try:
+        _ = cache.render_entry(_entry(["甲"]), START, "25秋", [preference])
+        # 尚未提交，别的连接看不到
+        assert other.conn.execute("SELECT COUNT(*) FROM rendered").fetchone() == (0,)
+        cache.close()
+        assert other.conn.execute("SELECT COUNT(*) FROM rendered").fetchone() == (1,)
+    finally:
+        other.close()
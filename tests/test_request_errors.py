@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import pytest
+from click.testing import CliRunner
+
+import jwc.cli
+from jwc.cli import cache
+from jwc.jwapi_common import JwcRequestError
+
+
+class _FailingSession:
+    def post(self, **_kwargs: object):
+        return SimpleNamespace(ok=False, status_code=502, text="")
+
+
+def test_request_xszykbzong_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "get_session", lambda: _FailingSession())
+    manager = cache.CacheManager(str(tmp_path), cache.SEMESTER_ARTIFACTS)
+    with pytest.raises(JwcRequestError, match="502"):
+        cache._request_xszykbzong("2025-2026", "1", manager)
+
+
+def test_cli_reports_request_error(monkeypatch):
+    def fail(_xn: str, _xq: str):
+        raise JwcRequestError("在请求 queryxszykbzong 时出错了：502")
+
+    monkeypatch.setattr(cache, "request_xszykbzong", fail)
+    result = CliRunner().invoke(jwc.cli.cli, ["fetch", "-s", "25秋"])
+    assert result.exit_code == 1
+    assert "[!] 在请求 queryxszykbzong 时出错了：502" in result.output
+    assert result.exception is None or isinstance(result.exception, SystemExit)
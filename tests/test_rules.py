@@ -0,0 +1,31 @@
+from jwc import rules
+
+
+def test_lint_pattern():
+    assert rules.lint_pattern("数据结构") is None
+    assert rules.lint_pattern("(a+)+") is not None
+    result = rules.lint_pattern("[")
+    assert result is not None and result[0] == "error"
+
+
+def test_lint_pattern_without_re_internals(monkeypatch):
+    # 没有 re 的内部模块时跳过嵌套重复的检查，但仍报告无法编译的规则
+    monkeypatch.setattr(rules, "_sre_modules", lambda: None)
+    assert rules.lint_pattern("(a+)+") is None
+    result = rules.lint_pattern("[")
+    assert result is not None and result[0] == "error"
+
+
+def test_lint_uses_the_compiling_engine(monkeypatch):
+    # \p{Han} 只有 regex 模块支持；设有时间预算时 compile_rule 用 regex 模块编译
+    pattern = r"\p{Han}+实验"
+    monkeypatch.setattr(rules, "_match_timeout", None)
+    result = rules.lint_pattern(pattern)
+    assert result is not None and result[0] == "error"
+    assert rules.compile_rule(pattern) is None
+
+    monkeypatch.setattr(rules, "_match_timeout", 0.5)
+    assert rules.compile_engine() == "regex"
+    assert rules.lint_pattern(pattern) is None
+    compiled = rules.compile_rule(pattern)
+    assert compiled is not None and compiled.search("大物实验")
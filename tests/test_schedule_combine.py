@@ -0,0 +1,141 @@
+import datetime
+
+from jwc.jwapi_model import KbEntry, XsksEntry
+from jwc.phxp import parse_lab_entry
+from jwc.phxp.api_model import PhxpLabCourseBrief
+from jwc.schedule import Schedule
+from jwc.schedule_combine import (
+    DedupIndex,
+    combine_schedules,
+    normalize_location,
+    normalize_name,
+    similar_names,
+)
+from jwc.schedule_utils import EXAM, LAB, ScheduledDates, ScheduleEntry
+
+START = datetime.date(2025, 9, 1)
+
+
+def _kb_item(sksj: str, key: str) -> KbEntry:
+    return KbEntry(KCWZSM=None, RWH=None, SFFXEXW=None, SKSJ=sksj, XB=1, KEY=key)
+
+
+def _kb_exam() -> ScheduleEntry:
+    item = _kb_item("【期末考试】\n高等数学\n1月10日\n09:00-11:00\nT2101", "xq5_jc1")
+    entry = ScheduleEntry.parse_exam(item, START)
+    assert entry is not None
+    return entry
+
+
+def _listed_exam() -> ScheduleEntry:
+    return ScheduleEntry.from_XsksList_item(
+        XsksEntry(
+            KCMC="高等数学",
+            KSSJDMC="期末",
+            CDDM="T2101",
+            KSJTSJ="09:00-11:00",
+            KSRQ="2026-01-10T00:00:00+08:00",
+        )
+    )
+
+
+def _kb_lab() -> ScheduleEntry:
+    item = _kb_item("【实验】大学物理实验[光的干涉]\n[5-6节][3-5周]\n[K501]", "xq3_jc3")
+    entry = ScheduleEntry.parse_lab(item)
+    assert entry is not None
+    return entry
+
+
+def _phxp_lab(date: str, room: str = "K501") -> ScheduleEntry:
+    return parse_lab_entry(
+        PhxpLabCourseBrief(
+            CourseName="大学物理实验",
+            TeacherName="张三",
+            ClassDate=f"{date} 0:00:00",
+            StartTime="14:00",
+            EndTime="16:30",
+            LabName="光的干涉",
+            ClassRoom=room,
+            ModuleName="大学物理实验（上）",
+        )
+    )
+
+
+def _find(kept: ScheduleEntry, entry: ScheduleEntry, date: datetime.date):
+    index = DedupIndex()
+    index.add(kept, kept.occurrence_dates(START), "kept")
+    names = tuple(
+        n for n in (normalize_name(entry.name), normalize_name(entry.lab_name)) if n
+    )
+    return index.find(date, entry, names, normalize_location(entry.location))
+
+
+def test_similar_names():
+    # 考试安排中的名称带有“期末考试”
+    assert normalize_name("高等数学 期末考试") == normalize_name("高等数学")
+    # 互相包含
+    assert similar_names("大学物理实验", "大学物理实验上")
+    assert similar_names("大学物理实验上", "大学物理实验")
+    # 相似度恰为 0.8
+    assert similar_names("abcde", "abcdx")
+    assert not similar_names("abcd", "abxy")
+    assert not similar_names("", "高等数学")
+
+
+def test_find_exam_from_exam_list():
+    exam = _listed_exam()
+    found = _find(exam, _kb_exam(), datetime.date(2026, 1, 10))
+    assert found is not None and found.entry is exam
+
+
+def test_find_lab_from_phxp():
+    lab = _phxp_lab("2025/9/24")
+    found = _find(lab, _kb_lab(), datetime.date(2025, 9, 24))
+    assert found is not None and found.entry is lab
+    # 别的日期不算重复
+    assert _find(lab, _kb_lab(), datetime.date(2025, 9, 17)) is None
+
+
+def test_find_by_location_only():
+    lab = ScheduleEntry(
+        "光学实验", datetime.date(2025, 9, 24), ((840, 990),), "K501", LAB
+    )
+    other = ScheduleEntry("电磁学", ScheduledDates([4], 3), ((840, 945),), "K-501", LAB)
+    assert _find(lab, other, datetime.date(2025, 9, 24)) is not None
+    moved = ScheduleEntry("电磁学", ScheduledDates([4], 3), ((840, 945),), "K502", LAB)
+    assert _find(lab, moved, datetime.date(2025, 9, 24)) is None
+
+
+def test_find_needs_overlap_and_same_kind():
+    exam = _listed_exam()
+    later = ScheduleEntry(
+        "高等数学", datetime.date(2026, 1, 10), ((14 * 60, 16 * 60),), "T2101", EXAM
+    )
+    assert _find(exam, later, datetime.date(2026, 1, 10)) is None
+    lab = ScheduleEntry(
+        "高等数学", datetime.date(2026, 1, 10), ((9 * 60, 11 * 60),), "T2101", LAB
+    )
+    assert _find(exam, lab, datetime.date(2026, 1, 10)) is None
+
+
+def test_combine_keeps_other_weeks():
+    kb = Schedule([_kb_exam(), _kb_lab()], "25秋", START)
+    exams = Schedule([_listed_exam()], "25秋", START)
+    phxp = Schedule([_phxp_lab("2025/9/24")], "25秋", START)
+    schedule, duplicates = combine_schedules(
+        [("考试", exams), ("大物实验", phxp), ("课表", kb)]
+    )
+
+    assert sorted((d.date, d.source, d.kept_source) for d in duplicates) == [
+        (datetime.date(2025, 9, 24), "课表", "大物实验"),
+        (datetime.date(2026, 1, 10), "课表", "考试"),
+    ]
+    exam, phxp_lab, kb_lab = schedule.entries
+    assert exam.name == "高等数学 期末考试"
+    assert phxp_lab.name == "大学物理实验（上）"
+    # 只去除与选课平台重复的第 4 周
+    assert kb_lab.dates == ScheduledDates([3, 5], 3)
+    assert kb_lab.occurrence_dates(START) == [
+        datetime.date(2025, 9, 17),
+        datetime.date(2025, 10, 1),
+    ]
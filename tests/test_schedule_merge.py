@@ -0,0 +1,121 @@
+import dataclasses
+import datetime
+import random
+import tracemalloc
+
+from jwc.schedule import SmartMerger, time_range_smart_merge
+from jwc.schedule_utils import (
+    EXAM,
+    LAB,
+    LESSON,
+    ScheduledDates,
+    ScheduleEntry,
+    interning_time_ranges,
+)
+
+
+def _reference_merge(entries: list[ScheduleEntry]) -> list[ScheduleEntry]:
+    """流式合并之前的 time_range_smart_merge"""
+    grouped: dict[object, list[ScheduleEntry]] = {}
+    for e in sorted(entries, key=lambda e: e.name):
+        key = (e.name, e.dates, e.location, e.kind, e.teacher, e.lab_name)
+        grouped.setdefault(key, []).append(e)
+
+    final: list[ScheduleEntry] = []
+    for group in grouped.values():
+        candidates: list[ScheduleEntry] = []
+        for e in group:
+            if not e.time_ranges or e.kind == EXAM:
+                final.append(e)
+            else:
+                candidates.append(e)
+        group = sorted(candidates, key=lambda e: e.time_ranges[0][0])
+        i = 0
+        while i < len(group):
+            a = group[i]
+            st, et = a.time_ranges[0]
+            j = i + 1
+            while j < len(group):
+                b = group[j]
+                if a.overlaps_or_adjacent_to(b.time_ranges[0], allow_gap=15):
+                    group[i] = dataclasses.replace(
+                        a,
+                        time_ranges=((st, max(et, b.time_ranges[0][1])),),
+                        description=list(set(a.description) | set(b.description)),
+                    )
+                    del group[j]
+                    j -= 1
+                j += 1
+            i += 1
+        final.extend(group)
+    return final
+
+
+def _normalized(entries: list[ScheduleEntry]):
+    # 描述由集合合并而来，其顺序本就不确定
+    return [dataclasses.replace(e, description=sorted(e.description)) for e in entries]
+
+
+def _random_entries(rng: random.Random, n: int) -> list[ScheduleEntry]:
+    spans = [
+        ((480, 570),),
+        ((585, 675),),
+        ((570, 585),),
+        ((480, 675),),
+        ((840, 930),),
+        ((480, 570), (840, 930)),
+    ]
+    entries: list[ScheduleEntry] = []
+    for _ in range(n):
+        kind = rng.choice([LESSON, LESSON, LESSON, LAB, EXAM])
+        dates: ScheduledDates | datetime.date = (
+            datetime.date(2025, 12, rng.randint(1, 3))
+            if kind == EXAM
+            else ScheduledDates(rng.choice([[1, 2, 3], [2, 4, 6]]), rng.choice([1, 3]))
+        )
+        entries.append(
+            ScheduleEntry(
+                name=rng.choice(["高等数学", "大学物理", "程序设计", "线性代数"]),
+                dates=dates,
+                time_ranges=() if rng.random() < 0.05 else rng.choice(spans),
+                location=rng.choice(["T2102", "T2103"]),
+                kind=kind,
+                teacher=rng.choice(["", "张三"]),
+                description=rng.sample(["双语", "实验班", "A组"], rng.randint(0, 2)),
+                lab_name="光电效应" if kind == LAB else "",
+            )
+        )
+    return entries
+
+
+def test_smart_merger_matches_reference():
+    rng = random.Random(0)
+    for n in [0, 1, 2, 3, 5, 8] * 200 + [50, 500, 5000]:
+        entries = _random_entries(rng, n)
+        expected = _reference_merge(list(entries))
+        assert _normalized(time_range_smart_merge(entries)) == _normalized(expected)
+
+
+def test_smart_merger_memory_follows_distinct_entries():
+    entry = _random_entries(random.Random(1), 1)[0]
+    merger = SmartMerger()
+    tracemalloc.start()
+    try:
+        for _ in range(20_000):
+            merger.add(dataclasses.replace(entry, description=list(entry.description)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(merger.result()) == 1
+    assert peak < 64 * 1024
+
+
+def test_time_ranges_are_interned_within_one_parse():
+    entry = _random_entries(random.Random(2), 1)[0]
+    with interning_time_ranges():
+        a = dataclasses.replace(entry, time_ranges=list(entry.time_ranges))
+        b = dataclasses.replace(entry, time_ranges=list(entry.time_ranges))
+        assert a.time_ranges is b.time_ranges
+    # 解析结束后不再保留
+    c = dataclasses.replace(entry, time_ranges=list(entry.time_ranges))
+    assert c.time_ranges is not a.time_ranges
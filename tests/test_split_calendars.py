@@ -0,0 +1,41 @@
+import datetime
+import json
+
+from jwc.cli import write_split_kb_calendars
+from jwc.schedule import Schedule
+from jwc.schedule_preference import JwcSchedulePreference
+from jwc.schedule_utils import LESSON, ScheduledDates, ScheduleEntry
+
+
+def _lesson(name: str, day: int) -> ScheduleEntry:
+    return ScheduleEntry(
+        name, ScheduledDates([1, 2], day), ((510, 610),), "T2101", LESSON
+    )
+
+
+def test_colliding_group_names_get_distinct_files(tmp_path):
+    # 前三门课的名称替换掉不安全字符后相同（或只差大小写）
+    names = ["C/C++程序设计", "C C++程序设计", "c:C++程序设计", "数据结构"]
+    schedule = Schedule(
+        [_lesson(name, day) for day, name in enumerate(names, 1)],
+        "25秋",
+        datetime.date(2025, 9, 1),
+    )
+    manifest_path, _ = write_split_kb_calendars(
+        "2025-2026",
+        "1",
+        schedule,
+        JwcSchedulePreference(),
+        "course",
+        str(tmp_path / "课表.ics"),
+    )
+
+    calendars = json.loads(manifest_path.read_text(encoding="utf-8"))["calendars"]
+    files = {c["name"]: c["file"] for c in calendars}
+    assert set(files) == set(names)
+    assert len({f.casefold() for f in files.values()}) == len(names)
+    # 不冲突的分组保持原来的文件名
+    assert files["数据结构"] == "课表-数据结构.ics"
+    for c in calendars:
+        text = (tmp_path / c["file"]).read_text(encoding="utf-8")
+        assert text.count("BEGIN:VEVENT") == c["events"] > 0